@@ -0,0 +1,209 @@
+# airports.py
+"""Airport and city reference data, with a per-keystroke autocomplete index.
+
+The bundled airports.csv holds the world's major airports, busiest
+first. SKYWINGS_AIRPORTS_PATH can point at a larger file in the same
+layout, or at OurAirports' airports.csv as downloaded, which is read as
+its airports with scheduled service and an IATA code, large ones first.
+"""
+import bisect
+import csv
+import functools
+import math
+import os
+import re
+import unicodedata
+from collections import namedtuple
+
+import numpy as np
+
+AIRPORTS_PATH = os.environ.get('SKYWINGS_AIRPORTS_PATH',
+                               os.path.join(os.path.dirname(os.path.abspath(__file__)), 'airports.csv'))
+AUTOCOMPLETE_LIMIT = 8
+# Matches kept on each trie node, so a prefix lookup never scans a subtree
+TRIE_TOP_K = 16
+# Share of trigrams a fuzzy match must have in common with the query (Dice)
+FUZZY_MIN_SCORE = 0.35
+
+Airport = namedtuple('Airport', ['iata', 'name', 'city', 'country', 'latitude', 'longitude'])
+
+# OurAirports columns for each Airport field, and the types read, in rank order
+OURAIRPORTS_COLUMNS = {'iata': 'iata_code', 'name': 'name', 'city': 'municipality', 'country': 'iso_country',
+                       'latitude': 'latitude_deg', 'longitude': 'longitude_deg'}
+OURAIRPORTS_TYPES = ('large_airport', 'medium_airport', 'small_airport')
+
+
+def read_airports(path=AIRPORTS_PATH):
+    """Airports from a CSV file, most important first, one per IATA code."""
+    with open(path, newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    if rows and 'iata_code' in rows[0]:
+        rows = [{field: row[column] for field, column in OURAIRPORTS_COLUMNS.items()}
+                for kind in OURAIRPORTS_TYPES for row in rows
+                if row['type'] == kind and row.get('scheduled_service') == 'yes']
+    airports, seen = [], set()
+    for row in rows:
+        iata = row['iata'].strip().upper()
+        if len(iata) != 3 or iata in seen:
+            continue
+        seen.add(iata)
+        airports.append(Airport(iata, row['name'].strip(), row['city'].strip() or row['name'].strip(),
+                                row['country'].strip(), float(row['latitude']), float(row['longitude'])))
+    return airports
+
+
+@functools.lru_cache(maxsize=None)
+def load_airports(path=AIRPORTS_PATH):
+    # Read once per process; the flight generator and every picker share it
+    return tuple(read_airports(path))
+
+
+def normalize(text):
+    """Lower case ASCII words: 'São Paulo/Guarulhos' -> 'sao paulo guarulhos'."""
+    text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
+    return ' '.join(re.findall(r'[a-z0-9]+', text.lower()))
+
+
+def _trigrams(key, complete=True):
+    # A partly typed query has no end yet, so it gets no closing gram
+    padded = f' {key} ' if complete else f' {key}'
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def distance_km(a, b):
+    """Great-circle distance between two airports."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (a.latitude, a.longitude, b.latitude, b.longitude))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371 * math.asin(math.sqrt(h))
+
+
+class AirportIndex:
+    """Prefix and fuzzy lookup over airport codes, cities and names.
+
+    Each airport is keyed by its code, its city, its name and every word
+    of the city and name after the first, so 'gaulle' finds CDG. Prefixes
+    go through a trie kept in flat arrays: children sorted by character,
+    and on every node the TRIE_TOP_K best airports below it, in dataset
+    order. A lookup is one step per typed character plus a row read, with
+    no subtree walk. When the prefixes run short, a trigram inverted
+    index counts the trigrams each key shares with the query in one
+    vectorized pass over the postings and fills in with the closest
+    spellings.
+    """
+
+    def __init__(self, airports):
+        self.airports = list(airports)
+        self._codes = {airport.iata: i for i, airport in enumerate(self.airports)}
+        prefix_keys, fuzzy_keys = [], []
+        for i, airport in enumerate(self.airports):
+            city, name = normalize(airport.city), normalize(airport.name)
+            suffixes = [' '.join(w.split()[j:]) for w in (city, name) for j in range(1, len(w.split()))]
+            prefix_keys.extend((key, i) for key in dict.fromkeys([airport.iata.lower(), city, name, *suffixes]) if key)
+            # Typos are matched word by word, plus the whole city name
+            fuzzy_keys.extend((key, i) for key in dict.fromkeys([city, *city.split(), *name.split()]) if key)
+        self._build_trie(prefix_keys)
+        self._build_trigrams(fuzzy_keys)
+
+    def _build_trie(self, keys):
+        # Built as dicts, then frozen into flat arrays (node -> children and top airports)
+        children, top = [{}], [[]]
+        for key, owner in keys:
+            node = 0
+            for char in key:
+                child = children[node].get(char)
+                if child is None:
+                    child = children[node][char] = len(children)
+                    children.append({})
+                    top.append([])
+                node = child
+                # Airports arrive in dataset order, so each node keeps its best
+                if len(top[node]) < TRIE_TOP_K and owner not in top[node]:
+                    top[node].append(owner)
+        self._child_start = np.zeros(len(children) + 1, dtype=np.int64)
+        self._child_start[1:] = np.cumsum([len(c) for c in children])
+        self._child_start = self._child_start.tolist()
+        self._child_chars = [char for c in children for char in sorted(c)]
+        self._child_nodes = [c[char] for c in children for char in sorted(c)]
+        self._top = np.full((len(children), TRIE_TOP_K), -1, dtype=np.int32)
+        for node, best in enumerate(top):
+            self._top[node, :len(best)] = best
+
+    def _build_trigrams(self, keys):
+        grams = {}
+        self._owners = np.array([owner for _, owner in keys], dtype=np.int32)
+        pairs = [(grams.setdefault(g, len(grams)), k) for k, (key, _) in enumerate(keys) for g in _trigrams(key)]
+        gram_ids, key_ids = np.array(pairs, dtype=np.int32).reshape(-1, 2).T
+        order = np.argsort(gram_ids, kind='stable')
+        self._grams = grams
+        self._postings = key_ids[order]
+        self._gram_start = np.searchsorted(gram_ids[order], np.arange(len(grams) + 1))
+        self._key_grams = np.bincount(key_ids, minlength=len(keys))
+
+    def _prefix(self, query):
+        node = 0
+        for char in query:
+            lo, hi = self._child_start[node], self._child_start[node + 1]
+            i = bisect.bisect_left(self._child_chars, char, lo, hi)
+            if i == hi or self._child_chars[i] != char:
+                return []
+            node = self._child_nodes[i]
+        best = self._top[node]
+        return best[best >= 0].tolist()
+
+    def _fuzzy(self, query, limit):
+        query_grams = _trigrams(query, complete=False)
+        gram_ids = [self._grams[g] for g in query_grams if g in self._grams]
+        if not gram_ids:
+            return []
+        postings = np.concatenate([self._postings[self._gram_start[g]:self._gram_start[g + 1]] for g in gram_ids])
+        shared = np.bincount(postings, minlength=len(self._key_grams))
+        keys = np.flatnonzero(shared)
+        shared = shared[keys]
+        scores = 2 * shared / (len(query_grams) + self._key_grams[keys])
+        keep = scores >= FUZZY_MIN_SCORE
+        keys, scores = keys[keep], scores[keep]
+        # Best score first, dataset order among equals; a few spare keys
+        # cover airports matched by more than one of their words
+        rank = (1 - scores) * len(self._key_grams) + keys
+        if len(rank) > 4 * limit:
+            best = np.argpartition(rank, 4 * limit)[:4 * limit]
+            keys, rank = keys[best], rank[best]
+        owners = self._owners[keys[np.argsort(rank)]]
+        return list(dict.fromkeys(owners.tolist()))[:limit]
+
+    def complete(self, text, limit=AUTOCOMPLETE_LIMIT):
+        """Up to ``limit`` airports for a partly typed code, city or name.
+
+        An exact IATA code comes first, then prefix matches in dataset
+        order, then fuzzy matches for typos.
+        """
+        query = normalize(text)
+        if not query:
+            return []
+        found = []
+        if len(query) == 3 and query.upper() in self._codes:
+            found.append(self._codes[query.upper()])
+        found.extend(self._prefix(query))
+        if len(dict.fromkeys(found)) < limit:
+            found.extend(self._fuzzy(query, limit))
+        return [self.airports[i] for i in list(dict.fromkeys(found))[:limit]]
+
+    def resolve(self, text):
+        """The airport a typed code, city or name most likely means, or None."""
+        code = text.strip().upper()
+        if code in self._codes:
+            return self.airports[self._codes[code]]
+        # Picker labels look like 'London (LHR)'
+        match = re.search(r'\(([A-Za-z]{3})\)\s*$', text)
+        if match and match.group(1).upper() in self._codes:
+            return self.airports[self._codes[match.group(1).upper()]]
+        found = self.complete(text, limit=1)
+        return found[0] if found else None
+
+    def airport(self, iata):
+        i = self._codes.get(iata.upper())
+        return None if i is None else self.airports[i]
+
+    def nearest(self, airport, among):
+        """The airport of ``among`` closest to ``airport``, and its distance in km."""
+        return min(((other, distance_km(airport, other)) for other in among), key=lambda pair: pair[1])
@@ -0,0 +1,287 @@
+# analytics_aggregates.py
+"""Incrementally maintained statistics behind the Analytics page."""
+import random
+import threading
+from collections import Counter
+
+import numpy as np
+
+from state_backend import Counters
+
+# Fixed price bins so histograms can be updated one flight at a time
+PRICE_BIN_WIDTH = 100
+PRICE_BIN_MAX = 5000
+PRICE_BINS = PRICE_BIN_MAX // PRICE_BIN_WIDTH
+
+# Duration bins of the per-class duration x price density grid
+DURATION_BIN_HOURS = 0.5
+DURATION_BIN_MAX = 24
+DURATION_BINS = int(DURATION_BIN_MAX / DURATION_BIN_HOURS)
+
+# Duration/price points kept per class for the scatter plot
+SAMPLE_SIZE = 5000
+
+
+def price_bin(price):
+    return min(max(int(price // PRICE_BIN_WIDTH), 0), PRICE_BINS - 1)
+
+
+def duration_bin(hours):
+    return min(max(int(hours // DURATION_BIN_HOURS), 0), DURATION_BINS - 1)
+
+
+def duration_hours(flight):
+    return flight['duration'].total_seconds() / 3600
+
+
+def _price_bins(cents):
+    return np.clip(cents // (PRICE_BIN_WIDTH * 100), 0, PRICE_BINS - 1)
+
+
+class _Reservoir:
+    """Fixed-size uniform sample of points keyed by flight id."""
+
+    def __init__(self, size, rng):
+        self.size = size
+        self.seen = 0
+        self._rng = rng
+        self._ids = []
+        self._points = []
+        self._positions = {}
+
+    def _put(self, position, flight_id, point):
+        if position == len(self._ids):
+            self._ids.append(flight_id)
+            self._points.append(point)
+        else:
+            del self._positions[self._ids[position]]
+            self._ids[position] = flight_id
+            self._points[position] = point
+        self._positions[flight_id] = position
+
+    def add(self, flight_id, point):
+        self.seen += 1
+        if len(self._ids) < self.size:
+            self._put(len(self._ids), flight_id, point)
+        else:
+            slot = self._rng.randrange(self.seen)
+            if slot < self.size:
+                self._put(slot, flight_id, point)
+
+    def load(self, seen, flight_ids, points):
+        """Seed the reservoir with a sample already drawn from ``seen`` points."""
+        self.seen = seen
+        for flight_id, point in zip(flight_ids, points):
+            self._put(len(self._ids), flight_id, point)
+
+    def remove(self, flight_id):
+        self.seen -= 1
+        position = self._positions.pop(flight_id, None)
+        if position is None:
+            return
+        # Swap the last point into the hole
+        last_id, last_point = self._ids.pop(), self._points.pop()
+        if position < len(self._ids):
+            self._ids[position] = last_id
+            self._points[position] = last_point
+            self._positions[last_id] = position
+
+    def reprice(self, cents):
+        """Price the sampled points from ``cents``, by flight id; ids past its end keep theirs."""
+        for position, flight_id in enumerate(self._ids):
+            if flight_id < len(cents):
+                hours, _, departure, arrival = self._points[position]
+                self._points[position] = (hours, int(cents[flight_id]) / 100, departure, arrival)
+
+    def points(self):
+        return list(self._points)
+
+
+class FlightAggregates:
+    """Running counters over the inventory and the bookings made against it.
+
+    Every add/remove/update touches O(1) state, and ``summary()`` reads
+    only these counters, so the Analytics page costs the same no matter
+    how many flights there are. The scatter samples are per-class
+    reservoirs: additions keep them uniform, removals just drop the point.
+    Booking counts go to ``booking_counters``, which a StateBackend can
+    share between workers; inventory statistics are the same everywhere.
+
+    Prices start at the inventory's base fares. ``reprice()`` moves the
+    inventory's flights to a pricing epoch's fares, touching only the
+    flights whose fare changed, so prices, the histogram, the density grid
+    and the samples follow what the booking flow charges.
+    """
+
+    def __init__(self, sample_size=SAMPLE_SIZE, seed=0, booking_counters=None):
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+        self.sample_size = sample_size
+        self.flights = 0
+        self.price_sum = 0.0
+        self.arrivals = Counter()
+        self.price_histogram = np.zeros(PRICE_BINS, dtype=np.int64)
+        self._samples = {}
+        self._density = {}
+        # Per inventory row (flight id): fare in cents as counted here, -1
+        # once removed, with the bins and class it was counted under
+        self._cents = np.empty(0, dtype=np.int64)
+        self._hour_bins = np.empty(0, dtype=np.int64)
+        self._classes = np.empty(0, dtype=np.int64)
+        self._class_names = []
+        self._epoch = None
+        self.booking_counters = booking_counters if booking_counters is not None else Counters()
+
+    @classmethod
+    def from_flights(cls, flights, sample_size=SAMPLE_SIZE, seed=0, booking_counters=None):
+        """Build the aggregates for a whole inventory in one vectorized pass."""
+        aggregates = cls(sample_size, seed, booking_counters)
+        price = flights['price_cents'].to_numpy() / 100
+        aggregates.flights = len(flights)
+        aggregates.price_sum = float(price.sum())
+        arrivals = flights['arrival_city'].value_counts()
+        aggregates.arrivals.update(arrivals[arrivals > 0].to_dict())
+        bins = np.clip((price // PRICE_BIN_WIDTH).astype(np.int64), 0, PRICE_BINS - 1)
+        aggregates.price_histogram += np.bincount(bins, minlength=PRICE_BINS)
+
+        hours = flights['duration_minutes'].to_numpy() / 60
+        hour_bins = np.clip((hours // DURATION_BIN_HOURS).astype(np.int64), 0, DURATION_BINS - 1)
+        flight_ids = flights['flight_id'].to_numpy()
+        classes = flights['class'].astype('category')
+        aggregates._cents = np.full(int(flight_ids.max()) + 1 if len(flights) else 0, -1, dtype=np.int64)
+        aggregates._cents[flight_ids] = flights['price_cents'].to_numpy()
+        aggregates._hour_bins = np.zeros(len(aggregates._cents), dtype=np.int64)
+        aggregates._hour_bins[flight_ids] = hour_bins
+        aggregates._classes = np.zeros(len(aggregates._cents), dtype=np.int64)
+        aggregates._classes[flight_ids] = classes.cat.codes.to_numpy()
+        aggregates._class_names = list(classes.cat.categories)
+        departures = flights['departure_city'].to_numpy(dtype=object)
+        arrivals = flights['arrival_city'].to_numpy(dtype=object)
+        for flight_class, rows in flights.groupby('class', observed=True).indices.items():
+            sample = aggregates._reservoir(flight_class)
+            np.add.at(aggregates._density[flight_class], (hour_bins[rows], bins[rows]), 1)
+            seen = len(rows)
+            if seen > sample_size:
+                rows = np.random.default_rng(seed).choice(rows, sample_size, replace=False)
+            sample.load(
+                seen, flight_ids[rows].tolist(),
+                zip(hours[rows].tolist(), price[rows].tolist(), departures[rows], arrivals[rows]))
+        return aggregates
+
+    def _reservoir(self, flight_class):
+        if flight_class not in self._samples:
+            self._samples[flight_class] = _Reservoir(self.sample_size, self._rng)
+            self._density[flight_class] = np.zeros((DURATION_BINS, PRICE_BINS), dtype=np.int64)
+        return self._samples[flight_class]
+
+    def _track(self, flight, cents, hours=None):
+        # Keep the per-row fares reprice() compares against in step
+        row = flight['flight_id']
+        if not 0 <= row < len(self._cents):
+            return
+        self._cents[row] = cents
+        if hours is not None:
+            if flight['class'] not in self._class_names:
+                self._class_names.append(flight['class'])
+            self._hour_bins[row] = duration_bin(hours)
+            self._classes[row] = self._class_names.index(flight['class'])
+
+    def add_flight(self, flight):
+        with self._lock:
+            self.flights += 1
+            self.price_sum += flight['price']
+            self.arrivals[flight['arrival_city']] += 1
+            self.price_histogram[price_bin(flight['price'])] += 1
+
+            hours = duration_hours(flight)
+            sample = self._reservoir(flight['class'])
+            self._density[flight['class']][duration_bin(hours), price_bin(flight['price'])] += 1
+            sample.add(flight['flight_id'], (hours, flight['price'],
+                                             flight['departure_city'], flight['arrival_city']))
+            self._track(flight, round(flight['price'] * 100), hours)
+
+    def remove_flight(self, flight):
+        with self._lock:
+            self.flights -= 1
+            self.price_sum -= flight['price']
+            self.arrivals[flight['arrival_city']] -= 1
+            if self.arrivals[flight['arrival_city']] <= 0:
+                del self.arrivals[flight['arrival_city']]
+            self.price_histogram[price_bin(flight['price'])] -= 1
+            self._density[flight['class']][duration_bin(duration_hours(flight)), price_bin(flight['price'])] -= 1
+            self._samples[flight['class']].remove(flight['flight_id'])
+            self._track(flight, -1)
+
+    def update_flight(self, old, new):
+        self.remove_flight(old)
+        self.add_flight(new)
+
+    def reprice(self, prices):
+        """Count the inventory's flights at the fares of PriceList ``prices``.
+
+        Epochs no newer than the one already applied are ignored, so
+        sessions racing to apply the same epoch apply it once.
+        """
+        with self._lock:
+            if self._epoch is not None and prices.epoch <= self._epoch:
+                return
+            self._epoch = prices.epoch
+            rows = np.arange(min(len(self._cents), len(prices.cents)))
+            new = prices.cents[rows].astype(np.int64)
+            changed = (self._cents[rows] >= 0) & (new != self._cents[rows])
+            rows, new = rows[changed], new[changed]
+            if not len(rows):
+                return
+            old = self._cents[rows]
+            self.price_sum += float(new.sum() - old.sum()) / 100
+            old_bins, new_bins = _price_bins(old), _price_bins(new)
+            self.price_histogram += (np.bincount(new_bins, minlength=PRICE_BINS) -
+                                     np.bincount(old_bins, minlength=PRICE_BINS))
+            for code, flight_class in enumerate(self._class_names):
+                in_class = self._classes[rows] == code
+                if flight_class not in self._density or not in_class.any():
+                    continue
+                # Cells of the flattened grid; bincount is far quicker than np.add.at
+                cells = self._hour_bins[rows[in_class]] * PRICE_BINS
+                size = DURATION_BINS * PRICE_BINS
+                self._density[flight_class] += (np.bincount(cells + new_bins[in_class], minlength=size) -
+                                                np.bincount(cells + old_bins[in_class], minlength=size)
+                                                ).reshape(DURATION_BINS, PRICE_BINS)
+            self._cents[rows] = new
+            for sample in self._samples.values():
+                sample.reprice(self._cents)
+
+    def _count_bookings(self, bookings, sign):
+        # Revenue in cents, so shared integer counters add up exactly; one
+        # increment for the lot, which is one transaction on a shared backend
+        amounts = Counter()
+        for booking in bookings:
+            amounts['bookings'] += sign
+            amounts['booked_revenue_cents'] += sign * round(booking['flight']['price'] * 100)
+        if amounts:
+            self.booking_counters.incr(amounts)
+
+    def add_booking(self, booking):
+        self._count_bookings([booking], 1)
+
+    def add_bookings(self, bookings):
+        self._count_bookings(bookings, 1)
+
+    def cancel_booking(self, booking):
+        self._count_bookings([booking], -1)
+
+    def summary(self, top=10):
+        bookings = self.booking_counters.read()
+        with self._lock:
+            edges = np.arange(PRICE_BINS + 1) * PRICE_BIN_WIDTH
+            return {
+                'total_flights': self.flights,
+                'avg_price': self.price_sum / self.flights if self.flights else 0.0,
+                'popular_destination': self.arrivals.most_common(1)[0][0] if self.arrivals else None,
+                'top_destinations': self.arrivals.most_common(top),
+                'price_histogram': (edges, self.price_histogram.copy()),
+                'samples': {c: sample.points() for c, sample in self._samples.items()},
+                'duration_price_density': {c: d.copy() for c, d in self._density.items()},
+                'bookings': bookings.get('bookings', 0),
+                'booked_revenue': bookings.get('booked_revenue_cents', 0) / 100,
+            }
@@ -0,0 +1,144 @@
+# analytics_charts.py
+"""Plotly figures for the Analytics page, built from aggregate summaries."""
+import random
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+from analytics_aggregates import DURATION_BIN_HOURS, PRICE_BIN_WIDTH
+
+# Inventory sizes at which the duration/price chart changes rendering mode
+SVG_MAX_POINTS = 2_000
+WEBGL_MAX_POINTS = 50_000
+# Points per class in the stratified-sample mode
+SAMPLE_POINTS_PER_CLASS = 500
+
+SCATTER_MODES = ('auto', 'scatter', 'webgl', 'sample', 'density')
+
+
+def price_histogram_figure(summary):
+    edges, counts = summary['price_histogram']
+    fig = px.bar(x=(edges[:-1] + edges[1:]) / 2, y=counts,
+                 title="Flight Price Distribution",
+                 labels={'x': 'Price ($)', 'y': 'count'})
+    fig.update_layout(bargap=0)
+    return fig
+
+
+def top_destinations_figure(summary):
+    cities = [city for city, _ in summary['top_destinations']]
+    counts = [count for _, count in summary['top_destinations']]
+    return px.bar(x=cities, y=counts,
+                  title="Top 10 Destinations",
+                  labels={'x': 'City', 'y': 'Number of Flights'})
+
+
+def scatter_mode(summary):
+    """Rendering mode 'auto' resolves to for this inventory size."""
+    if summary['total_flights'] <= SVG_MAX_POINTS:
+        return 'scatter'
+    if summary['total_flights'] <= WEBGL_MAX_POINTS:
+        return 'webgl'
+    return 'density'
+
+
+def _scatter_points(summary, per_class=None):
+    rng = random.Random(0)
+    rows = []
+    for flight_class, points in sorted(summary['samples'].items()):
+        if per_class is not None and len(points) > per_class:
+            points = rng.sample(points, per_class)
+        rows.extend((flight_class, *point) for point in points)
+    return pd.DataFrame(rows, columns=['class', 'duration_hours', 'price',
+                                       'departure_city', 'arrival_city'])
+
+
+def _density_figure(summary):
+    # One heatmap per class over the fixed duration x price grid, trimmed
+    # to the cells that hold any flights
+    grids = dict(sorted(summary['duration_price_density'].items()))
+    total = sum(grids.values())
+    rows, cols = np.nonzero(total)
+    if not len(rows):
+        return go.Figure(layout=dict(title="Flight Duration vs Price by Class"))
+    durations = slice(rows.min(), rows.max() + 1)
+    prices = slice(cols.min(), cols.max() + 1)
+    x = np.arange(durations.start, durations.stop) * DURATION_BIN_HOURS + DURATION_BIN_HOURS / 2
+    y = np.arange(prices.start, prices.stop) * PRICE_BIN_WIDTH + PRICE_BIN_WIDTH / 2
+
+    fig = make_subplots(rows=1, cols=len(grids), shared_yaxes=True,
+                        subplot_titles=list(grids), horizontal_spacing=0.02)
+    for i, grid in enumerate(grids.values(), start=1):
+        fig.add_trace(go.Heatmap(
+            x=x, y=y, z=grid[durations, prices].T, coloraxis='coloraxis',
+            hovertemplate="%{x} h • $%{y}: %{z} flights<extra></extra>",
+        ), row=1, col=i)
+        fig.update_xaxes(title_text='duration_hours', row=1, col=i)
+    fig.update_yaxes(title_text='price', row=1, col=1)
+    fig.update_layout(title="Flight Duration vs Price by Class",
+                      coloraxis=dict(colorscale='Blues', colorbar=dict(title='flights')))
+    return fig
+
+
+def duration_price_figure(summary, mode='auto'):
+    """Duration vs price chart whose payload stays bounded as inventory grows.
+
+    'scatter' and 'webgl' plot every sampled point (SVG or WebGL), 'sample'
+    plots a stratified sample of SAMPLE_POINTS_PER_CLASS per class and
+    'density' plots binned counts per class. 'auto' picks by inventory size.
+    """
+    if mode == 'auto':
+        mode = scatter_mode(summary)
+    if mode == 'density':
+        return _density_figure(summary)
+    if mode not in SCATTER_MODES:
+        raise ValueError(f"Unknown scatter mode: {mode}")
+
+    points = _scatter_points(summary, SAMPLE_POINTS_PER_CLASS if mode == 'sample' else None)
+    title = "Flight Duration vs Price by Class"
+    if len(points) < summary['total_flights']:
+        title += f" (sample of {len(points):,} flights)"
+    return px.scatter(points, x='duration_hours', y='price',
+                      color='class', hover_data=['departure_city', 'arrival_city'],
+                      render_mode='webgl' if mode == 'webgl' else 'svg',
+                      title=title)
+
+
+def booking_series_figure(series):
+    # Bookings and cancellations per bucket, revenue on its own axis
+    fig = make_subplots(specs=[[{'secondary_y': True}]])
+    fig.add_trace(go.Bar(x=series['time'], y=series['bookings'], name='bookings'))
+    fig.add_trace(go.Bar(x=series['time'], y=series['cancelled'], name='cancelled'))
+    fig.add_trace(go.Scatter(x=series['time'], y=series['revenue'], name='revenue ($)', mode='lines'),
+                  secondary_y=True)
+    fig.update_layout(title="Bookings Over Time", barmode='overlay', hovermode='x unified')
+    fig.update_yaxes(title_text='bookings', secondary_y=False)
+    fig.update_yaxes(title_text='revenue ($)', secondary_y=True)
+    return fig
+
+
+def route_revenue_figure(summary, top=10):
+    # Graph objects rather than px, which rejects a window with no bookings
+    routes = list(summary['revenue_by_route'].items())[:top][::-1]
+    fig = go.Figure(go.Bar(x=[revenue for _, revenue in routes], y=[route for route, _ in routes],
+                           orientation='h'))
+    fig.update_layout(title=f"Top {top} Routes by Revenue", xaxis_title='Revenue ($)', yaxis_title='Route')
+    return fig
+
+
+def class_revenue_figure(summary):
+    fig = go.Figure(go.Bar(x=list(summary['revenue_by_class']), y=list(summary['revenue_by_class'].values())))
+    fig.update_layout(title="Revenue by Class", xaxis_title='Class', yaxis_title='Revenue ($)')
+    return fig
+
+
+def preference_mix_figure(summary):
+    fig = make_subplots(rows=1, cols=2, specs=[[{'type': 'domain'}, {'type': 'domain'}]],
+                        subplot_titles=["Seat preference", "Meal preference"])
+    for col, mix in enumerate((summary['seat_preferences'], summary['meal_preferences']), start=1):
+        fig.add_trace(go.Pie(labels=list(mix), values=list(mix.values()), hole=0.4), row=1, col=col)
+    fig.update_layout(title="Passenger Preferences")
+    return fig
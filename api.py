@@ -0,0 +1,451 @@
+# api.py
+"""Headless JSON/HTTP API for flight search and booking.
+
+Serves the same BookingService as the Streamlit app, against the same
+state backend and booking store, so API and UI bookings draw from one
+seat pool and show up in each other's booking lists. Run with
+
+    uvicorn api:app --host 0.0.0.0 --port 8000 --workers 4
+
+More than one worker (or host) needs SKYWINGS_STATE_BACKEND pointing at
+a shared backend, as for several app replicas.
+
+    GET    /health
+    GET    /flights?departure=&arrival=&airline=&class=&min_price=&max_price=&sort=&page=&page_size=
+    GET    /flights/{flight_id}
+    GET    /flights/{flight_id}/quote?passengers=
+    GET    /fares?departure=&arrival=&date=&flex=
+    GET    /airports?q=&limit=
+    POST   /holds                          {"flight_id", "seats"}
+    DELETE /holds/{hold_id}
+    POST   /bookings                       {"flight_id", "passenger", "payment_method", "hold_id", "pricing_epoch"}
+    GET    /bookings?email=                Authorization: Bearer <owner>
+    POST   /bookings/{booking_id}/cancel   Authorization: Bearer <owner>
+    GET    /bookings/export?format=csv|parquet&since=&until=&status=   Authorization: Bearer <admin>
+    GET    /analytics/bookings?resolution=minute|hour|day&buckets=&format=json|csv
+
+Every call takes an optional ``inventory_version`` (query parameter or
+body field), defaulting to the current one; search results, quotes and
+holds report the version they were made against, and a hold is only
+valid with that version. Fares hold for a pricing epoch: search results,
+flights and quotes report theirs as ``pricing_epoch``, and passing it
+back (to page through results, or with a booking to pay the quoted
+fare) works while the epoch is kept, about as long as a seat hold.
+Times are ISO 8601 and durations in seconds. Errors come back as
+{"error": "..."} with 400 for bad input, 401 and 403 for a missing or
+wrong token, 404 for unknown flights, holds and bookings, and 409 for
+sold-out flights and for inventory versions and pricing epochs no longer
+served.
+
+A booking's ``owner`` is the token that lists and cancels it; bookings
+hold passport numbers and birth dates, so nothing else does. POST
+/bookings issues a new one, or keeps the one sent as a bearer token so a
+client can hold all its bookings under one. Without a token, listing and
+cancelling answer 401; someone else's booking is 404, as is an unknown
+one. Exports hold every passenger's contact details and need
+SKYWINGS_API_ADMIN_TOKEN; without it set they are not served.
+"""
+import contextlib
+import json
+import math
+import os
+import secrets
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Route
+
+from airports import AUTOCOMPLETE_LIMIT, AirportIndex, load_airports
+from batch_bookings import EXPORT_FORMATS, export_bookings
+from booking_analytics import DEFAULT_BUCKETS, BookingAnalytics
+from booking_store import BOOKING_STATUSES, open_booking_repository
+from fare_calendar import FARE_MAX_FLEX_DAYS
+from flight_index import SORT_KEYS
+from inventory import CITY_AIRPORTS
+from jobs import JobQueue
+from pagination import PAGE_SIZE, page_count, page_slice
+from search_cache import SearchCache, search_key
+from service import BookingService, FareExpired, InventoryResources
+from state_backend import open_state_backend
+
+API_MAX_PAGE_SIZE = int(os.environ.get('SKYWINGS_API_MAX_PAGE_SIZE', 100))
+API_MAX_AIRPORTS = 50
+API_MIN_TOKEN_LENGTH = 22
+API_ADMIN_TOKEN = os.environ.get('SKYWINGS_API_ADMIN_TOKEN')
+
+
+class ApiError(Exception):
+    def __init__(self, status_code, message):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _encode(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+class JSONResponse(Response):
+    # Flight records and bookings carry timestamps, durations and numpy scalars
+    media_type = 'application/json'
+
+    def render(self, content):
+        return json.dumps(content, default=_encode, separators=(',', ':')).encode('utf-8')
+
+
+def _integer(values, name, default=None, minimum=None):
+    value = values.get(name)
+    if value is None:
+        if default is None:
+            raise ApiError(400, f"{name} is required")
+        return default
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise ApiError(400, f"{name} must be an integer") from None
+    if minimum is not None and value < minimum:
+        raise ApiError(400, f"{name} must be at least {minimum}")
+    return value
+
+
+def _number(values, name):
+    value = values.get(name)
+    if value is None:
+        return None
+    try:
+        value = float(value)
+    except ValueError:
+        raise ApiError(400, f"{name} must be a number") from None
+    # float() also takes 'inf', 'nan' and overflowing exponents
+    if not math.isfinite(value):
+        raise ApiError(400, f"{name} must be a finite number")
+    return value
+
+
+def _date(values, name):
+    value = values.get(name)
+    if value is None:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ApiError(400, f"{name} must be a date (YYYY-MM-DD)") from None
+
+
+def _version(service, values):
+    # Holds made just before a version change stay usable while the
+    # previous version is still built; older ones are gone
+    version = values.get('inventory_version')
+    current = service.current_version()
+    if version is None or version == current:
+        return current
+    if version in service.resources:
+        return version
+    raise ApiError(409, f"Inventory version {version} is no longer served; search again")
+
+
+def _prices(service, values, version):
+    # Called off the event loop: it may build the epoch's fares or wait on the backend
+    if values.get('pricing_epoch') is None:
+        return service.prices(version)
+    epoch = _integer(values, 'pricing_epoch')
+    prices = service.prices(version, epoch)
+    if prices is None:
+        raise ApiError(409, f"Fares of pricing epoch {epoch} are no longer offered; quote again")
+    return prices
+
+
+def _owner(request):
+    # The bearer token bookings are made under; None if none was sent
+    scheme, _, token = request.headers.get('authorization', '').partition(' ')
+    if not token:
+        return None
+    if scheme.lower() != 'bearer' or len(token.strip()) < API_MIN_TOKEN_LENGTH:
+        raise ApiError(401, f"Authorization must be 'Bearer <token>' with at least {API_MIN_TOKEN_LENGTH} characters")
+    return token.strip()
+
+
+def _required_owner(request):
+    owner = _owner(request)
+    if owner is None:
+        raise ApiError(401, "Authorization: Bearer <token> is required")
+    return owner
+
+
+async def _body(request):
+    try:
+        body = await request.json()
+    except ValueError:
+        raise ApiError(400, "Request body must be JSON") from None
+    if not isinstance(body, dict):
+        raise ApiError(400, "Request body must be a JSON object")
+    return body
+
+
+async def health(request):
+    return JSONResponse({'status': 'ok', 'inventory_version': request.app.state.service.current_version()})
+
+
+async def search_flights(request):
+    service, params = request.app.state.service, request.query_params
+    version = _version(service, params)
+    sort_by = params.get('sort', 'price')
+    if sort_by not in SORT_KEYS:
+        raise ApiError(400, f"sort must be one of {', '.join(SORT_KEYS)}")
+    min_price, max_price = _number(params, 'min_price'), _number(params, 'max_price')
+    page = _integer(params, 'page', 1, minimum=1)
+    page_size = min(_integer(params, 'page_size', PAGE_SIZE, minimum=1), API_MAX_PAGE_SIZE)
+
+    def run():
+        prices = _prices(service, params, version)
+        price_range = None
+        if min_price is not None or max_price is not None:
+            price_range = (min_price or 0.0,
+                           max_price if max_price is not None else prices.cents.max(initial=0) / 100)
+        key = search_key(params.get('departure'), params.get('arrival'), params.getlist('airline'),
+                         params.get('class'), price_range, sort_by)
+        rows = service.search(key, version, prices.epoch)
+        page_rows, current = page_slice(rows, page, page_size)
+        return {'inventory_version': version, 'pricing_epoch': prices.epoch, 'total': len(rows), 'page': current,
+                'pages': page_count(len(rows), page_size),
+                'flights': service.flights(page_rows, version, prices.epoch)}
+
+    return JSONResponse(await run_in_threadpool(run))
+
+
+async def get_flight(request):
+    service, params = request.app.state.service, request.query_params
+    version = _version(service, params)
+    flight_id = _integer(request.path_params, 'flight_id')
+
+    def run():
+        return service.flight(flight_id, version, _prices(service, params, version).epoch)
+
+    flight = await run_in_threadpool(run)
+    if flight is None:
+        raise ApiError(404, "No such flight")
+    return JSONResponse(flight)
+
+
+async def quote_flight(request):
+    service, params = request.app.state.service, request.query_params
+    version = _version(service, params)
+    flight_id, passengers = _integer(request.path_params, 'flight_id'), _integer(params, 'passengers', 1, minimum=1)
+
+    def run():
+        return service.quote(flight_id, passengers, version, _prices(service, params, version).epoch)
+
+    quote = await run_in_threadpool(run)
+    if quote is None:
+        raise ApiError(404, "No such flight")
+    return JSONResponse(quote)
+
+
+async def fare_calendar(request):
+    # Lowest fare per class for each day within ``flex`` days of ``date``
+    service, params = request.app.state.service, request.query_params
+    version = _version(service, params)
+    departure, arrival = params.get('departure'), params.get('arrival')
+    if not departure or not arrival:
+        raise ApiError(400, "departure and arrival are required")
+    for city in (departure, arrival):
+        if city not in CITY_AIRPORTS:
+            raise ApiError(400, f"Unknown city: {city}")
+    day = _date(params, 'date') or date.today()
+    flex = min(_integer(params, 'flex', 3, minimum=0), FARE_MAX_FLEX_DAYS)
+    window = await run_in_threadpool(service.fare_calendar, departure, arrival, day, flex, version)
+    days = [{'date': d, 'fares': {c: {'price': fares[i], 'flight_id': flights[i]}
+                                  for i, c in enumerate(window.classes) if flights[i] >= 0}}
+            for d, fares, flights in zip(window.dates, window.fares.tolist(), window.flight_ids.tolist())]
+    return JSONResponse({'inventory_version': version, 'departure': departure, 'arrival': arrival, 'days': days})
+
+
+async def complete_airports(request):
+    # Autocomplete for a partly typed airport code, city or name; ``served``
+    # airports are in a city flights can be searched from and to
+    params = request.query_params
+    limit = min(_integer(params, 'limit', AUTOCOMPLETE_LIMIT, minimum=1), API_MAX_AIRPORTS)
+    airports = await run_in_threadpool(request.app.state.airports.complete, params.get('q', ''), limit)
+    return JSONResponse({'airports': [dict(airport._asdict(), served=airport.city in CITY_AIRPORTS)
+                                      for airport in airports]})
+
+
+async def create_hold(request):
+    service, body = request.app.state.service, await _body(request)
+    version = _version(service, body)
+    flight_id, seats = _integer(body, 'flight_id'), _integer(body, 'seats', 1, minimum=1)
+
+    def run():
+        if not service.exists(flight_id, version):
+            raise ApiError(404, "No such flight")
+        return service.reserve(flight_id, seats, version)
+
+    hold = await run_in_threadpool(run)
+    if hold is None:
+        raise ApiError(409, "Not enough seats left on this flight")
+    return JSONResponse(hold, status_code=201)
+
+
+async def release_hold(request):
+    service = request.app.state.service
+    version = _version(service, request.query_params)
+    try:
+        released = await run_in_threadpool(service.release, request.path_params['hold_id'], version)
+    except ValueError:
+        released = False
+    if not released:
+        raise ApiError(404, "No such hold, or it has expired")
+    return Response(status_code=204)
+
+
+async def create_booking(request):
+    service, body = request.app.state.service, await _body(request)
+    owner = _owner(request) or secrets.token_urlsafe(16)
+    version = _version(service, body)
+    flight_id = _integer(body, 'flight_id')
+    passenger, hold_id = body.get('passenger'), body.get('hold_id')
+    if not isinstance(passenger, dict):
+        raise ApiError(400, "passenger must be an object")
+    if not all(isinstance(value, str) for value in passenger.values()):
+        raise ApiError(400, "passenger fields must be strings")
+    if not isinstance(body.get('payment_method', ''), str):
+        raise ApiError(400, "payment_method must be a string")
+    if hold_id is not None and not isinstance(hold_id, str):
+        raise ApiError(400, "hold_id must be a string")
+
+    def run():
+        # At the fares of the quote's pricing epoch, if one is given
+        flight = service.flight(flight_id, version, _prices(service, body, version).epoch)
+        if flight is None:
+            raise ApiError(404, "No such flight")
+        return service.confirm(flight, passenger, body.get('payment_method', 'Credit Card'), hold_id, version,
+                               owner)
+
+    booking = await run_in_threadpool(run)
+    if booking is None:
+        raise ApiError(409, "Sorry, this flight is sold out or has departed")
+    return JSONResponse(booking, status_code=201)
+
+
+async def list_bookings(request):
+    owner = _required_owner(request)
+    email = request.query_params.get('email')
+    if not email:
+        raise ApiError(400, "email is required")
+    return JSONResponse(await run_in_threadpool(request.app.state.service.bookings, email, owner))
+
+
+async def cancel_booking(request):
+    owner = _required_owner(request)
+    booking = await run_in_threadpool(request.app.state.service.cancel, request.path_params['booking_id'], owner)
+    if booking is None:
+        raise ApiError(404, "No such booking")
+    return JSONResponse(booking)
+
+
+async def export_booking_file(request):
+    # Streamed a batch at a time, so the response never holds every booking
+    if not API_ADMIN_TOKEN:
+        raise ApiError(404, "Booking export is not enabled")
+    if not secrets.compare_digest(_required_owner(request), API_ADMIN_TOKEN):
+        raise ApiError(403, "Booking export needs the admin token")
+    params = request.query_params
+    fmt = params.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        raise ApiError(400, f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    status = params.get('status')
+    if status is not None and status not in BOOKING_STATUSES:
+        raise ApiError(400, f"status must be one of {', '.join(BOOKING_STATUSES)}")
+    until = _date(params, 'until')
+    chunks = export_bookings(request.app.state.service.repository, fmt, since=_date(params, 'since'),
+                             until=until and until + timedelta(days=1), status=status)
+    return StreamingResponse(chunks, media_type=EXPORT_FORMATS[fmt],
+                             headers={'Content-Disposition': f'attachment; filename="bookings.{fmt}"'})
+
+
+async def booking_analytics(request):
+    # The latest ``buckets`` of a rollup, from pre-aggregated counts only;
+    # CSV is the series, JSON adds the window's totals
+    params, analytics = request.query_params, request.app.state.service.analytics
+    if analytics is None:
+        raise ApiError(404, "Booking analytics are not enabled")
+    resolution = params.get('resolution', 'hour')
+    buckets = _integer(params, 'buckets', DEFAULT_BUCKETS.get(resolution, 1), minimum=1)
+    fmt = params.get('format', 'json')
+    if fmt not in ('json', 'csv'):
+        raise ApiError(400, "format must be one of json, csv")
+    series = await run_in_threadpool(analytics.series, resolution, buckets)
+    if fmt == 'csv':
+        return Response(series.to_csv(index=False), media_type='text/csv',
+                        headers={'Content-Disposition': f'attachment; filename="bookings_by_{resolution}.csv"'})
+    summary = await run_in_threadpool(analytics.summary, resolution, buckets)
+    return JSONResponse({'resolution': resolution, 'summary': summary,
+                         'series': series.to_dict('records')})
+
+
+async def api_error(request, exc):
+    return JSONResponse({'error': str(exc)}, status_code=exc.status_code)
+
+
+async def invalid_input(request, exc):
+    # Raised by the service for incomplete passenger details or malformed ids
+    return JSONResponse({'error': str(exc)}, status_code=400)
+
+
+async def fare_expired(request, exc):
+    # The epoch lapsed between the quote check and the booking
+    return JSONResponse({'error': str(exc)}, status_code=409)
+
+
+ROUTES = [
+    Route('/health', health),
+    Route('/flights', search_flights),
+    Route('/flights/{flight_id:int}', get_flight),
+    Route('/flights/{flight_id:int}/quote', quote_flight),
+    Route('/fares', fare_calendar),
+    Route('/airports', complete_airports),
+    Route('/holds', create_hold, methods=['POST']),
+    Route('/holds/{hold_id}', release_hold, methods=['DELETE']),
+    Route('/bookings', create_booking, methods=['POST']),
+    Route('/bookings', list_bookings),
+    Route('/bookings/export', export_booking_file),
+    Route('/bookings/{booking_id}/cancel', cancel_booking, methods=['POST']),
+    Route('/analytics/bookings', booking_analytics),
+]
+
+
+def open_service():
+    backend, repository = open_state_backend(), open_booking_repository()
+    return BookingService(InventoryResources(backend, repository=repository), repository, SearchCache(), JobQueue(),
+                          BookingAnalytics(backend, repository))
+
+
+def create_app(service=None):
+    """The API app around ``service``, by default one on the configured stores."""
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        # Build the current inventory, index and fares before taking traffic
+        await run_in_threadpool(app.state.service.resources.index, app.state.service.current_version())
+        await run_in_threadpool(app.state.service.prices, app.state.service.current_version())
+        yield
+        app.state.service.jobs.shutdown()
+        app.state.service.repository.close()
+        app.state.service.resources.backend.close()
+
+    app = Starlette(routes=ROUTES, lifespan=lifespan,
+                    exception_handlers={ApiError: api_error, FareExpired: fare_expired, ValueError: invalid_input})
+    app.state.service = service or open_service()
+    app.state.airports = AirportIndex(load_airports())
+    return app
+
+
+app = create_app()
@@ -2,10 +2,30 @@
 import streamlit as st
 import pandas as pd
 import datetime
-import plotly.express as px
-import plotly.graph_objects as go
+import functools
+import secrets
+import time
 from datetime import datetime, timedelta
-import random
+from types import SimpleNamespace
+
+from airports import AirportIndex, load_airports
+from analytics_aggregates import FlightAggregates
+from batch_bookings import EXPORT_FORMATS, export_bookings, import_bookings, read_passengers
+from booking_analytics import WINDOWS, BookingAnalytics
+from booking_store import BOOKING_STATUSES, dumps_booking, open_booking_repository
+from fare_calendar import FLEX_DAY_OPTIONS, FareCalendar
+from flight_index import FlightIndex
+from flight_schema import materialize
+from instrumentation import PROFILING_ENABLED, REGISTRY, MetricsExporter, current_page, page_span, profiled, span
+from inventory import CITIES, CITY_AIRPORTS, INVENTORY_TTL, data_version
+from jobs import JobQueue
+from pagination import PAGE_SIZE, PAGE_SIZE_OPTIONS, RenderMeter, page_count, page_slice
+from pricing import PricingEngine
+from route_planner import MAX_STOPS, OBJECTIVES, RoutePlanner
+from search_cache import SearchCache, search_key
+from service import BookingService, FareExpired, load_shared_inventory, starting_seats
+from state_backend import SESSION_TTL, open_state_backend
+from static_assets import DESTINATION_CARDS_HTML, FEATURE_CARDS_HTML, FOOTER_HTML, HEADER_HTML, STYLESHEET
 
 # Page configuration
 st.set_page_config(
@@ -15,122 +35,186 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Custom CSS for styling
-st.markdown("""
-<style>
-    .main-header {
-        font-size: 2.5rem;
-        color: #1E3A8A;
-        text-align: center;
-        padding: 1rem;
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-        font-weight: bold;
-    }
-    .card {
-        background-color: #f8f9fa;
-        border-radius: 10px;
-        padding: 20px;
-        margin: 10px 0;
-        box-shadow: 0 4px 6px rgba(0,0,0,0.1);
-        border-left: 5px solid #3B82F6;
-    }
-    .flight-card {
-        background: white;
-        border-radius: 10px;
-        padding: 15px;
-        margin: 10px 0;
-        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-        transition: transform 0.3s;
-    }
-    .flight-card:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 4px 8px rgba(0,0,0,0.2);
-    }
-    .price-tag {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        color: white;
-        padding: 5px 15px;
-        border-radius: 20px;
-        font-weight: bold;
-    }
-    .stButton>button {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        color: white;
-        border: none;
-        padding: 10px 24px;
-        border-radius: 5px;
-        font-weight: bold;
-        width: 100%;
-    }
-    .booking-confirmed {
-        animation: pulse 2s infinite;
-    }
-    @keyframes pulse {
-        0% { transform: scale(1); }
-        50% { transform: scale(1.05); }
-        100% { transform: scale(1); }
-    }
-</style>
-""", unsafe_allow_html=True)
+# Stylesheet, pre-rendered once per process
+st.markdown(STYLESHEET, unsafe_allow_html=True)
 
 # Initialize session state
-if 'bookings' not in st.session_state:
-    st.session_state.bookings = []
 if 'user_info' not in st.session_state:
     st.session_state.user_info = {}
 if 'search_results' not in st.session_state:
     st.session_state.search_results = []
 
-# Sample flight data
-def generate_flight_data():
-    cities = ['New York', 'Los Angeles', 'Chicago', 'Miami', 'London', 'Paris', 
-              'Tokyo', 'Dubai', 'Sydney', 'Singapore', 'Delhi', 'Frankfurt']
-    
-    flights = []
-    airlines = ['SkyWings Airlines', 'Global Airways', 'Oceanic Airlines', 'Continental Express']
-    
-    for i in range(50):
-        departure = random.choice(cities)
-        arrival = random.choice([c for c in cities if c != departure])
-        departure_time = datetime.now() + timedelta(days=random.randint(1, 30), 
-                                                   hours=random.randint(0, 23))
-        duration = timedelta(hours=random.randint(1, 12))
-        arrival_time = departure_time + duration
-        
-        flight = {
-            'flight_number': f'SW{random.randint(1000, 9999)}',
-            'airline': random.choice(airlines),
-            'departure_city': departure,
-            'arrival_city': arrival,
-            'departure_time': departure_time,
-            'arrival_time': arrival_time,
-            'duration': duration,
-            'price': round(random.uniform(150, 1500), 2),
-            'available_seats': random.randint(5, 200),
-            'aircraft_type': random.choice(['Boeing 737', 'Airbus A320', 'Boeing 787', 'Airbus A350']),
-            'class': random.choice(['Economy', 'Premium Economy', 'Business', 'First'])
-        }
-        flights.append(flight)
-    
-    return pd.DataFrame(flights)
+# Seat counts, booking counters and session state shared with the other
+# worker processes, when there are any
+@st.cache_resource
+def get_state_backend():
+    return open_state_backend()
+
+# Shared flight inventory, built once per data version and reused by every
+# session; every worker generates the same flights for a version
+@st.cache_resource(ttl=INVENTORY_TTL, show_spinner="Loading flight inventory...")
+def get_inventory(version):
+    return load_shared_inventory(get_state_backend(), version)
+
+@st.cache_resource(ttl=INVENTORY_TTL, show_spinner="Indexing flights...")
+def get_flight_index(version):
+    return FlightIndex(get_inventory(version).flights)
+
+# Airport and city lookup behind the city pickers
+@st.cache_resource
+def get_airport_index():
+    return AirportIndex(load_airports())
+
+# Charting modules are imported by the pages that draw charts, keeping
+# plotly.express out of cold start and of the Home/Profile pages
+@st.cache_resource
+def get_route_figures():
+    from route_maps import RouteFigureCache
+    return RouteFigureCache()
+
+# Search results shared by every session running the same query; entries
+# are tagged with the inventory version they were computed from
+@st.cache_resource
+def get_search_cache():
+    return SearchCache()
+
+@st.cache_resource(ttl=INVENTORY_TTL, show_spinner="Building route graph...")
+def get_route_planner(version):
+    return RoutePlanner(get_inventory(version).flights)
+
+# Analytics counters, updated as bookings come in
+@st.cache_resource(ttl=INVENTORY_TTL)
+def get_flight_aggregates(version):
+    return FlightAggregates.from_flights(get_inventory(version).flights,
+                                         booking_counters=get_state_backend().counters(f'bookings:{version}'))
+
+# Fares repriced once per pricing epoch from seats sold and route demand;
+# demand counters and each epoch's fares are shared with the other workers
+@st.cache_resource(ttl=INVENTORY_TTL)
+def get_pricing_engine(version):
+    backend = get_state_backend()
+    return PricingEngine(get_inventory(version).flights, get_seat_inventory(version),
+                         backend.counters(f'demand:{version}'), backend, f'pricing:{version}')
+
+# Lowest fare per route, day and class, behind the Home page's flexible dates
+@st.cache_resource(ttl=INVENTORY_TTL)
+def get_fare_calendar(version):
+    return FareCalendar(get_inventory(version).flights)
+
+# Live seat counts, shared so every session and worker reserves from the same pool
+@st.cache_resource(ttl=INVENTORY_TTL)
+def get_seat_inventory(version):
+    backend = get_state_backend()
+    return backend.seat_inventory(version, starting_seats(get_inventory(version).flights, backend,
+                                                          get_booking_repository(), version))
+
+# Worker pool for booking side effects such as confirmation emails
+@st.cache_resource
+def get_job_queue():
+    return JobQueue()
+
+# Bookings live in a durable store shared by all sessions and workers
+@st.cache_resource
+def get_booking_repository():
+    return open_booking_repository()
+
+# Minute/hour/day rollups of the bookings made, behind the Analytics page;
+# shared with the other workers through the state backend
+@st.cache_resource
+def get_booking_analytics():
+    return BookingAnalytics(get_state_backend(), get_booking_repository())
+
+# Search, booking and cancellation, shared with the HTTP API (api.py). The
+# service reaches per-version resources through the cached getters above.
+@st.cache_resource
+def get_booking_service():
+    resources = SimpleNamespace(inventory=get_inventory, index=get_flight_index,
+                                seats=get_seat_inventory, pricing=get_pricing_engine,
+                                aggregates=get_flight_aggregates, fares=get_fare_calendar)
+    return BookingService(resources, get_booking_repository(), get_search_cache(), get_job_queue(),
+                          get_booking_analytics())
+
+# Metrics endpoint/file, plus counters other components already keep. The
+# collector runs on exporter threads, so it is bound to the objects here.
+@st.cache_resource
+def get_metrics_exporter():
+    search_cache, jobs = get_search_cache(), get_job_queue()
+    
+    def component_metrics():
+        cache = search_cache.stats()
+        for name in ('hits', 'misses', 'evictions', 'expirations', 'invalidations'):
+            yield f'skywings_search_cache_{name}_total', 'counter', f'Search cache {name}.', {}, cache[name]
+        yield 'skywings_search_cache_entries', 'gauge', 'Search cache entries.', {}, cache['entries']
+        yield 'skywings_search_cache_bytes', 'gauge', 'Bytes of cached search results.', {}, cache['bytes']
+        yield 'skywings_jobs_pending', 'gauge', 'Background jobs not yet finished.', {}, jobs.pending
+        yield 'skywings_jobs_failed_total', 'counter', 'Background jobs that raised.', {}, jobs.failed
+    
+    REGISTRY.add_collector(component_metrics)
+    return MetricsExporter()
+
+# Regions that rerun on their own when a widget inside them changes
+def fragment(label):
+    """st.fragment whose partial reruns are timed as page ``label``.
+
+    During a full rerun the fragment body is already inside main()'s
+    page_span, so only fragment-only reruns open one.
+    """
+    def decorate(fn):
+        @functools.wraps(fn)
+        def run(*args, **kwargs):
+            if current_page() is not None:
+                return fn(*args, **kwargs)
+            with page_span(label):
+                return fn(*args, **kwargs)
+        return st.fragment(run)
+    return decorate
 
 # Navigation
+NAV_PAGES = ["🏠 Home", "🔍 Find Flights", "📋 My Bookings", "📦 Group Bookings", "📊 Analytics", "👤 Profile"]
+
+def _on_navigate():
+    st.session_state.page = st.session_state.nav
+
 def navigation():
     st.sidebar.markdown("# ✈️ skywings Booking", )
     st.sidebar.title("SkyWings Booking")
-    page = st.sidebar.radio(
-        "Navigation",
-        ["🏠 Home", "🔍 Find Flights", "📋 My Bookings", "📊 Analytics", "👤 Profile"]
-    )
-    return page
+    # Buttons elsewhere switch pages through st.session_state.page; keep the radio in step
+    if st.session_state.page in NAV_PAGES:
+        st.session_state.nav = st.session_state.page
+    st.sidebar.radio("Navigation", NAV_PAGES, key="nav", on_change=_on_navigate)
+    return st.session_state.page
+
+# City pickers list the cities flown to, and take any airport code, city
+# or airport name typed in, resolved through the airport index
+def _city_label(city):
+    airport = CITY_AIRPORTS.get(city)
+    return f"{city} ({airport.iata})" if airport else city
+
+def city_picker(label, any_label=None, placeholder="Select City"):
+    """A served city, or None for ``any_label`` or no choice yet."""
+    options = ([any_label] if any_label else []) + CITIES
+    choice = st.selectbox(label, options, index=0 if any_label else None, placeholder=placeholder,
+                          format_func=_city_label, accept_new_options=True)
+    if choice is None or choice == any_label:
+        return None
+    if choice in CITY_AIRPORTS:
+        return choice
+    airports = get_airport_index()
+    airport = airports.resolve(choice)
+    if airport is None:
+        st.warning(f"No airport or city matches '{choice}'.")
+        return None
+    if airport.city in CITY_AIRPORTS:
+        return airport.city
+    nearest, km = airports.nearest(airport, CITY_AIRPORTS.values())
+    st.info(f"We don't fly to {airport.city} ({airport.iata}) yet; showing {nearest.city}, {km:,.0f} km away.")
+    return nearest.city
 
 # Home Page
 def home_page():
     col1, col2, col3 = st.columns([1, 2, 1])
     with col2:
-        st.markdown('<h1 class="main-header">✈️ SkyWings Flight Booking</h1>', unsafe_allow_html=True)
+        st.markdown(HEADER_HTML, unsafe_allow_html=True)
     
     st.markdown("---")
     
@@ -140,11 +224,9 @@ def home_page():
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        departure = st.selectbox("From", ['New York', 'Los Angeles', 'Chicago', 'Miami', 'London', 
-                                         'Paris', 'Tokyo', 'Dubai', 'Select City'], index=8)
+        departure = city_picker("From")
     with col2:
-        arrival = st.selectbox("To", ['New York', 'Los Angeles', 'Chicago', 'Miami', 'London', 
-                                     'Paris', 'Tokyo', 'Dubai', 'Select City'], index=8)
+        arrival = city_picker("To")
     with col3:
         departure_date = st.date_input("Departure Date", 
                                       datetime.now() + timedelta(days=7))
@@ -157,176 +239,258 @@ def home_page():
             st.session_state.page = "🔍 Find Flights"
             st.rerun()
     
+    if departure and arrival and departure != arrival:
+        flexible_dates(departure, arrival, departure_date, passengers)
+    
     st.markdown("---")
     
     # Features section
     st.subheader("🌟 Why Choose SkyWings?")
-    
-    col1, col2, col3 = st.columns(3)
-    
-    with col1:
-        st.markdown("""
-        <div class="card">
-            <h4>🚀 Best Prices</h4>
-            <p>Guaranteed lowest fares on all flights with price match promise.</p>
-        </div>
-        """, unsafe_allow_html=True)
-    
-    with col2:
-        st.markdown("""
-        <div class="card">
-            <h4>🛡️ Flexible Booking</h4>
-            <p>Free cancellation and easy date changes on most flights.</p>
-        </div>
-        """, unsafe_allow_html=True)
-    
-    with col3:
-        st.markdown("""
-        <div class="card">
-            <h4>⭐ Premium Service</h4>
-            <p>24/7 customer support and premium in-flight experience.</p>
-        </div>
-        """, unsafe_allow_html=True)
+    st.markdown(FEATURE_CARDS_HTML, unsafe_allow_html=True)
     
     # Popular destinations
     st.subheader("🌍 Popular Destinations")
+    st.markdown(DESTINATION_CARDS_HTML, unsafe_allow_html=True)
+
+@fragment('home:fares')
+def flexible_dates(departure, arrival, departure_date, passengers):
+    # Widening the window reruns only the calendar
+    st.subheader(f"📅 Flexible Dates: {departure} → {arrival}")
+    flex = st.select_slider("Days either side", FLEX_DAY_OPTIONS, value=FLEX_DAY_OPTIONS[len(FLEX_DAY_OPTIONS) // 2])
+    with span('fares'):
+        window = get_booking_service().fare_calendar(departure, arrival, departure_date, flex, data_version())
+    fares = pd.DataFrame(window.fares, columns=window.classes,
+                         index=[d.strftime('%a %d %b') + (' ◀' if d == departure_date else '') for d in window.dates])
+    lowest = fares.min()
+    if lowest.isna().all():
+        st.info("No seats on sale on this route around that date.")
+        return
     
-    destinations = [
-        {"city": "Paris", "price": "$499", "image": "🇫🇷"},
-        {"city": "Tokyo", "price": "$899", "image": "🇯🇵"},
-        {"city": "Dubai", "price": "$699", "image": "🇦🇪"},
-        {"city": "Sydney", "price": "$1299", "image": "🇦🇺"},
-    ]
-    
-    cols = st.columns(4)
-    for idx, dest in enumerate(destinations):
-        with cols[idx]:
-            st.markdown(f"""
-            <div style="text-align: center; padding: 20px; border-radius: 10px; 
-                        background: linear-gradient(135deg, #f5f7fa 0%, #c3cfe2 100%);">
-                <h1>{dest['image']}</h1>
-                <h4>{dest['city']}</h4>
-                <p style="color: #3B82F6; font-weight: bold;">From {dest['price']}</p>
-            </div>
-            """, unsafe_allow_html=True)
+    cheapest_class = lowest.idxmin()
+    total = f" (${lowest[cheapest_class] * passengers:,.0f} for {passengers})" if passengers > 1 else ""
+    st.caption(f"Lowest fare per passenger by departure day and class. Cheapest: {cheapest_class} "
+               f"on {fares[cheapest_class].idxmin().rstrip(' ◀')}, ${lowest[cheapest_class]:,.0f}{total}")
+    st.dataframe(fares.style.format("${:,.0f}", na_rep="–").highlight_min(axis=0, color="#d4edda"),
+                 use_container_width=True)
 
 # Flight Search Page
 def search_flights():
     st.title("🔍 Find & Book Flights")
     
-    # Search filters
+    with span('load'):
+        prices = get_booking_service().prices(data_version())
+    
+    # Search filters, applied together on submit so that dragging the
+    # price slider or picking several airlines runs one search, not one per change
     with st.expander("🔧 Advanced Filters", expanded=True):
-        col1, col2, col3 = st.columns(3)
-        
-        with col1:
-            departure = st.selectbox("Departure City", 
-                                   ['Any', 'New York', 'Los Angeles', 'Chicago', 'Miami', 
-                                    'London', 'Paris', 'Tokyo', 'Dubai', 'Sydney'])
-            airline = st.multiselect("Airlines", 
-                                   ['SkyWings Airlines', 'Global Airways', 
-                                    'Oceanic Airlines', 'Continental Express'],
-                                   default=['SkyWings Airlines', 'Global Airways'])
-        
-        with col2:
-            arrival = st.selectbox("Arrival City", 
-                                 ['Any', 'New York', 'Los Angeles', 'Chicago', 'Miami', 
-                                  'London', 'Paris', 'Tokyo', 'Dubai', 'Sydney'])
-            flight_class = st.selectbox("Class", 
-                                      ['Any', 'Economy', 'Premium Economy', 'Business', 'First'])
-        
-        with col3:
-            price_range = st.slider("Price Range ($)", 100, 2000, (200, 1000))
-            sort_by = st.selectbox("Sort by", 
-                                 ['Price: Low to High', 'Price: High to Low', 
-                                  'Duration', 'Departure Time'])
-    
-    # Generate sample flights
-    flights_df = generate_flight_data()
-    
-    # Apply filters
-    if departure != 'Any':
-        flights_df = flights_df[flights_df['departure_city'] == departure]
-    if arrival != 'Any':
-        flights_df = flights_df[flights_df['arrival_city'] == arrival]
-    if airline:
-        flights_df = flights_df[flights_df['airline'].isin(airline)]
-    if flight_class != 'Any':
-        flights_df = flights_df[flights_df['class'] == flight_class]
-    
-    flights_df = flights_df[(flights_df['price'] >= price_range[0]) & 
-                           (flights_df['price'] <= price_range[1])]
-    
-    # Sort results
-    if sort_by == 'Price: Low to High':
-        flights_df = flights_df.sort_values('price')
-    elif sort_by == 'Price: High to Low':
-        flights_df = flights_df.sort_values('price', ascending=False)
-    elif sort_by == 'Duration':
-        flights_df = flights_df.sort_values('duration')
-    else:
-        flights_df = flights_df.sort_values('departure_time')
+        with st.form("search_filters", border=False):
+            col1, col2, col3 = st.columns(3)
+            
+            with col1:
+                departure = city_picker("Departure City", any_label='Any')
+                airline = st.multiselect("Airlines", 
+                                       ['SkyWings Airlines', 'Global Airways', 
+                                        'Oceanic Airlines', 'Continental Express'],
+                                       default=['SkyWings Airlines', 'Global Airways'])
+            
+            with col2:
+                arrival = city_picker("Arrival City", any_label='Any')
+                flight_class = st.selectbox("Class", 
+                                          ['Any', 'Economy', 'Premium Economy', 'Business', 'First'])
+            
+            with col3:
+                # The slider reaches the priciest current fare, rounded up to $500
+                price_ceiling = max(2000, -(-int(prices.cents.max(initial=0) / 100) // 500) * 500)
+                price_range = st.slider("Price Range ($)", 100, price_ceiling, (200, 1000))
+                sort_by = st.selectbox("Sort by", 
+                                     ['Price: Low to High', 'Price: High to Low', 
+                                      'Duration', 'Departure Time'])
+            
+            st.form_submit_button("🔍 Apply Filters")
+    
+    sort_keys = {'Price: Low to High': 'price', 'Price: High to Low': '-price',
+                 'Duration': 'duration', 'Departure Time': 'departure_time'}
+    key = search_key(
+        departure=departure,
+        arrival=arrival,
+        airlines=airline,
+        flight_class=None if flight_class == 'Any' else flight_class,
+        price_range=price_range,
+        sort_by=sort_keys[sort_by],
+    )
     
-    st.session_state.search_results = flights_df.to_dict('records')
+    # Start from the first page, at the current fares, whenever the query changes
+    if st.session_state.get('results_query') != key:
+        st.session_state.results_query = key
+        st.session_state.results_page = 1
+        st.session_state.results_pricing = None
     
-    # Display results
-    st.subheader(f"📋 Found {len(flights_df)} Flights")
+    search_results(key)
+
+def _set_results_page(page):
+    st.session_state.results_page = page
+
+def _reset_results_page():
+    st.session_state.results_page = 1
+
+@fragment('search:results')
+def search_results(key):
+    # Paging, display options and "Book Now" rerun only this fragment;
+    # booking then switches page with a full rerun
+    service = get_booking_service()
+    with span('load'):
+        version = data_version()
+        flights_df = get_inventory(version).flights
+        seats = get_seat_inventory(version)
+    
+    # Answered from the shared cache, less flights that have sold out or departed since.
+    # Paging through results keeps the fares they were first shown at, and
+    # "Book Now" carries them to the booking card, while that epoch is kept.
+    with span('search'):
+        prices = (service.prices(version, st.session_state.get('results_pricing'))
+                  or service.prices(version))
+        st.session_state.results_pricing = prices.epoch
+        rows = service.search(key, version, prices.epoch)
+    
+    # Sessions keep row positions into the shared table; only the visible
+    # page is decoded and rendered
+    st.session_state.search_results = rows
     
-    if not flights_df.empty:
-        for idx, flight in flights_df.iterrows():
+    # Display results
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        st.subheader(f"📋 Found {len(rows)} Flights")
+    with col2:
+        page_size = st.selectbox("Results per page", PAGE_SIZE_OPTIONS,
+                                 index=PAGE_SIZE_OPTIONS.index(PAGE_SIZE), on_change=_reset_results_page)
+    with col3:
+        combined_map = st.checkbox("Show all routes on one map")
+    
+    page_rows, page = page_slice(rows, st.session_state.results_page, page_size)
+    st.session_state.results_page = page
+    with span('materialize'):
+        page_df = materialize(flights_df, page_rows)
+        page_df['price'] = prices.cents[page_rows] / 100
+        page_df['pricing_epoch'] = prices.epoch
+    
+    departure, arrival = key[0], key[1]
+    if len(rows):
+        meter = RenderMeter()
+        if combined_map:
+            from route_maps import combined_route_figure
+            with span('figures'):
+                fig = combined_route_figure(zip(page_df['departure_city'], page_df['arrival_city']))
+            meter.figure(len(fig.to_json()))
+            st.plotly_chart(fig, use_container_width=True)
+        
+        for row, flight in zip(page_rows, page_df.to_dict('records')):
             col1, col2, col3 = st.columns([3, 2, 1])
             
             with col1:
-                st.markdown(f"""
+                st.markdown(meter.html(f"""
                 <div class="flight-card">
                     <h4>{flight['departure_city']} → {flight['arrival_city']}</h4>
                     <p><strong>{flight['airline']}</strong> • {flight['flight_number']}</p>
                     <p>🛫 {flight['departure_time'].strftime('%b %d, %Y %H:%M')}</p>
                     <p>🛬 {flight['arrival_time'].strftime('%b %d, %Y %H:%M')}</p>
                     <p>⏱️ {str(flight['duration'])[:4]} hours • {flight['class']} Class</p>
-                    <p>✈️ {flight['aircraft_type']} • 🪑 {flight['available_seats']} seats left</p>
+                    <p>✈️ {flight['aircraft_type']} • 🪑 {seats.available(row)} seats left</p>
                 </div>
-                """, unsafe_allow_html=True)
+                """), unsafe_allow_html=True)
             
-            with col2:
-                # Flight path visualization
-                fig = go.Figure(go.Scattergeo(
-                    lon = [random.randint(-180, 180), random.randint(-180, 180)],
-                    lat = [random.randint(-90, 90), random.randint(-90, 90)],
-                    mode = 'lines+markers',
-                    line = dict(width=2, color='blue'),
-                    marker = dict(size=8, color=['green', 'red']),
-                    text = [flight['departure_city'], flight['arrival_city']],
-                ))
-                
-                fig.update_layout(
-                    geo=dict(
-                        showland=True,
-                        landcolor="rgb(243, 243, 243)",
-                        countrycolor="rgb(204, 204, 204)",
-                    ),
-                    height=150,
-                    margin=dict(l=0, r=0, t=0, b=0),
-                    showlegend=False
-                )
-                st.plotly_chart(fig, use_container_width=True)
+            if not combined_map:
+                with col2:
+                    # Flight path visualization
+                    with span('figures'):
+                        route = get_route_figures().get(flight['departure_city'], flight['arrival_city'])
+                    if route is not None:
+                        meter.figure(route.payload_bytes)
+                        st.plotly_chart(route.figure, use_container_width=True, key=f"route_{row}")
             
             with col3:
-                st.markdown(f"""
+                st.markdown(meter.html(f"""
                 <div style="text-align: center;">
                     <h2 style="color: #3B82F6;">${flight['price']}</h2>
                     <p style="font-size: 0.8em;">per passenger</p>
                 </div>
-                """, unsafe_allow_html=True)
+                """), unsafe_allow_html=True)
                 
-                if st.button(f"Book Now", key=f"book_{idx}"):
-                    st.session_state.selected_flight = flight.to_dict()
-                    st.session_state.page = "booking_form"
-                    st.rerun()
+                if st.button(f"Book Now", key=f"book_{row}"):
+                    # Hold a seat while the passenger fills in the form
+                    hold = service.reserve(row, version=version)
+                    if hold is None:
+                        st.error("Sorry, this flight just sold out.")
+                    else:
+                        release_seat_hold()
+                        st.session_state.seat_hold = (version, hold['hold_id'])
+                        st.session_state.selected_flight = flight
+                        st.session_state.page = "booking_form"
+                        st.rerun()
             
             st.markdown("---")
+        
+        # Pagination controls; the page changes in the click callback, so
+        # a click costs one fragment rerun
+        pages = page_count(len(rows), page_size)
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col1:
+            st.button("◀ Previous", disabled=page <= 1, on_click=_set_results_page, args=(page - 1,))
+        with col2:
+            stats = meter.stats()
+            st.caption(f"Page {page} of {pages} • rendered in {stats['render_ms']:.0f} ms • "
+                       f"{stats['payload_bytes'] / 1024:.1f} KB payload • "
+                       f"{service.search_cache.stats()['hit_rate']:.0%} search cache hits")
+            st.session_state.render_stats = stats
+        with col3:
+            st.button("Next ▶", disabled=page >= pages, on_click=_set_results_page, args=(page + 1,))
+    elif departure and arrival:
+        st.warning(f"No direct flights from {departure} to {arrival} match your criteria.")
+        connecting_flights(version, departure, arrival)
     else:
         st.warning("No flights found matching your criteria. Try adjusting your filters.")
 
+def connecting_flights(version, departure, arrival):
+    st.subheader("🔀 Connecting Itineraries")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        objective = st.selectbox("Optimize for", OBJECTIVES,
+                                 format_func=lambda o: o.replace('_', ' ').capitalize())
+    with col2:
+        max_stops = st.slider("Maximum stops", 1, 3, MAX_STOPS)
+    
+    flights_df = get_inventory(version).flights
+    with span('route_planning'):
+        itineraries = get_route_planner(version).plan(
+            departure, arrival, datetime.now(), horizon_hours=31 * 24,
+            objective=objective, max_stops=max_stops, prices=get_booking_service().prices(version))
+    
+    if not itineraries:
+        st.info("No connecting itineraries found either. Try another route.")
+        return
+    
+    for itinerary in itineraries:
+        legs = materialize(flights_df, itinerary.flight_ids)
+        hours = (itinerary.arrival_time - itinerary.departure_time).total_seconds() / 3600
+        stops = ' → '.join([legs['departure_city'].iat[0], *legs['arrival_city']])
+        leg_lines = ''.join(
+            f"<p>✈️ {leg['airline']} • {leg['flight_number']} • {leg['departure_city']} → "
+            f"{leg['arrival_city']} • 🛫 {leg['departure_time'].strftime('%b %d %H:%M')}</p>"
+            for _, leg in legs.iterrows())
+        st.markdown(f"""
+        <div class="flight-card">
+            <h4>{stops}</h4>
+            <p><strong>${itinerary.price:,.2f}</strong> • {hours:.0f} hours • {itinerary.stops} stop(s)</p>
+            {leg_lines}
+        </div>
+        """, unsafe_allow_html=True)
+
+def release_seat_hold():
+    if st.session_state.get('seat_hold'):
+        version, hold = st.session_state.seat_hold
+        get_booking_service().release(hold, version)
+        st.session_state.seat_hold = None
+
 # Booking Form
 def booking_form():
     if 'selected_flight' not in st.session_state:
@@ -337,6 +501,14 @@ def booking_form():
     
     st.title("📝 Complete Your Booking")
     
+    if st.session_state.get('fare_notice'):
+        st.warning(st.session_state.pop('fare_notice'))
+    if st.session_state.get('seat_hold'):
+        version, hold = st.session_state.seat_hold
+        remaining = get_booking_service().hold_expires_in(hold, version)
+        if remaining:
+            st.info(f"🪑 Your seat is held for {remaining / 60:.0f} more minutes.")
+    
     col1, col2 = st.columns(2)
     
     with col1:
@@ -355,181 +527,337 @@ def booking_form():
     
     with col2:
         st.subheader("Passenger Information")
+        passenger_form(flight)
+
+@fragment('booking_form:form')
+def passenger_form(flight):
+    # Validation errors rerun only the form; a confirmed booking or a
+    # cancel switches page with a full rerun
+    with st.form("booking_form"):
+        st.write("Primary Passenger")
+        first_name = st.text_input("First Name")
+        last_name = st.text_input("Last Name")
+        email = st.text_input("Email Address")
+        phone = st.text_input("Phone Number")
         
-        with st.form("booking_form"):
-            st.write("Primary Passenger")
-            first_name = st.text_input("First Name")
-            last_name = st.text_input("Last Name")
-            email = st.text_input("Email Address")
-            phone = st.text_input("Phone Number")
-            
-            st.write("Additional Information")
-            passport = st.text_input("Passport Number")
-            dob = st.date_input("Date of Birth", datetime.now() - timedelta(days=365*30))
-            
-            # Seat selection
-            st.write("Seat Preference")
-            seat_pref = st.radio("Seat", ["Aisle", "Window", "No Preference"])
-            
-            # Meal preference
-            meal = st.selectbox("Meal Preference", 
-                              ["Standard", "Vegetarian", "Vegan", "Kosher", "Halal", "No Meal"])
-            
-            # Payment
-            st.write("Payment Method")
-            payment = st.selectbox("Payment Method", 
-                                 ["Credit Card", "Debit Card", "PayPal", "Apple Pay"])
-            
-            col1, col2 = st.columns(2)
-            with col1:
-                submit = st.form_submit_button("Confirm Booking", type="primary")
-            with col2:
-                if st.form_submit_button("Cancel"):
-                    st.session_state.page = "🔍 Find Flights"
-                    st.rerun()
+        st.write("Additional Information")
+        passport = st.text_input("Passport Number")
+        dob = st.date_input("Date of Birth", datetime.now() - timedelta(days=365*30))
+        
+        # Seat selection
+        st.write("Seat Preference")
+        seat_pref = st.radio("Seat", ["Aisle", "Window", "No Preference"])
+        
+        # Meal preference
+        meal = st.selectbox("Meal Preference", 
+                          ["Standard", "Vegetarian", "Vegan", "Kosher", "Halal", "No Meal"])
+        
+        # Payment
+        st.write("Payment Method")
+        payment = st.selectbox("Payment Method", 
+                             ["Credit Card", "Debit Card", "PayPal", "Apple Pay"])
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            submit = st.form_submit_button("Confirm Booking", type="primary")
+        with col2:
+            if st.form_submit_button("Cancel"):
+                release_seat_hold()
+                st.session_state.page = "🔍 Find Flights"
+                st.rerun()
+        
+        if submit:
+            if not all([first_name, last_name, email, phone]):
+                st.error("Please fill in all required fields")
+                return
             
-            if submit:
-                if all([first_name, last_name, email, phone]):
-                    # Create booking record
-                    booking = {
-                        'booking_id': f'BK{random.randint(100000, 999999)}',
-                        'flight': flight,
-                        'passenger': {
-                            'first_name': first_name,
-                            'last_name': last_name,
-                            'email': email,
-                            'phone': phone,
-                            'passport': passport,
-                            'dob': dob,
-                            'seat_preference': seat_pref,
-                            'meal_preference': meal
-                        },
-                        'payment_method': payment,
-                        'booking_date': datetime.now(),
-                        'status': 'Confirmed'
-                    }
-                    
-                    st.session_state.bookings.append(booking)
-                    st.session_state.user_info = booking['passenger']
-                    
-                    # Show confirmation
-                    st.balloons()
-                    st.success("🎉 Booking Confirmed!")
-                    
-                    st.markdown(f"""
-                    <div class="card booking-confirmed">
-                        <h3>Booking Confirmation: {booking['booking_id']}</h3>
-                        <p>An email confirmation has been sent to {email}</p>
-                        <p>You can view your booking in the "My Bookings" section</p>
-                    </div>
-                    """, unsafe_allow_html=True)
-                    
-                    # Add delay before redirecting
-                    import time
-                    time.sleep(3)
-                    st.session_state.page = "📋 My Bookings"
-                    st.rerun()
-                else:
-                    st.error("Please fill in all required fields")
+            passenger = {
+                'first_name': first_name,
+                'last_name': last_name,
+                'email': email,
+                'phone': phone,
+                'passport': passport,
+                'dob': dob,
+                'seat_preference': seat_pref,
+                'meal_preference': meal
+            }
+            version, hold = st.session_state.get('seat_hold') or (data_version(), None)
+            service = get_booking_service()
+            # The email goes out in the background; confirm right away
+            try:
+                with span('store_booking'):
+                    booking = service.confirm(flight, passenger, payment, hold_id=hold, version=version,
+                                              owner=st.session_state.session_id)
+            except FareExpired:
+                # A page left open past its pricing epoch: quote again and
+                # let the passenger confirm at the new fare, seat still held
+                fresh = service.flight(flight['flight_id'], version)
+                if fresh is None:
+                    st.error("This flight is no longer offered; please search again.")
+                    return
+                st.session_state.selected_flight = fresh
+                st.session_state.fare_notice = (f"Fares have changed since you chose this flight: it is now "
+                                                f"${fresh['price']}. Check the new total and confirm again.")
+                st.rerun()
+            st.session_state.seat_hold = None
+            if booking is None:
+                st.error("Sorry, this flight is sold out or has already departed.")
+            else:
+                st.session_state.user_info = booking['passenger']
+                st.session_state.confirmed_booking = booking
+                st.session_state.page = "booking_confirmed"
+                st.rerun()
+
+# Booking Confirmation
+def booking_confirmation():
+    booking = st.session_state.get('confirmed_booking')
+    if booking is None:
+        st.session_state.page = "📋 My Bookings"
+        st.rerun()
+    
+    st.balloons()
+    st.success("🎉 Booking Confirmed!")
+    
+    st.markdown(f"""
+    <div class="card booking-confirmed">
+        <h3>Booking Confirmation: {booking['booking_id']}</h3>
+        <p>An email confirmation is on its way to {booking['passenger']['email']}</p>
+        <p>You can view your booking in the "My Bookings" section</p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    col1, col2, col3 = st.columns([1, 1, 1])
+    with col2:
+        if st.button("📋 View My Bookings", use_container_width=True):
+            st.session_state.confirmed_booking = None
+            st.session_state.page = "📋 My Bookings"
+            st.rerun()
 
 # My Bookings Page
 def my_bookings():
     st.title("📋 My Bookings")
     
-    if not st.session_state.bookings:
+    # Indexed lookup by the profile email, but only bookings made in this
+    # session are shown: anyone can type an email into their profile
+    email = st.session_state.user_info.get('email')
+    with span('load'):
+        bookings = get_booking_service().bookings(email, st.session_state.session_id)
+    
+    if not bookings:
         st.info("You have no bookings yet. Search for flights to get started!")
         if st.button("🔍 Search Flights"):
             st.session_state.page = "🔍 Find Flights"
             st.rerun()
         return
     
-    for booking in st.session_state.bookings:
-        flight = booking['flight']
-        passenger = booking['passenger']
-        
-        col1, col2 = st.columns([3, 1])
-        
-        with col1:
-            st.markdown(f"""
-            <div class="flight-card">
-                <div style="display: flex; justify-content: space-between; align-items: center;">
-                    <div>
-                        <h4>{flight['departure_city']} → {flight['arrival_city']}</h4>
-                        <p><strong>Booking ID:</strong> {booking['booking_id']}</p>
-                        <p><strong>Status:</strong> <span style="color: green;">{booking['status']}</span></p>
-                    </div>
-                    <div style="text-align: right;">
-                        <h3 style="color: #3B82F6;">${flight['price']}</h3>
-                        <p>Booked on {booking['booking_date'].strftime('%b %d, %Y')}</p>
-                    </div>
+    for booking in bookings:
+        booking_row(booking)
+
+@fragment('my_bookings:row')
+def booking_row(booking):
+    # Modify and Cancel rerun only this booking's row. The buttons are
+    # handled before the card is drawn so a cancellation shows at once;
+    # fragment reruns reuse this dict, so its status is updated in place.
+    flight = booking['flight']
+    passenger = booking['passenger']
+    
+    col1, col2 = st.columns([3, 1])
+    
+    with col2:
+        col3, col4 = st.columns(2)
+        with col3:
+            if st.button("✏️ Modify", key=f"modify_{booking['booking_id']}"):
+                st.info("Modification feature coming soon!")
+        with col4:
+            if st.button("❌ Cancel", key=f"cancel_{booking['booking_id']}"):
+                if booking['status'] != 'Cancelled':
+                    get_booking_service().cancel(booking['booking_id'], st.session_state.session_id)
+                    booking['status'] = 'Cancelled'
+                st.success("Booking cancelled successfully!")
+    
+    with col1:
+        st.markdown(f"""
+        <div class="flight-card">
+            <div style="display: flex; justify-content: space-between; align-items: center;">
+                <div>
+                    <h4>{flight['departure_city']} → {flight['arrival_city']}</h4>
+                    <p><strong>Booking ID:</strong> {booking['booking_id']}</p>
+                    <p><strong>Status:</strong> <span style="color: green;">{booking['status']}</span></p>
+                </div>
+                <div style="text-align: right;">
+                    <h3 style="color: #3B82F6;">${flight['price']}</h3>
+                    <p>Booked on {booking['booking_date'].strftime('%b %d, %Y')}</p>
                 </div>
-                <p><strong>Passenger:</strong> {passenger['first_name']} {passenger['last_name']}</p>
-                <p><strong>Flight:</strong> {flight['airline']} • {flight['flight_number']}</p>
-                <p><strong>Departure:</strong> {flight['departure_time'].strftime('%b %d, %Y %H:%M')}</p>
-                <p><strong>Class:</strong> {flight['class']} • <strong>Seat:</strong> {passenger['seat_preference']}</p>
             </div>
-            """, unsafe_allow_html=True)
-        
-        with col2:
-            col1, col2 = st.columns(2)
-            with col1:
-                if st.button("✏️ Modify", key=f"modify_{booking['booking_id']}"):
-                    st.info("Modification feature coming soon!")
-            with col2:
-                if st.button("❌ Cancel", key=f"cancel_{booking['booking_id']}"):
-                    booking['status'] = 'Cancelled'
-                    st.success("Booking cancelled successfully!")
-                    st.rerun()
-        
-        st.markdown("---")
+            <p><strong>Passenger:</strong> {passenger['first_name']} {passenger['last_name']}</p>
+            <p><strong>Flight:</strong> {flight['airline']} • {flight['flight_number']}</p>
+            <p><strong>Departure:</strong> {flight['departure_time'].strftime('%b %d, %Y %H:%M')}</p>
+            <p><strong>Class:</strong> {flight['class']} • <strong>Seat:</strong> {passenger['seat_preference']}</p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    st.markdown("---")
 
 # Analytics Page
 def analytics_page():
+    from analytics_charts import price_histogram_figure, top_destinations_figure
+    
     st.title("📊 Travel Analytics")
     
-    # Generate analytics data
-    flights_df = generate_flight_data()
+    # Render from the incrementally maintained aggregates, at the fares
+    # the booking flow currently charges
+    version = data_version()
+    with span('load'):
+        aggregates = get_flight_aggregates(version)
+        aggregates.reprice(get_booking_service().prices(version))
+        summary = aggregates.summary()
     
-    col1, col2, col3 = st.columns(3)
+    col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        avg_price = flights_df['price'].mean()
-        st.metric("Average Flight Price", f"${avg_price:.2f}")
+        st.metric("Average Flight Price", f"${summary['avg_price']:.2f}")
     
     with col2:
-        total_flights = len(flights_df)
-        st.metric("Available Flights", total_flights)
+        st.metric("Available Flights", summary['total_flights'])
     
     with col3:
-        popular_dest = flights_df['arrival_city'].mode()[0]
-        st.metric("Most Popular Destination", popular_dest)
+        st.metric("Most Popular Destination", summary['popular_destination'])
     
-    # Charts
+    with col4:
+        st.metric("Bookings", summary['bookings'])
+    
+    # Charts, each a fragment so a chart's own controls redraw only that chart
     col1, col2 = st.columns(2)
     
     with col1:
         # Price distribution
-        fig = px.histogram(flights_df, x='price', nbins=20,
-                          title="Flight Price Distribution",
-                          labels={'price': 'Price ($)'})
-        st.plotly_chart(fig, use_container_width=True)
+        analytics_chart(price_histogram_figure, summary)
     
     with col2:
         # Popular destinations
-        dest_counts = flights_df['arrival_city'].value_counts().head(10)
-        fig = px.bar(x=dest_counts.index, y=dest_counts.values,
-                    title="Top 10 Destinations",
-                    labels={'x': 'City', 'y': 'Number of Flights'})
-        st.plotly_chart(fig, use_container_width=True)
-    
-    # Flight duration analysis
-    flights_df['duration_hours'] = flights_df['duration'].dt.total_seconds() / 3600
-    
-    fig = px.scatter(flights_df, x='duration_hours', y='price',
-                    color='class', hover_data=['departure_city', 'arrival_city'],
-                    title="Flight Duration vs Price by Class")
+        analytics_chart(top_destinations_figure, summary)
+    
+    duration_price_chart(summary)
+    
+    st.markdown("---")
+    booking_analytics_section()
+
+@fragment('analytics:chart')
+def analytics_chart(build, summary):
+    with span('figures'):
+        fig = build(summary)
     st.plotly_chart(fig, use_container_width=True)
 
+@fragment('analytics:chart')
+def duration_price_chart(summary):
+    from analytics_charts import SCATTER_MODES, duration_price_figure, scatter_mode
+    
+    # Flight duration analysis, switching rendering mode as the inventory grows
+    mode = st.selectbox("Duration vs price rendering", SCATTER_MODES,
+                        format_func=lambda m: f"auto ({scatter_mode(summary)})" if m == 'auto' else m)
+    start = time.perf_counter()
+    with span('figures'):
+        fig = duration_price_figure(summary, mode)
+    st.plotly_chart(fig, use_container_width=True)
+    st.caption(f"Built in {(time.perf_counter() - start) * 1000:.0f} ms • "
+               f"{len(fig.to_json()) / 1024:.1f} KB payload")
+
+@fragment('analytics:bookings')
+def booking_analytics_section():
+    from analytics_charts import (booking_series_figure, class_revenue_figure, preference_mix_figure,
+                                  route_revenue_figure)
+    
+    # Bookings made, read from the rollups rather than the booking store
+    st.subheader("Bookings")
+    window = st.selectbox("Window", list(WINDOWS), index=1)
+    resolution, buckets = WINDOWS[window]
+    analytics = get_booking_analytics()
+    with span('load'):
+        series = analytics.series(resolution, buckets)
+        summary = analytics.summary(resolution, buckets)
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Bookings", summary['bookings'])
+    with col2:
+        st.metric("Revenue", f"${summary['revenue']:,.2f}")
+    with col3:
+        st.metric("Cancellation Rate", f"{summary['cancellation_rate']:.1%}")
+    with col4:
+        st.metric("Top Route", next(iter(summary['bookings_by_route']), "—"))
+    
+    with span('figures'):
+        st.plotly_chart(booking_series_figure(series), use_container_width=True)
+        col1, col2 = st.columns(2)
+        with col1:
+            st.plotly_chart(route_revenue_figure(summary), use_container_width=True)
+        with col2:
+            st.plotly_chart(class_revenue_figure(summary), use_container_width=True)
+        st.plotly_chart(preference_mix_figure(summary), use_container_width=True)
+    st.download_button("⬇️ Download Series", series.to_csv(index=False),
+                       file_name=f"bookings_by_{resolution}.csv", mime="text/csv")
+
+# Group Bookings Page
+def group_bookings_page():
+    st.title("📦 Group Bookings")
+    
+    st.subheader("Import Passengers")
+    st.caption("CSV or Parquet, one row per passenger: first_name, last_name, email, phone, and either "
+               "flight_id or flight_number + departure_date (+ class). Optional: passport, "
+               "seat_preference, meal_preference.")
+    with st.form("group_import"):
+        uploaded = st.file_uploader("Passenger file", type=['csv', 'parquet'])
+        payment = st.selectbox("Payment Method", ["Invoice", "Credit Card", "Debit Card", "PayPal"])
+        all_or_nothing = st.checkbox("Book every passenger or none")
+        submit = st.form_submit_button("Book Passengers", type="primary")
+    
+    if submit and uploaded is not None:
+        try:
+            with span('load'):
+                passengers = read_passengers(uploaded, uploaded.name)
+            with span('store_booking'):
+                st.session_state.import_results = import_bookings(
+                    get_booking_service(), passengers, payment, version=data_version(),
+                    all_or_nothing=all_or_nothing, owner=st.session_state.session_id)
+        except ValueError as exc:
+            st.error(f"Could not import {uploaded.name}: {exc}")
+    
+    results = st.session_state.get('import_results')
+    if results is not None:
+        booked = int((results['status'] == 'booked').sum())
+        if booked == len(results):
+            st.success(f"Booked all {booked} passengers.")
+        else:
+            st.warning(f"Booked {booked} of {len(results)} passengers; see the errors below.")
+        st.dataframe(results, hide_index=True, use_container_width=True)
+        st.download_button("⬇️ Download Results", results.to_csv(index=False), file_name="import_results.csv",
+                           mime="text/csv")
+    
+    st.markdown("---")
+    st.subheader("Export Bookings")
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        since = st.date_input("Booked from", value=None)
+    with col2:
+        until = st.date_input("Booked until", value=None)
+    with col3:
+        status = st.selectbox("Status", ["All", *BOOKING_STATUSES])
+    with col4:
+        fmt = st.selectbox("Format", list(EXPORT_FORMATS), format_func=str.upper)
+    
+    # Generated only on request, and kept for these filters until they
+    # change; the HTTP API streams the same export (GET /bookings/export)
+    # for stores too large for one download
+    params = (since, until, status, fmt)
+    if st.button("📦 Prepare Export"):
+        with span('load'):
+            st.session_state.booking_export = (params, b''.join(export_bookings(
+                get_booking_repository(), fmt, since=since, until=until and until + timedelta(days=1),
+                status=None if status == "All" else status)))
+    export = st.session_state.get('booking_export')
+    if export is not None and export[0] == params:
+        st.download_button("⬇️ Export Bookings", export[1], file_name=f"bookings.{fmt}", mime=EXPORT_FORMATS[fmt])
+
 # Profile Page
 def profile_page():
     st.title("👤 My Profile")
@@ -592,7 +920,52 @@ def profile_page():
                     st.error("Please fill in all required fields")
 
 # Main App
+PAGE_METRIC_LABELS = {"🏠 Home": "home", "🔍 Find Flights": "search", "📋 My Bookings": "my_bookings",
+                      "📦 Group Bookings": "group_bookings", "📊 Analytics": "analytics", "👤 Profile": "profile"}
+
+# Session state a browser must keep when its reconnect lands on another
+# worker. The session is named by ?session= in the URL, so no sticky load
+# balancing is needed. The URL is a bearer token that gets shared and
+# logged, so passenger documents stay out of the snapshot.
+SHARED_SESSION_KEYS = ('page', 'user_info', 'selected_flight', 'seat_hold', 'confirmed_booking')
+PRIVATE_PASSENGER_FIELDS = ('passport', 'dob')
+
+def _without_private(passenger):
+    return passenger and {k: v for k, v in passenger.items() if k not in PRIVATE_PASSENGER_FIELDS}
+
+def _session_snapshot():
+    snapshot = {key: st.session_state.get(key) for key in SHARED_SESSION_KEYS}
+    snapshot['user_info'] = _without_private(snapshot['user_info'])
+    if snapshot['confirmed_booking']:
+        booking = snapshot['confirmed_booking']
+        snapshot['confirmed_booking'] = dict(booking, passenger=_without_private(booking['passenger']))
+    return snapshot
+
+def restore_session():
+    if 'session_id' in st.session_state:
+        return
+    session_id = st.query_params.get('session')
+    snapshot = get_state_backend().get(f'session:{session_id}') if session_id else None
+    if snapshot is None:
+        # Ids are only ever made here, never taken from a link, so nobody
+        # can hand out a session id and wait for it to fill up
+        session_id = secrets.token_urlsafe(16)
+        st.query_params['session'] = session_id
+    else:
+        st.session_state.update(snapshot)
+    st.session_state.session_id = session_id
+
+def save_session():
+    # Written only when something changed, not on every rerun
+    snapshot = _session_snapshot()
+    payload = dumps_booking(snapshot)
+    if st.session_state.get('saved_session') != payload:
+        get_state_backend().set(f'session:{st.session_state.session_id}', snapshot, ttl=SESSION_TTL)
+        st.session_state.saved_session = payload
+
 def main():
+    restore_session()
+    
     # Initialize page in session state
     if 'page' not in st.session_state:
         st.session_state.page = "🏠 Home"
@@ -600,31 +973,40 @@ def main():
     # Navigation
     page = navigation()
     
-    # Page routing
-    if page == "🏠 Home":
-        home_page()
-    elif page == "🔍 Find Flights":
-        search_flights()
-    elif page == "📋 My Bookings":
-        my_bookings()
-    elif page == "📊 Analytics":
-        analytics_page()
-    elif page == "👤 Profile":
-        profile_page()
+    # Page routing, timed per page; ?profile=cprofile|pyinstrument profiles the rerun
+    get_metrics_exporter()
+    profiler = st.query_params.get('profile') if PROFILING_ENABLED else None
+    try:
+        with page_span(PAGE_METRIC_LABELS.get(page, page)), profiled(profiler) as profile:
+            if page == "🏠 Home":
+                home_page()
+            elif page == "🔍 Find Flights":
+                search_flights()
+            elif page == "📋 My Bookings":
+                my_bookings()
+            elif page == "📦 Group Bookings":
+                group_bookings_page()
+            elif page == "📊 Analytics":
+                analytics_page()
+            elif page == "👤 Profile":
+                profile_page()
+            elif page == "booking_form":
+                booking_form()
+            elif page == "booking_confirmed":
+                booking_confirmation()
+    finally:
+        # Also on st.rerun(), which unwinds through here
+        save_session()
+    
+    if profile.error:
+        st.warning(profile.error)
+    if profile.report:
+        with st.expander(f"⏱️ {profile.kind} profile of this rerun"):
+            st.code(profile.report)
     
     # Footer
     st.markdown("---")
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        st.markdown("**SkyWings Booking**")
-        st.markdown("© 2024 All rights reserved")
-    with col2:
-        st.markdown("**Contact Us**")
-        st.markdown("📞 +1 (800) FLY-SKYWING")
-        st.markdown("✉️ support@skywings.com")
-    with col3:
-        st.markdown("**Follow Us**")
-        st.markdown("🐦 Twitter • 📘 Facebook • 📸 Instagram")
+    st.markdown(FOOTER_HTML, unsafe_allow_html=True)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,277 @@
+# batch_bookings.py
+"""Group bookings from passenger files, and streaming booking exports.
+
+An import file is CSV or Parquet with one row per passenger:
+
+    first_name, last_name, email, phone      required
+    flight_id                                the id search results and the API report, or
+    flight_number, departure_date[, class]   e.g. GA8216, 2026-10-22, Business
+    passport, seat_preference, meal_preference   optional
+
+Rows are checked column by column, seats for the whole file are sold in
+one seat-inventory transaction (each flight's group together or not at
+all), and the bookings are written in one booking-store transaction.
+Exports read the store in batches and yield the file a batch at a time,
+so neither side holds every booking in memory.
+"""
+import csv
+import io
+import itertools
+import os
+from datetime import date, datetime, time
+
+import numpy as np
+import pandas as pd
+
+from notifications import send_booking_confirmation
+from pricing import wall_clock
+from service import PASSENGER_FIELDS, new_booking
+
+OPTIONAL_FIELDS = ('passport', 'seat_preference', 'meal_preference')
+BATCH_MAX_ROWS = int(os.environ.get('SKYWINGS_BATCH_MAX_ROWS', 10_000))
+EXPORT_BATCH_ROWS = int(os.environ.get('SKYWINGS_EXPORT_BATCH_ROWS', 1000))
+EMAIL_PATTERN = r'[^@\s]+@[^@\s]+\.[^@\s]+'
+EXPORT_FORMATS = {'csv': 'text/csv', 'parquet': 'application/vnd.apache.parquet'}
+
+# One column per exported field: (name, Parquet type, booking -> value)
+EXPORT_COLUMNS = (
+    ('booking_id', 'string', lambda b: b['booking_id']),
+    ('status', 'string', lambda b: b['status']),
+    ('booking_date', 'timestamp', lambda b: b['booking_date']),
+    ('inventory_version', 'string', lambda b: b.get('inventory_version')),
+    ('payment_method', 'string', lambda b: b['payment_method']),
+    ('first_name', 'string', lambda b: b['passenger']['first_name']),
+    ('last_name', 'string', lambda b: b['passenger']['last_name']),
+    ('email', 'string', lambda b: b['passenger']['email']),
+    ('phone', 'string', lambda b: b['passenger']['phone']),
+    ('flight_id', 'int', lambda b: b['flight']['flight_id']),
+    ('flight_number', 'string', lambda b: b['flight']['flight_number']),
+    ('airline', 'string', lambda b: b['flight']['airline']),
+    ('departure_city', 'string', lambda b: b['flight']['departure_city']),
+    ('arrival_city', 'string', lambda b: b['flight']['arrival_city']),
+    ('departure_time', 'timestamp', lambda b: b['flight']['departure_time']),
+    ('class', 'string', lambda b: b['flight']['class']),
+    ('price', 'float', lambda b: b['flight']['price']),
+)
+
+
+def read_passengers(source, name=None):
+    """Read a passenger file from a path or file object; Parquet by extension, else CSV."""
+    name = name or (source if isinstance(source, str) else getattr(source, 'name', ''))
+    if str(name).lower().endswith(('.parquet', '.pq')):
+        passengers = pd.read_parquet(source)
+    else:
+        # Everything as text, so phone numbers and ids keep their leading zeros
+        passengers = pd.read_csv(source, dtype=str, keep_default_na=False, skipinitialspace=True)
+    passengers.columns = [str(column).strip().lower().replace(' ', '_') for column in passengers.columns]
+    return passengers
+
+
+def _resolve_flights(passengers, flights):
+    # Flight row ids (-1 if unresolved) and an error per row, from flight_id
+    # where given, else flight_number + departure_date (+ class)
+    ids = np.full(len(passengers), -1, dtype=np.int64)
+    errors = np.full(len(passengers), "Give a flight_id, or a flight_number and departure_date", dtype=object)
+
+    if 'flight_id' in passengers:
+        given = pd.to_numeric(passengers['flight_id'].replace('', None), errors='coerce').to_numpy(dtype=np.float64)
+        known = (given >= 0) & (given < len(flights)) & (given % 1 == 0)
+        ids[known] = given[known]
+        errors[known] = None
+        errors[~np.isnan(given) & ~known] = "Unknown flight_id"
+
+    if {'flight_number', 'departure_date'} <= set(passengers):
+        lookup = (ids < 0) & (passengers['flight_number'].astype(str).str.strip() != '').to_numpy()
+        days = pd.to_datetime(passengers['departure_date'], errors='coerce').to_numpy(dtype='datetime64[D]')
+        errors[lookup & np.isnat(days)] = "Invalid departure_date"
+        lookup &= ~np.isnat(days)
+        wanted = pd.DataFrame({
+            'row': np.flatnonzero(lookup),
+            'flight_number': passengers['flight_number'].astype(str).str.strip().to_numpy()[lookup],
+            'day': days[lookup].astype(np.int64),
+            'wanted_class': (passengers['class'].astype(str).str.strip().to_numpy()[lookup]
+                             if 'class' in passengers else ''),
+        })
+        candidates = flights.loc[flights['flight_number'].isin(wanted['flight_number'].unique()),
+                                 ['flight_id', 'flight_number', 'departure_ts', 'class']]
+        candidates = pd.DataFrame({
+            'flight_id': candidates['flight_id'].to_numpy(dtype=np.int64),
+            'flight_number': candidates['flight_number'].to_numpy(dtype=object),
+            'day': candidates['departure_ts'].to_numpy() // 86_400,
+            'class': candidates['class'].to_numpy(dtype=object),
+        })
+        matches = wanted.merge(candidates, on=['flight_number', 'day'])
+        matches = matches[(matches['wanted_class'] == '') | (matches['wanted_class'] == matches['class'])]
+        counts = matches.groupby('row')['flight_id'].agg(['size', 'first'])
+        rows = wanted['row'].to_numpy()
+        errors[rows] = "No such flight on that date"
+        unique = counts.index[counts['size'] == 1].to_numpy()
+        ids[unique] = counts.loc[unique, 'first'].to_numpy()
+        errors[unique] = None
+        errors[counts.index[counts['size'] > 1].to_numpy()] = "Flight has several classes that day; add a class"
+    return ids, errors
+
+
+def validate_passengers(passengers, flights):
+    """Check a passenger table against the flight table, column by column.
+
+    Returns a copy with ``flight_id`` (-1 where it could not be resolved)
+    and ``error`` (None for rows that can be booked, else the first
+    problem found) columns. Raises ValueError for problems with the file
+    as a whole: missing columns or too many rows.
+    """
+    missing = [column for column in PASSENGER_FIELDS if column not in passengers]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+    if len(passengers) > BATCH_MAX_ROWS:
+        raise ValueError(f"At most {BATCH_MAX_ROWS:,} passengers per file")
+
+    checked = passengers.reset_index(drop=True).copy()
+    for column in PASSENGER_FIELDS + tuple(c for c in OPTIONAL_FIELDS if c in checked):
+        checked[column] = checked[column].fillna('').astype(str).str.strip()
+
+    # Reported in order of precedence; a row keeps its first error
+    error = pd.Series(None, index=checked.index, dtype=object)
+    for column in PASSENGER_FIELDS:
+        error[error.isna() & (checked[column] == '')] = f"Missing {column}"
+    error[error.isna() & ~checked['email'].str.fullmatch(EMAIL_PATTERN)] = "Invalid email"
+    flight_ids, flight_errors = _resolve_flights(checked, flights)
+    error = error.where(error.notna(), flight_errors)
+    departed = flight_ids >= 0
+    departed[departed] = flights['departure_ts'].to_numpy()[flight_ids[departed]] <= wall_clock()
+    error[error.isna() & departed] = "Flight has already departed"
+
+    checked['flight_id'] = flight_ids
+    checked['error'] = error
+    return checked
+
+
+def import_bookings(service, passengers, payment_method='Invoice', version=None, all_or_nothing=False,
+                    owner=None):
+    """Book every valid row of a passenger table; returns one result row per passenger.
+
+    Results have ``row`` (1-based, as in the file), ``status`` ('booked'
+    or 'rejected'), ``booking_id``, ``flight_id`` and ``error``. With
+    ``all_or_nothing``, one bad row or full flight rejects the whole file.
+    The bookings belong to ``owner``, as with BookingService.confirm().
+    """
+    version = version or service.current_version()
+    inventory = service.resources.inventory(version)
+    checked = validate_passengers(passengers, inventory.flights)
+    valid = checked['error'].isna().to_numpy()
+
+    demand = checked.loc[valid, 'flight_id'].value_counts()
+    seats = service.resources.seats(version)
+    if all_or_nothing and not valid.all():
+        sold = []
+    else:
+        sold = seats.sell_many(dict(zip(demand.index.tolist(), demand.tolist())), all_or_nothing=all_or_nothing)
+    booked = valid & checked['flight_id'].isin(sold).to_numpy()
+    checked.loc[valid & ~booked, 'error'] = ("Not booked, as other rows were rejected" if all_or_nothing
+                                             else "Not enough seats left on this flight for the group")
+
+    rows = checked[booked]
+    records = dict(zip(sold, service.flights(sold, version)))
+    fields = list(PASSENGER_FIELDS) + [column for column in OPTIONAL_FIELDS if column in rows]
+    bookings = [new_booking(records[flight_id], passenger, payment_method, version, owner)
+                for flight_id, passenger in zip(rows['flight_id'].tolist(), rows[fields].to_dict('records'))]
+    try:
+        stored = service.repository.add_many(bookings) if bookings else []
+    except Exception:
+        # Nothing was booked; give the seats back
+        for flight_id in sold:
+            seats.cancel(flight_id, int(demand[flight_id]))
+        raise
+    service.resources.aggregates(version).add_bookings(stored)
+    service.resources.pricing(version).record_bookings(rows['flight_id'].tolist())
+    if service.analytics is not None:
+        service.analytics.add_bookings(stored)
+    if service.jobs is not None:
+        for booking in stored:
+            service.jobs.submit(send_booking_confirmation, booking)
+
+    results = pd.DataFrame({
+        'row': np.arange(1, len(checked) + 1),
+        'status': np.where(booked, 'booked', 'rejected'),
+        'booking_id': None,
+        'flight_id': checked['flight_id'].where(checked['flight_id'] >= 0).astype('Int64'),
+        'error': checked['error'].astype(object).where(checked['error'].notna(), None),
+    })
+    results.loc[booked, 'booking_id'] = [booking['booking_id'] for booking in stored]
+    return results
+
+
+def _day_start(day):
+    # Date filters from a date picker cover whole days
+    return datetime.combine(day, time()) if isinstance(day, date) and not isinstance(day, datetime) else day
+
+
+class _Chunks:
+    """Write-only sink that hands back what was written since the last drain."""
+
+    closed = False
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def export_bookings(repository, fmt='csv', since=None, until=None, status=None, batch_size=EXPORT_BATCH_ROWS):
+    """Yield an export of the bookings store as chunks of bytes, one per batch of bookings.
+
+    ``since`` and ``until`` are datetimes or dates (``until`` exclusive);
+    ``status`` is e.g. 'Confirmed'. CSV gives ISO 8601 timestamps; Parquet
+    one row group per batch.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    bookings = repository.iter_bookings(_day_start(since), _day_start(until), status, batch_size=batch_size)
+    batches = iter(lambda: list(itertools.islice(bookings, batch_size)), [])
+
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow([name for name, _, _ in EXPORT_COLUMNS])
+        for batch in batches:
+            writer.writerows([value.isoformat() if isinstance(value, datetime) else value
+                              for value in (get(b) for _, _, get in EXPORT_COLUMNS)] for b in batch)
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode('utf-8')
+        return
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    types = {'string': pa.string(), 'int': pa.int64(), 'float': pa.float64(), 'timestamp': pa.timestamp('us')}
+    schema = pa.schema([(name, types[kind]) for name, kind, _ in EXPORT_COLUMNS])
+    sink = _Chunks()
+    writer = pq.ParquetWriter(sink, schema)
+    for batch in batches:
+        writer.write_table(pa.table({name: [get(b) for b in batch] for name, _, get in EXPORT_COLUMNS},
+                                    schema=schema))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
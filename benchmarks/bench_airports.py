@@ -0,0 +1,92 @@
+# benchmarks/bench_airports.py
+"""Build time and per-keystroke latency of the airport autocomplete index.
+
+The reference airports are topped up with made-up ones (names built from
+syllables, random coordinates) to each size, so the index can be timed at
+the size of a full airport dataset. Every keystroke of a set of city
+names is a lookup, with a typo in every fourth name so the fuzzy index
+gets its share of the work.
+
+    python benchmarks/bench_airports.py [--sizes 1000 10000 50000] [--names 200] [--path airports.csv]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from airports import AIRPORTS_PATH, Airport, AirportIndex, read_airports
+
+SYLLABLES = ['ka', 'lo', 'mi', 'san', 'ber', 'to', 'ri', 'na', 'vel', 'port', 'ham', 'do', 'sta', 'lin', 'e', 'ul']
+
+
+def synthetic_airports(airports, n, seed=0):
+    """``airports`` followed by made-up ones, ``n`` in all."""
+    rng = np.random.default_rng(seed)
+    airports, codes = list(airports), {airport.iata for airport in airports}
+    letters = np.array(list('ABCDEFGHIJKLMNOPQRSTUVWXYZ'))
+    while len(airports) < n:
+        code = ''.join(rng.choice(letters, 3))
+        if code in codes:
+            # Only 17,576 codes exist; larger sizes reuse them with a suffix
+            code = f"{code}{len(airports)}"
+        codes.add(code)
+        city = ''.join(rng.choice(SYLLABLES, rng.integers(2, 5))).capitalize()
+        airports.append(Airport(code, f"{city} {rng.choice(['International', 'Regional', 'Municipal'])} Airport",
+                                city, 'ZZ', float(rng.uniform(-60, 70)), float(rng.uniform(-180, 180))))
+    return airports[:n]
+
+
+def keystrokes(airports, count, seed=1):
+    # The prefixes typed on the way to each name, a typo in every fourth
+    rng = np.random.default_rng(seed)
+    queries = []
+    for i, airport in enumerate(rng.choice(len(airports), count)):
+        name = airports[airport].city
+        if i % 4 == 0 and len(name) > 4:
+            j = int(rng.integers(1, len(name) - 1))
+            name = name[:j] + name[j + 1] + name[j] + name[j + 2:]
+        queries.extend(name[:k] for k in range(1, len(name) + 1))
+    return queries
+
+
+def run(airports, n, names):
+    airports = synthetic_airports(airports, n)
+    start = time.perf_counter()
+    index = AirportIndex(airports)
+    build = time.perf_counter() - start
+
+    queries = keystrokes(airports, names)
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        index.complete(query)
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return {'airports': n, 'build_ms': build * 1e3, 'trie_nodes': len(index._top), 'keystrokes': len(samples),
+            'p50_us': statistics.median(samples) * 1e6, 'p99_us': samples[int(len(samples) * 0.99)] * 1e6}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 50_000])
+    parser.add_argument('--names', type=int, default=200, help="city names typed, one keystroke at a time")
+    parser.add_argument('--path', default=AIRPORTS_PATH, help="airport file to start from")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    airports = read_airports(args.path)
+    print(f"Read {len(airports):,} airports in {(time.perf_counter() - start) * 1e3:.1f} ms")
+    print(f"{'airports':>9} {'build (ms)':>11} {'trie nodes':>11} {'keystrokes':>11} {'p50 (us)':>9} {'p99 (us)':>9}")
+    for n in args.sizes:
+        r = run(airports, n, args.names)
+        print(f"{r['airports']:>9,} {r['build_ms']:>11.1f} {r['trie_nodes']:>11,} {r['keystrokes']:>11,} "
+              f"{r['p50_us']:>9.1f} {r['p99_us']:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+# benchmarks/bench_analytics.py
+"""Analytics page latency: full rescan vs incrementally maintained aggregates.
+
+"rescan" is what analytics_page() did before FlightAggregates: mean,
+mode, value_counts, a 20-bin histogram and a derived duration column over
+the whole inventory, plus the three figures. "aggregates" is summary()
+plus the same three figures built from it. One-off build time and the
+cost of a single incremental update and of repricing every flight are
+reported too.
+
+    python benchmarks/bench_analytics.py [--sizes 1000 10000 100000 1000000]
+"""
+import argparse
+import os
+import sys
+import time
+
+import plotly.express as px
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analytics_aggregates import FlightAggregates
+from analytics_charts import duration_price_figure, price_histogram_figure, top_destinations_figure
+from bench_search import make_flights
+from flight_schema import compact_flights, flight_records
+from pricing import PriceList
+
+
+def rescan_page(flights_df):
+    flights_df['price'].mean()
+    flights_df['arrival_city'].mode()[0]
+    px.histogram(flights_df, x='price', nbins=20).to_json()
+    dest_counts = flights_df['arrival_city'].value_counts().head(10)
+    px.bar(x=dest_counts.index, y=dest_counts.values).to_json()
+    flights_df = flights_df.assign(duration_hours=flights_df['duration'].dt.total_seconds() / 3600)
+    px.scatter(flights_df, x='duration_hours', y='price', color='class',
+               hover_data=['departure_city', 'arrival_city']).to_json()
+
+
+def aggregates_page(aggregates):
+    summary = aggregates.summary()
+    price_histogram_figure(summary).to_json()
+    top_destinations_figure(summary).to_json()
+    duration_price_figure(summary).to_json()
+
+
+def timed(fn, *args, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(sizes):
+    rows = []
+    for n in sizes:
+        flights = make_flights(n)
+        compact = compact_flights(flights)
+        start = time.perf_counter()
+        aggregates = FlightAggregates.from_flights(compact)
+        build = time.perf_counter() - start
+
+        flight = flight_records(compact, [0])[0]
+        update = timed(aggregates.update_flight, flight, dict(flight, price=flight['price'] + 10), repeat=100)
+        # Each of the three timed calls a new epoch, every fare changed
+        cents = compact['price_cents'].to_numpy()
+        epochs = iter([PriceList(epoch, cents * (100 + epoch) // 100) for epoch in range(1, 4)])
+        reprice = timed(lambda: aggregates.reprice(next(epochs)))
+        rows.append({'rows': n, 'rescan_ms': timed(rescan_page, flights) * 1e3,
+                     'aggregates_ms': timed(aggregates_page, aggregates) * 1e3,
+                     'build_ms': build * 1e3, 'update_us': update * 1e6, 'reprice_ms': reprice * 1e3})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'rows':>9} {'rescan (ms)':>12} {'aggregates (ms)':>16} {'build (ms)':>11} {'update (us)':>12} "
+          f"{'reprice (ms)':>13}")
+    for r in run(args.sizes):
+        print(f"{r['rows']:>9} {r['rescan_ms']:>12.0f} {r['aggregates_ms']:>16.1f} "
+              f"{r['build_ms']:>11.0f} {r['update_us']:>12.1f} {r['reprice_ms']:>13.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,229 @@
+# benchmarks/bench_api.py
+"""Load test of the HTTP API: requests/s and latency percentiles per endpoint.
+
+Starts ``uvicorn api:app`` with a throwaway booking store (and, with more
+than one worker, a shared SQLite state backend) and drives it from an
+asyncio client holding --connections keep-alive connections, each issuing
+one request at a time for --duration seconds. Scenarios:
+
+- mix: searches, quotes, and booking journeys (hold a seat, then confirm
+  it), weighted as --mix search:quote:book
+- search, quote, health: one endpoint only
+
+A 409 for a sold-out flight is a normal answer; any 5xx or dropped
+connection is counted as an error and fails the run (exit status 1). The
+client runs on the same machine as the server, so on a small box it
+takes a share of the CPU the server could otherwise use.
+
+    python benchmarks/bench_api.py [--scenario mix] [--workers 1] [--connections 64] [--duration 10]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from urllib.parse import urlencode
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from inventory import AIRLINES, CITIES, CLASSES
+
+PASSENGER = {'first_name': 'Ada', 'last_name': 'Lovelace', 'email': 'ada@example.com', 'phone': '123'}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(tmp, port, workers, flights, backend):
+    env = dict(os.environ, SKYWINGS_INVENTORY_SIZE=str(flights),
+               SKYWINGS_STATE_BACKEND=('sqlite:///' + os.path.join(tmp, 'state.db') if backend == 'sqlite'
+                                       else 'memory://'),
+               SKYWINGS_BOOKING_STORE='sqlite:///' + os.path.join(tmp, 'bookings.db'),
+               SKYWINGS_OUTBOX_DIR=os.path.join(tmp, 'outbox'),
+               SKYWINGS_METRICS_PORT='0', SKYWINGS_METRICS_FILE='',
+               PYTHONPATH=ROOT + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    proc = subprocess.Popen([sys.executable, '-m', 'uvicorn', 'api:app', '--port', str(port),
+                             '--workers', str(workers), '--no-access-log', '--log-level', 'warning'],
+                            env=env, cwd=tmp)
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with status {proc.returncode}")
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1) as sock:
+                sock.sendall(b'GET /health HTTP/1.1\r\nHost: bench\r\n\r\n')
+                if sock.recv(12).startswith(b'HTTP/1.1 200'):
+                    return proc
+        except OSError:
+            pass
+        time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("uvicorn did not come up")
+
+
+class Connection:
+    """One keep-alive HTTP/1.1 connection, one request in flight at a time."""
+
+    def __init__(self, port):
+        self.port = port
+        self.reader = self.writer = None
+
+    async def request(self, method, path, body=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection('127.0.0.1', self.port)
+        payload = b'' if body is None else json.dumps(body).encode()
+        head = f'{method} {path} HTTP/1.1\r\nHost: bench\r\nContent-Length: {len(payload)}\r\n'
+        if payload:
+            head += 'Content-Type: application/json\r\n'
+        self.writer.write(head.encode() + b'\r\n' + payload)
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b''):
+                break
+            name, _, value = line.partition(b':')
+            if name.strip().lower() == b'content-length':
+                length = int(value)
+        data = await self.reader.readexactly(length) if length else b''
+        return status, data
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+class Load:
+    def __init__(self, port, scenario, weights, flights, seed):
+        self.port = port
+        self.scenario = scenario
+        self.weights = weights
+        self.flights = flights
+        self.rng = random.Random(seed)
+        self.latencies = defaultdict(list)
+        self.statuses = Counter()
+        self.errors = Counter()
+
+    def search_path(self):
+        rng = self.rng
+        params = {'departure': rng.choice(CITIES)}
+        if rng.random() < 0.7:
+            params['arrival'] = rng.choice([c for c in CITIES if c != params['departure']])
+        if rng.random() < 0.3:
+            params['class'] = rng.choice(CLASSES)
+        if rng.random() < 0.2:
+            params['airline'] = rng.choice(AIRLINES)
+        if rng.random() < 0.2:
+            params['max_price'] = rng.choice([500, 1000, 2000])
+        params['sort'] = rng.choice(['price', 'price', 'duration', 'departure_time'])
+        return '/flights?' + urlencode(params)
+
+    async def timed(self, conn, name, method, path, body=None):
+        start = time.perf_counter()
+        try:
+            status, data = await conn.request(method, path, body)
+        except (OSError, asyncio.IncompleteReadError, ValueError, IndexError) as exc:
+            self.errors[f'{name}: {type(exc).__name__}'] += 1
+            conn.close()
+            conn.writer = None
+            return None, None
+        self.latencies[name].append(time.perf_counter() - start)
+        self.statuses[status] += 1
+        if status >= 500:
+            self.errors[f'{name}: HTTP {status}'] += 1
+        return status, data
+
+    async def step(self, conn):
+        scenario = self.scenario
+        if scenario == 'mix':
+            scenario = self.rng.choices(['search', 'quote', 'book'], self.weights)[0]
+        if scenario == 'health':
+            await self.timed(conn, 'health', 'GET', '/health')
+        elif scenario == 'search':
+            await self.timed(conn, 'search', 'GET', self.search_path())
+        elif scenario == 'quote':
+            await self.timed(conn, 'quote', 'GET', f'/flights/{self.rng.randrange(self.flights)}/quote?passengers=2')
+        else:
+            flight_id = self.rng.randrange(self.flights)
+            status, data = await self.timed(conn, 'hold', 'POST', '/holds', {'flight_id': flight_id})
+            if status == 201:
+                hold = json.loads(data)
+                await self.timed(conn, 'confirm', 'POST', '/bookings',
+                                 {'flight_id': flight_id, 'hold_id': hold['hold_id'], 'passenger': PASSENGER,
+                                  'inventory_version': hold['inventory_version']})
+
+    async def client(self, deadline):
+        conn = Connection(self.port)
+        try:
+            while time.perf_counter() < deadline:
+                await self.step(conn)
+        finally:
+            conn.close()
+
+    async def run(self, connections, duration):
+        started = time.perf_counter()
+        await asyncio.gather(*(self.client(started + duration) for _ in range(connections)))
+        return time.perf_counter() - started
+
+
+def percentile(samples, q):
+    return statistics.quantiles(samples, n=100, method='inclusive')[q - 1] if len(samples) > 1 else samples[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scenario', choices=['mix', 'search', 'quote', 'health'], default='mix')
+    parser.add_argument('--mix', default='60:30:10', help="search:quote:book weights for the mix scenario")
+    parser.add_argument('--workers', type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument('--backend', choices=['memory', 'sqlite'],
+                        help="state backend; defaults to sqlite with more than one worker")
+    parser.add_argument('--connections', type=int, default=64)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--warmup', type=float, default=2.0)
+    parser.add_argument('--flights', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    backend = args.backend or ('sqlite' if args.workers > 1 else 'memory')
+    weights = [float(w) for w in args.mix.split(':')]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        port = free_port()
+        proc = start_server(tmp, port, args.workers, args.flights, backend)
+        try:
+            # Warm the search cache and every worker's inventory first
+            asyncio.run(Load(port, args.scenario, weights, args.flights, args.seed)
+                        .run(args.connections, args.warmup))
+            load = Load(port, args.scenario, weights, args.flights, args.seed + 1)
+            elapsed = asyncio.run(load.run(args.connections, args.duration))
+        finally:
+            proc.terminate()
+            proc.wait()
+
+    total = sum(len(samples) for samples in load.latencies.values())
+    print(f"{args.scenario} scenario, {args.workers} worker(s), {backend} backend, "
+          f"{args.connections} connections, {args.flights} flights, {os.cpu_count()} CPU(s)")
+    print(f"{total:,} requests in {elapsed:.1f} s: {total / elapsed:,.0f} requests/s")
+    print(f"{'endpoint':<10} {'requests':>9} {'req/s':>8} {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9}")
+    for name, samples in sorted(load.latencies.items()):
+        print(f"{name:<10} {len(samples):>9,} {len(samples) / elapsed:>8,.0f} {percentile(samples, 50) * 1e3:>9.1f} "
+              f"{percentile(samples, 95) * 1e3:>9.1f} {percentile(samples, 99) * 1e3:>9.1f}")
+    print("statuses: " + ', '.join(f"{status}: {count:,}" for status, count in sorted(load.statuses.items())))
+    for error, count in load.errors.items():
+        print(f"ERROR {error} x{count}")
+    if load.errors:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+# benchmarks/bench_booking_analytics.py
+"""Ingest cost and dashboard latency of the booking analytics rollups.
+
+Bookings made at random times over the past year, one in ten later
+cancelled, go into BookingAnalytics a batch at a time. At each size,
+every dashboard window is read from the rollups (series and summary),
+and for comparison computed by scanning the same bookings as columns,
+as a dashboard without rollups would. A single booking's update, the
+cost added to each booking, is timed too.
+
+    python benchmarks/bench_booking_analytics.py [--sizes 10000 100000 1000000] [--state memory://]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from booking_analytics import RESOLUTIONS, WINDOWS, BookingAnalytics
+from flight_schema import flight_records
+from inventory import generate_flight_data
+from state_backend import open_state_backend
+
+NOW = datetime(2026, 1, 1, 12)
+BATCH = 10_000
+SEATS = ['No Preference', 'Window', 'Aisle', 'Middle']
+MEALS = ['Standard', 'Vegetarian', 'Vegan', 'Halal', 'Kosher']
+
+
+class Bookings:
+    """Synthetic bookings, made in batches; keeps them as columns for the scan."""
+
+    def __init__(self, flights=1000, seed=0):
+        self.flights = flight_records(generate_flight_data(flights, seed=42), range(flights))
+        self.rng = np.random.default_rng(seed)
+        self.columns = {name: [] for name in ('seconds', 'cents', 'route', 'class', 'cancelled', 'seat', 'meal')}
+
+    def make(self, n):
+        flights = self.rng.integers(0, len(self.flights), n)
+        ages = self.rng.uniform(0, 365 * 86400, n)
+        seats, meals = self.rng.integers(0, len(SEATS), n), self.rng.integers(0, len(MEALS), n)
+        cancelled = self.rng.random(n) < 0.1
+        bookings = [{'flight': self.flights[f], 'booking_date': NOW - timedelta(seconds=age),
+                     'passenger': {'seat_preference': SEATS[s], 'meal_preference': MEALS[m]}}
+                    for f, age, s, m in zip(flights.tolist(), ages.tolist(), seats.tolist(), meals.tolist())]
+        records = [self.flights[f] for f in flights.tolist()]
+        epoch = (NOW - datetime(1970, 1, 1)).total_seconds()
+        self.columns['seconds'].append(epoch - ages)
+        self.columns['cents'].append(np.array([round(r['price'] * 100) for r in records]))
+        self.columns['route'].append(np.array([f"{r['departure_city']} → {r['arrival_city']}" for r in records]))
+        self.columns['class'].append(np.array([r['class'] for r in records]))
+        self.columns['cancelled'].append(cancelled)
+        self.columns['seat'].append(seats)
+        self.columns['meal'].append(meals)
+        return bookings, [b for b, c in zip(bookings, cancelled.tolist()) if c]
+
+    def frame(self):
+        return pd.DataFrame({name: np.concatenate(parts) for name, parts in self.columns.items()})
+
+
+def scan(frame, resolution, buckets):
+    # What the dashboard computes from raw bookings without rollups
+    width = RESOLUTIONS[resolution][0]
+    last = int((NOW - datetime(1970, 1, 1)).total_seconds() // width)
+    bucket = (frame['seconds'].to_numpy() // width).astype(np.int64)
+    rows = frame[bucket > last - buckets]
+    kept = rows['cents'].where(~rows['cancelled'], 0)
+    series = np.bincount((rows['seconds'].to_numpy() // width).astype(np.int64) - (last - buckets + 1),
+                         minlength=buckets)
+    return (series, kept.groupby(rows['route']).sum(), kept.groupby(rows['class']).sum(),
+            rows['seat'].value_counts(), rows['meal'].value_counts(), rows['cancelled'].mean())
+
+
+def timed(fn, repeat):
+    fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def run(sizes, state, repeat):
+    backend = open_state_backend(state)
+    analytics = BookingAnalytics(backend, clock=lambda: NOW)
+    bookings, made, results = Bookings(), 0, []
+    for size in sizes:
+        ingest = 0.0
+        while made < size:
+            batch, cancelled = bookings.make(min(BATCH, size - made))
+            start = time.perf_counter()
+            analytics.add_bookings(batch)
+            for booking in cancelled:
+                analytics.cancel_booking(booking)
+            ingest += time.perf_counter() - start
+            made += len(batch)
+        # The update added to a booking made through the service
+        single = timed(lambda: analytics.add_booking(batch[0]), repeat)
+
+        frame = bookings.frame()
+        for window, (resolution, buckets) in WINDOWS.items():
+            results.append({
+                'bookings': size, 'window': window, 'ingest_per_s': made / ingest if ingest else 0.0,
+                'add_booking_us': single * 1e6,
+                'rollup_ms': timed(lambda: (analytics.series(resolution, buckets),
+                                            analytics.summary(resolution, buckets)), repeat) * 1e3,
+                'scan_ms': timed(lambda: scan(frame, resolution, buckets), repeat) * 1e3,
+            })
+            ingest = 0.0
+    backend.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000],
+                        help="bookings made, cumulative")
+    parser.add_argument('--state', default='memory://', help="state backend URL the rollups live in; {tmp} is a scratch directory")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        state = args.state.replace('{tmp}', tmp)
+        print(f"{'bookings':>9} {'window':>14} {'ingest/s':>9} {'add (us)':>9} {'rollups (ms)':>13} "
+              f"{'scan (ms)':>10}")
+        for r in run(args.sizes, state, args.repeat):
+            ingest = f"{r['ingest_per_s']:>9,.0f}" if r['ingest_per_s'] else f"{'':>9}"
+            print(f"{r['bookings']:>9,} {r['window']:>14} {ingest} {r['add_booking_us']:>9.1f} "
+                  f"{r['rollup_ms']:>13.2f} {r['scan_ms']:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+# benchmarks/bench_booking_store.py
+"""Concurrent booking load test against the SQLite booking repository.
+
+Many threads book at once (as Streamlit script threads do), then every
+booking is read back by id and by passenger email to check nothing was
+lost or duplicated.
+
+    python benchmarks/bench_booking_store.py [--threads 1 8 32] [--bookings 200]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from booking_store import SQLiteBookingRepository
+
+
+def make_booking(thread, i):
+    departure = datetime(2024, 1, 1) + timedelta(hours=i)
+    return {
+        'flight': {'flight_number': f'SW{1000 + i % 500}', 'departure_city': 'London',
+                   'arrival_city': 'Tokyo', 'departure_time': departure,
+                   'arrival_time': departure + timedelta(hours=12),
+                   'duration': timedelta(hours=12), 'price': 899.0},
+        'passenger': {'first_name': 'Load', 'last_name': f'Test{thread}',
+                      'email': f'passenger{thread}@example.com', 'phone': '555-0100'},
+        'payment_method': 'Credit Card',
+        'booking_date': datetime.now(),
+        'status': 'Confirmed',
+    }
+
+
+def run(threads, bookings_per_thread):
+    with tempfile.TemporaryDirectory() as tmp:
+        repo = SQLiteBookingRepository(os.path.join(tmp, 'bookings.db'))
+        latencies = [[] for _ in range(threads)]
+        booked = [[] for _ in range(threads)]
+        barrier = threading.Barrier(threads)
+
+        def worker(t):
+            barrier.wait()
+            for i in range(bookings_per_thread):
+                start = time.perf_counter()
+                booked[t].append(repo.add(make_booking(t, i))['booking_id'])
+                latencies[t].append(time.perf_counter() - start)
+
+        pool = [threading.Thread(target=worker, args=(t,)) for t in range(threads)]
+        start = time.perf_counter()
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        # Every booking must be durable and visible through both indexes
+        total = threads * bookings_per_thread
+        ids = [b for per_thread in booked for b in per_thread]
+        assert repo.count() == total and len(set(ids)) == total
+        for t in range(threads):
+            assert sorted(b['booking_id'] for b in repo.list_by_email(f'passenger{t}@example.com')) == sorted(booked[t])
+
+        lookup_start = time.perf_counter()
+        for booking_id in ids[:1000]:
+            assert repo.get(booking_id) is not None
+        lookup = (time.perf_counter() - lookup_start) / min(len(ids), 1000)
+        repo.close()
+
+    samples = sorted(x for per_thread in latencies for x in per_thread)
+    return {'threads': threads, 'bookings': total, 'per_sec': total / elapsed,
+            'p50_ms': statistics.median(samples) * 1e3,
+            'p99_ms': samples[int(len(samples) * 0.99) - 1] * 1e3,
+            'lookup_ms': lookup * 1e3}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--bookings', type=int, default=200, help="bookings per thread")
+    args = parser.parse_args()
+
+    print(f"{'threads':>7} {'bookings':>9} {'bookings/s':>11} {'p50 (ms)':>9} {'p99 (ms)':>9} {'get (ms)':>9}")
+    for r in (run(t, args.bookings) for t in args.threads):
+        print(f"{r['threads']:>7} {r['bookings']:>9} {r['per_sec']:>11.0f} {r['p50_ms']:>9.2f} "
+              f"{r['p99_ms']:>9.2f} {r['lookup_ms']:>9.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+# benchmarks/bench_event_log.py
+"""Write throughput and recovery time of the event-log booking repository.
+
+Writes: threads booking one at a time, so the fsync batching is what is
+measured (each fsync covers every booking queued behind it). Recovery:
+a log of each size (nine bookings created per cancellation) is written in
+large batches, then reopened twice: replaying the whole log, and from
+the snapshot taken every --snapshot-every events plus the log tail.
+
+    python benchmarks/bench_event_log.py [--threads 1 8 32] [--bookings 200] [--sizes 100000 1000000]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_booking_store import make_booking
+from event_log import EVENT_LOG_SNAPSHOT_EVENTS, EventLogBookingRepository
+
+WRITE_BATCH = 10_000
+
+
+def write_throughput(threads, bookings_per_thread):
+    with tempfile.TemporaryDirectory() as tmp:
+        repo = EventLogBookingRepository(tmp)
+        latencies = [[] for _ in range(threads)]
+        barrier = threading.Barrier(threads)
+
+        def worker(t):
+            barrier.wait()
+            for i in range(bookings_per_thread):
+                start = time.perf_counter()
+                repo.add(make_booking(t, i))
+                latencies[t].append(time.perf_counter() - start)
+
+        pool = [threading.Thread(target=worker, args=(t,)) for t in range(threads)]
+        start = time.perf_counter()
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        repo.close()
+    samples = sorted(s for thread in latencies for s in thread)
+    return {'threads': threads, 'bookings_per_s': len(samples) / elapsed,
+            'p50_ms': statistics.median(samples) * 1e3, 'p99_ms': samples[int(len(samples) * 0.99)] * 1e3}
+
+
+def write_log(directory, events, snapshot_every):
+    # Nine bookings, then a cancellation of one of them
+    repo = EventLogBookingRepository(directory, snapshot_every=snapshot_every)
+    start, written = time.perf_counter(), 0
+    while written < events:
+        batch = repo.add_many([make_booking(0, written + i) for i in range(min(WRITE_BATCH, events - written))])
+        written += len(batch)
+        for booking in batch[::9][:events - written]:
+            repo.set_status(booking['booking_id'], 'Cancelled')
+            written += 1
+    elapsed = time.perf_counter() - start
+    repo.close()
+    return elapsed
+
+
+def reopen(directory):
+    start = time.perf_counter()
+    repo = EventLogBookingRepository(directory)
+    elapsed = time.perf_counter() - start
+    count = repo.count()
+    repo.close()
+    return elapsed, count
+
+
+def recovery(events, snapshot_every):
+    results = {'events': events}
+    for label, every in (('replay', events + 1), ('snapshot', snapshot_every)):
+        directory = tempfile.mkdtemp()
+        try:
+            results[f'{label}_write_s'] = write_log(directory, events, every)
+            results['log_mb'] = sum(os.path.getsize(os.path.join(directory, name))
+                                    for name in os.listdir(directory)) / 2 ** 20
+            results[f'{label}_open_s'], results['bookings'] = reopen(directory)
+        finally:
+            shutil.rmtree(directory)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--bookings', type=int, default=200, help="bookings per thread")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100_000, 1_000_000], help="events per log")
+    parser.add_argument('--snapshot-every', type=int, default=EVENT_LOG_SNAPSHOT_EVENTS)
+    args = parser.parse_args()
+
+    print(f"{'threads':>7} {'bookings/s':>11} {'p50 (ms)':>9} {'p99 (ms)':>9}")
+    for threads in args.threads:
+        r = write_throughput(threads, args.bookings)
+        print(f"{r['threads']:>7} {r['bookings_per_s']:>11,.0f} {r['p50_ms']:>9.2f} {r['p99_ms']:>9.2f}")
+
+    print()
+    print(f"{'events':>9} {'events/s written':>17} {'bookings':>9} {'full replay (s)':>16} "
+          f"{'snapshot + tail (s)':>20}")
+    for events in args.sizes:
+        r = recovery(events, args.snapshot_every)
+        print(f"{r['events']:>9,} {r['events'] / r['replay_write_s']:>17,.0f} {r['bookings']:>9,} "
+              f"{r['replay_open_s']:>16.2f} {r['snapshot_open_s']:>20.2f}")
+
+
+if __name__ == '__main__':
+    main()
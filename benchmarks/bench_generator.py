@@ -0,0 +1,93 @@
+# benchmarks/bench_generator.py
+"""Flight generation throughput: per-row Python loop vs the vectorized generator.
+
+"loop" is the generator inventory.py used to have (random.choice and
+timedelta per row), run only up to --loop-max rows. "vectorized" is
+generate_flight_data(); "parquet" streams the same volume to a file with
+write_flights(). Peak traced memory shows what each holds at once.
+
+    python benchmarks/bench_generator.py [--sizes 100000 1000000 10000000] [--loop-max 100000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from inventory import AIRCRAFT_TYPES, AIRLINES, CITIES, CLASSES, generate_flight_data, write_flights
+
+
+def loop_generate(n, seed=None):
+    rng = random.Random(seed)
+    start = datetime.now().replace(minute=0, second=0, microsecond=0)
+    flights = []
+    for i in range(n):
+        departure = rng.choice(CITIES)
+        arrival = rng.choice([c for c in CITIES if c != departure])
+        departure_time = start + timedelta(days=rng.randint(1, 30), hours=rng.randint(0, 23))
+        duration = timedelta(hours=rng.randint(1, 12))
+        flights.append({
+            'flight_number': f'SW{rng.randint(1000, 9999)}',
+            'airline': rng.choice(AIRLINES),
+            'departure_city': departure,
+            'arrival_city': arrival,
+            'departure_time': departure_time,
+            'arrival_time': departure_time + duration,
+            'duration': duration,
+            'price': round(rng.uniform(150, 1500), 2),
+            'available_seats': rng.randint(5, 200),
+            'aircraft_type': rng.choice(AIRCRAFT_TYPES),
+            'class': rng.choice(CLASSES),
+        })
+    return pd.DataFrame(flights)
+
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def run(sizes, loop_max, chunk_rows):
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'flights.parquet')
+        for n in sizes:
+            modes = {'vectorized': lambda: generate_flight_data(n, seed=42),
+                     'parquet': lambda: write_flights(path, n, seed=42, chunk_rows=chunk_rows)}
+            if n <= loop_max:
+                modes = {'loop': lambda: loop_generate(n, seed=42), **modes}
+            for mode, fn in modes.items():
+                elapsed, peak = measure(fn)
+                rows.append({'rows': n, 'mode': mode, 'seconds': elapsed,
+                             'rows_per_s': n / elapsed, 'peak_mb': peak / 2 ** 20})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100_000, 1_000_000, 10_000_000])
+    parser.add_argument('--loop-max', type=int, default=100_000,
+                        help="largest size to run the per-row loop on")
+    parser.add_argument('--chunk-rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'mode':>11} {'seconds':>8} {'rows/s':>11} {'peak (MB)':>10}")
+    for r in run(args.sizes, args.loop_max, args.chunk_rows):
+        print(f"{r['rows']:>10} {r['mode']:>11} {r['seconds']:>8.2f} {r['rows_per_s']:>11,.0f} "
+              f"{r['peak_mb']:>10.0f}")
+
+
+if __name__ == '__main__':
+    main()
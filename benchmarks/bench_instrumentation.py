@@ -0,0 +1,68 @@
+# benchmarks/bench_instrumentation.py
+"""Overhead of instrumentation spans and the cost of rendering /metrics.
+
+A rerun of the busiest page opens a few dozen spans, so the per-span
+cost, single-threaded and with threads contending for the registry lock,
+bounds what instrumentation adds to rerun latency.
+
+    python benchmarks/bench_instrumentation.py [--spans 200000] [--threads 1 8]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from instrumentation import MetricsRegistry, page_span, span
+
+
+def spans_per_thread(registry, count):
+    with page_span('search', registry=registry):
+        for _ in range(count):
+            with span('figures', registry=registry):
+                pass
+
+
+def run(span_count, thread_counts):
+    rows = []
+    for threads in thread_counts:
+        registry = MetricsRegistry()
+        per_thread = span_count // threads
+        pool = [threading.Thread(target=spans_per_thread, args=(registry, per_thread)) for _ in range(threads)]
+        start = time.perf_counter()
+        for t in pool:
+            t.start()
+        for t in pool:
+            t.join()
+        elapsed = time.perf_counter() - start
+        rows.append({'threads': threads, 'ns_per_span': elapsed / (per_thread * threads) * 1e9})
+
+    # A registry with every page x span series populated
+    registry = MetricsRegistry()
+    for page in ('home', 'search', 'my_bookings', 'analytics', 'profile', 'booking_form'):
+        for name in ('load', 'search', 'materialize', 'figures', 'route_planning', 'store_booking'):
+            registry.observe('skywings_span_seconds', 0.01, page=page, span=name)
+        registry.observe('skywings_rerun_seconds', 0.1, page=page, outcome='ok')
+    start = time.perf_counter()
+    text = registry.render()
+    render_ms = (time.perf_counter() - start) * 1e3
+    return rows, render_ms, len(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--spans', type=int, default=200_000)
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 8])
+    args = parser.parse_args()
+
+    rows, render_ms, size = run(args.spans, args.threads)
+    print(f"{'threads':>8} {'ns/span':>9}")
+    for r in rows:
+        print(f"{r['threads']:>8} {r['ns_per_span']:>9.0f}")
+    print(f"render /metrics: {render_ms:.2f} ms, {size / 1024:.1f} KB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+# benchmarks/bench_memory.py
+"""Bytes per flight of the shared table and bytes per session of search results.
+
+"wide" is the layout generate_flight_data() used to hand out: object
+strings, datetime64/timedelta64 columns and float prices. "compact" is
+the flight_schema layout. Per session, the old search_flights() kept a
+to_dict('records') copy of the results; it now keeps the row positions
+FlightIndex.search() returns. The query is every flight out of one city.
+
+    python benchmarks/bench_memory.py [--sizes 10000 100000 1000000] [--page-size 10]
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_search import make_flights
+from flight_index import FlightIndex
+from flight_schema import CATEGORY_COLUMNS, compact_flights, flight_records
+
+
+def deep_sizeof(value):
+    # Records are dicts of Python scalars and pandas Timestamps/Timedeltas
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(deep_sizeof(k) + deep_sizeof(v) for k, v in value.items())
+    if isinstance(value, list):
+        return sys.getsizeof(value) + sum(deep_sizeof(v) for v in value)
+    if hasattr(value, 'nbytes'):
+        return sys.getsizeof(value) if value.base is None else sys.getsizeof(value) + value.nbytes
+    return sys.getsizeof(value)
+
+
+def run(sizes, page_size):
+    rows = []
+    for n in sizes:
+        wide = make_flights(n)
+        wide = wide.astype({c: object for c in CATEGORY_COLUMNS})
+        compact = compact_flights(wide)
+        results = FlightIndex(compact).search(departure='London', sort_by='price')
+
+        rows.append({
+            'rows': n,
+            'matches': len(results),
+            'wide_per_flight': wide.memory_usage(deep=True).sum() / n,
+            'compact_per_flight': compact.memory_usage(deep=True).sum() / n,
+            'records_session': deep_sizeof(wide.iloc[results].to_dict('records')),
+            'page_session': deep_sizeof(flight_records(compact, results[:page_size])),
+            'rows_session': deep_sizeof(results),
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--page-size', type=int, default=10,
+                        help="flights per page, for the page-of-records figure")
+    args = parser.parse_args()
+
+    print(f"{'rows':>9} {'matches':>8} {'wide B/flight':>14} {'compact B/flight':>17} "
+          f"{'records/session':>16} {'page/session':>13} {'row ids/session':>16}")
+    for r in run(args.sizes, args.page_size):
+        print(f"{r['rows']:>9} {r['matches']:>8} {r['wide_per_flight']:>14.0f} "
+              f"{r['compact_per_flight']:>17.0f} {r['records_session'] / 1024:>13.0f} KB "
+              f"{r['page_session'] / 1024:>10.1f} KB {r['rows_session'] / 1024:>13.1f} KB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+# benchmarks/bench_pricing.py
+"""Repricing time of PricingEngine: whole inventory, and one epoch's bookings.
+
+For each size: the engine's setup, a full reprice of every flight (the
+first pricing epoch), and the next epoch after --bookings random seat
+sales, which reprices only the flights sold on and those in markets
+(route and departure day) whose demand moved. Both include storing the
+epoch's fares in a process-local StateBackend, as every build does. The
+clock is simulated, so epochs turn over on demand.
+
+    python benchmarks/bench_pricing.py [--sizes 10000 100000 1000000] [--bookings 1000] [--repeat 5]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from inventory import generate_flight_data
+from pricing import PRICING_EPOCH_SECONDS, PricingEngine
+from seat_inventory import SeatInventory
+
+
+class Clock:
+    def __init__(self):
+        self.now = time.time()
+
+    def __call__(self):
+        return self.now
+
+    def next_epoch(self):
+        self.now += PRICING_EPOCH_SECONDS
+
+
+def run(n, bookings, repeat):
+    flights = generate_flight_data(n, seed=42)
+    rng = np.random.default_rng(7)
+    setup, full, incremental, repriced = [], [], [], []
+    for _ in range(repeat):
+        clock = Clock()
+        seats = SeatInventory(flights['available_seats'])
+        start = time.perf_counter()
+        engine = PricingEngine(flights, seats, clock=clock)
+        setup.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        engine.prices()
+        full.append(time.perf_counter() - start)
+
+        sold = rng.choice(n, bookings)
+        for flight_id in sold.tolist():
+            seats.sell_many({flight_id: 1})
+        engine.record_bookings(sold.tolist())
+        clock.next_epoch()
+        start = time.perf_counter()
+        engine.prices()
+        incremental.append(time.perf_counter() - start)
+        repriced.append(engine.repriced)
+    return {'flights': n, 'setup_ms': statistics.median(setup) * 1e3, 'full_ms': statistics.median(full) * 1e3,
+            'incremental_ms': statistics.median(incremental) * 1e3, 'repriced': int(statistics.median(repriced))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--bookings', type=int, default=1000, help="seat sales between the two epochs")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'flights':>9} {'setup (ms)':>11} {'full (ms)':>10} {'flights/s':>12} "
+          f"{'next epoch (ms)':>16} {'repriced':>9}")
+    for n in args.sizes:
+        r = run(n, args.bookings, args.repeat)
+        print(f"{r['flights']:>9} {r['setup_ms']:>11.1f} {r['full_ms']:>10.1f} "
+              f"{r['flights'] / (r['full_ms'] / 1e3):>12,.0f} {r['incremental_ms']:>16.1f} {r['repriced']:>9}")
+
+
+if __name__ == '__main__':
+    main()
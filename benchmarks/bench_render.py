@@ -0,0 +1,73 @@
+# benchmarks/bench_render.py
+"""Measure per-page render time and payload of the Find Flights results list.
+
+Drives app.py headlessly through Streamlit's AppTest harness with a broad
+search (all airlines, full price range) and reports, per page size, the
+RenderMeter figures recorded by search_flights() alongside the size of the
+element protos actually sent to the browser.
+
+    python benchmarks/bench_render.py [--inventory 5000] [--page-sizes 5 10 20 50]
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def find(widgets, label):
+    return next(w for w in widgets if w.label == label)
+
+
+def proto_bytes(node):
+    total = node.proto.ByteSize() if getattr(node, 'proto', None) is not None else 0
+    for child in getattr(node, 'children', {}).values():
+        total += proto_bytes(child)
+    return total
+
+
+def run(inventory_size, page_sizes):
+    os.environ['SKYWINGS_INVENTORY_SIZE'] = str(inventory_size)
+    os.environ['SKYWINGS_PROFILING'] = '1'
+    sys.path.insert(0, ROOT)
+    from streamlit.testing.v1 import AppTest
+    from inventory import AIRLINES
+
+    at = AppTest.from_file(os.path.join(ROOT, 'app.py'), default_timeout=300)
+    at.run()
+    at.sidebar.radio[0].set_value("🔍 Find Flights").run()
+    find(at.multiselect, "Airlines").set_value(AIRLINES)
+    prices = find(at.slider, "Price Range ($)")
+    prices.set_value((prices.min, prices.max))
+    find(at.button, "🔍 Apply Filters").click()
+    at.run()
+
+    results = []
+    for page_size in page_sizes:
+        find(at.selectbox, "Results per page").set_value(page_size)
+        start = time.perf_counter()
+        at.run()
+        elapsed = time.perf_counter() - start
+        stats = at.session_state['render_stats']
+        results.append({'page_size': page_size, 'rerun_ms': elapsed * 1000,
+                        'render_ms': stats['render_ms'], 'payload_bytes': stats['payload_bytes'],
+                        'proto_bytes': proto_bytes(at.main), 'figures': stats['figures']})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--inventory', type=int, default=5000)
+    parser.add_argument('--page-sizes', type=int, nargs='+', default=[5, 10, 20, 50])
+    args = parser.parse_args()
+
+    print(f"{'page size':>9} {'rerun (ms)':>11} {'render (ms)':>12} {'payload (KB)':>13} "
+          f"{'proto (KB)':>11} {'figures':>8}")
+    for r in run(args.inventory, args.page_sizes):
+        print(f"{r['page_size']:>9} {r['rerun_ms']:>11.0f} {r['render_ms']:>12.0f} "
+              f"{r['payload_bytes'] / 1024:>13.1f} {r['proto_bytes'] / 1024:>11.1f} {r['figures']:>8}")
+
+
+if __name__ == '__main__':
+    main()
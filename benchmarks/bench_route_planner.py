@@ -0,0 +1,66 @@
+# benchmarks/bench_route_planner.py
+"""Itinerary query latency of RoutePlanner across inventory sizes.
+
+Each query asks for the 5 best itineraries (up to 2 stops) between a
+random city pair, leaving within a 48-hour window, for every objective.
+
+    python benchmarks/bench_route_planner.py [--sizes 10000 100000 1000000] [--queries 30]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_search import make_flights
+from flight_schema import compact_flights
+from inventory import CITIES
+from route_planner import OBJECTIVES, RoutePlanner
+
+
+def run(sizes, query_count, horizon_hours=48):
+    rows = []
+    for n in sizes:
+        flights = make_flights(n)
+        compact = compact_flights(flights)
+        start = time.perf_counter()
+        planner = RoutePlanner(compact)
+        build = time.perf_counter() - start
+
+        rng = np.random.default_rng(7)
+        first, last = flights['departure_time'].min(), flights['departure_time'].max()
+        queries = [(*rng.choice(CITIES, 2, replace=False),
+                    first + (last - first - pd.Timedelta(hours=horizon_hours)) * rng.random())
+                   for _ in range(query_count)]
+        for objective in OBJECTIVES:
+            samples, found = [], 0
+            for origin, destination, depart_after in queries:
+                start = time.perf_counter()
+                found += bool(planner.plan(origin, destination, depart_after, horizon_hours, objective))
+                samples.append(time.perf_counter() - start)
+            samples.sort()
+            rows.append({'rows': n, 'objective': objective, 'build_s': build,
+                         'mean_ms': sum(samples) / len(samples) * 1e3,
+                         'p95_ms': samples[int(len(samples) * 0.95) - 1] * 1e3,
+                         'found': found / len(queries)})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--queries', type=int, default=30)
+    args = parser.parse_args()
+
+    print(f"{'rows':>9} {'objective':>13} {'build (s)':>10} {'mean (ms)':>10} {'p95 (ms)':>9} {'found':>6}")
+    for r in run(args.sizes, args.queries):
+        print(f"{r['rows']:>9} {r['objective']:>13} {r['build_s']:>10.2f} {r['mean_ms']:>10.1f} "
+              f"{r['p95_ms']:>9.1f} {r['found']:>6.0%}")
+
+
+if __name__ == '__main__':
+    main()
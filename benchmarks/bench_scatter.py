@@ -0,0 +1,65 @@
+# benchmarks/bench_scatter.py
+"""Payload size and build time of each duration-vs-price rendering mode.
+
+"full" is the old chart: an SVG px.scatter of every inventory row with
+hover data. The other modes are what duration_price_figure() produces
+from FlightAggregates; "auto" shows which one the page would pick.
+
+    python benchmarks/bench_scatter.py [--sizes 1000 10000 100000 1000000] [--full-max 100000]
+"""
+import argparse
+import os
+import sys
+import time
+
+import plotly.express as px
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analytics_aggregates import FlightAggregates
+from analytics_charts import SCATTER_MODES, duration_price_figure, scatter_mode
+from bench_search import make_flights
+from flight_schema import compact_flights
+
+
+def full_figure(flights):
+    flights = flights.assign(duration_hours=flights['duration'].dt.total_seconds() / 3600)
+    return px.scatter(flights, x='duration_hours', y='price', color='class',
+                      hover_data=['departure_city', 'arrival_city'])
+
+
+def measure(build):
+    start = time.perf_counter()
+    payload = build().to_json()
+    return (time.perf_counter() - start) * 1e3, len(payload)
+
+
+def run(sizes, full_max):
+    rows = []
+    for n in sizes:
+        flights = make_flights(n)
+        summary = FlightAggregates.from_flights(compact_flights(flights)).summary()
+        if n <= full_max:
+            ms, size = measure(lambda: full_figure(flights))
+            rows.append({'rows': n, 'mode': 'full', 'build_ms': ms, 'payload_bytes': size})
+        for mode in SCATTER_MODES:
+            ms, size = measure(lambda: duration_price_figure(summary, mode))
+            label = f"auto={scatter_mode(summary)}" if mode == 'auto' else mode
+            rows.append({'rows': n, 'mode': label, 'build_ms': ms, 'payload_bytes': size})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument('--full-max', type=int, default=100_000,
+                        help="largest inventory to render with the old full scatter")
+    args = parser.parse_args()
+
+    print(f"{'rows':>9} {'mode':>14} {'build (ms)':>11} {'payload (KB)':>13}")
+    for r in run(args.sizes, args.full_max):
+        print(f"{r['rows']:>9} {r['mode']:>14} {r['build_ms']:>11.0f} {r['payload_bytes'] / 1024:>13.1f}")
+
+
+if __name__ == '__main__':
+    main()
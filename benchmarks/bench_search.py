@@ -0,0 +1,117 @@
+# benchmarks/bench_search.py
+"""Compare FlightIndex.search() against the pandas boolean-mask search path.
+
+    python benchmarks/bench_search.py [--sizes 10000 100000 1000000]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flight_index import FlightIndex
+from flight_schema import compact_flights
+from inventory import AIRCRAFT_TYPES, AIRLINES, CITIES, CLASSES
+
+SORT_COLUMNS = {'price': ('price', True), '-price': ('price', False),
+                'duration': ('duration', True), 'departure_time': ('departure_time', True)}
+
+
+def make_flights(n, seed=0):
+    rng = np.random.default_rng(seed)
+    departure = rng.integers(0, len(CITIES), n)
+    arrival = (departure + rng.integers(1, len(CITIES), n)) % len(CITIES)
+    start = pd.Timestamp.now().floor('h')
+    departure_time = start + pd.to_timedelta(rng.integers(24, 24 * 31, n), unit='h')
+    duration = pd.to_timedelta(rng.integers(1, 13, n), unit='h')
+    return pd.DataFrame({
+        'flight_number': [f'SW{i:07d}' for i in range(n)],
+        'airline': np.asarray(AIRLINES)[rng.integers(0, len(AIRLINES), n)],
+        'departure_city': np.asarray(CITIES)[departure],
+        'arrival_city': np.asarray(CITIES)[arrival],
+        'departure_time': departure_time,
+        'arrival_time': departure_time + duration,
+        'duration': duration,
+        'price': np.round(rng.uniform(150, 1500, n), 2),
+        'available_seats': rng.integers(5, 201, n),
+        'aircraft_type': np.asarray(AIRCRAFT_TYPES)[rng.integers(0, len(AIRCRAFT_TYPES), n)],
+        'class': np.asarray(CLASSES)[rng.integers(0, len(CLASSES), n)],
+    })
+
+
+def mask_search(flights_df, departure=None, arrival=None, airlines=None, flight_class=None,
+                price_range=None, sort_by='price'):
+    # The filter/sort pipeline search_flights() ran before FlightIndex
+    if departure is not None:
+        flights_df = flights_df[flights_df['departure_city'] == departure]
+    if arrival is not None:
+        flights_df = flights_df[flights_df['arrival_city'] == arrival]
+    if airlines:
+        flights_df = flights_df[flights_df['airline'].isin(airlines)]
+    if flight_class is not None:
+        flights_df = flights_df[flights_df['class'] == flight_class]
+    if price_range is not None:
+        flights_df = flights_df[(flights_df['price'] >= price_range[0]) &
+                                (flights_df['price'] <= price_range[1])]
+    column, ascending = SORT_COLUMNS[sort_by]
+    return flights_df.sort_values(column, ascending=ascending)
+
+
+def make_queries(count, seed=1):
+    rng = np.random.default_rng(seed)
+    queries = []
+    for _ in range(count):
+        low = int(rng.integers(100, 1500))
+        queries.append({
+            'departure': CITIES[rng.integers(len(CITIES))] if rng.random() < 0.7 else None,
+            'arrival': CITIES[rng.integers(len(CITIES))] if rng.random() < 0.7 else None,
+            'airlines': list(rng.choice(AIRLINES, 2, replace=False)) if rng.random() < 0.5 else None,
+            'flight_class': CLASSES[rng.integers(len(CLASSES))] if rng.random() < 0.5 else None,
+            'price_range': (low, low + int(rng.integers(100, 800))),
+            'sort_by': ('price', '-price', 'duration', 'departure_time')[rng.integers(4)],
+        })
+    return queries
+
+
+def timed(fn, queries):
+    start = time.perf_counter()
+    results = [fn(**q) for q in queries]
+    return (time.perf_counter() - start) / len(queries), results
+
+
+def run(sizes, query_count=50):
+    rows = []
+    queries = make_queries(query_count)
+    for n in sizes:
+        flights = make_flights(n)
+        start = time.perf_counter()
+        index = FlightIndex(compact_flights(flights))
+        build = time.perf_counter() - start
+
+        mask_time, expected = timed(lambda **q: mask_search(flights, **q), queries)
+        index_time, actual = timed(index.search, queries)
+        for frame, ids in zip(expected, actual):
+            assert len(frame) == len(ids) and set(frame.index) == set(ids)
+        rows.append({'rows': n, 'build_s': build, 'mask_ms': mask_time * 1e3,
+                     'index_ms': index_time * 1e3, 'speedup': mask_time / index_time})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--queries', type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'build (s)':>10} {'mask (ms)':>10} {'index (ms)':>11} {'speedup':>8}")
+    for r in run(args.sizes, args.queries):
+        print(f"{r['rows']:>10} {r['build_s']:>10.2f} {r['mask_ms']:>10.2f} "
+              f"{r['index_ms']:>11.3f} {r['speedup']:>7.0f}x")
+
+
+if __name__ == '__main__':
+    main()
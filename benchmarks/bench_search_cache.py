@@ -0,0 +1,116 @@
+# benchmarks/bench_search_cache.py
+"""Search throughput and hit rate of SearchCache under a skewed query mix.
+
+Worker threads stand in for Streamlit script threads. Each draws queries
+from a Zipf-weighted catalog of distinct filter combinations; a share of
+operations are bookings, which sell flights out; as in search_flights(),
+sold-out flights are filtered after the cache lookup. "uncached" runs the
+same mix straight against the index.
+
+    python benchmarks/bench_search_cache.py [--rows 1000000] [--cache-sizes 0 64 512 4096]
+"""
+import argparse
+import itertools
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flight_index import FlightIndex, SORT_KEYS
+from inventory import AIRLINES, CITIES, CLASSES, generate_flight_data
+from search_cache import SearchCache, search_key
+from seat_inventory import SeatInventory
+
+
+def make_catalog(size, seed=0):
+    rng = np.random.default_rng(seed)
+    cities = [None] + CITIES
+    combos = list(itertools.product(cities, cities, [None] + CLASSES, SORT_KEYS))
+    picks = rng.choice(len(combos), min(size, len(combos)), replace=False)
+    catalog = []
+    for departure, arrival, flight_class, sort_by in (combos[i] for i in picks):
+        airlines = list(rng.choice(AIRLINES, rng.integers(0, 3), replace=False))
+        low = int(rng.integers(1, 5)) * 100
+        catalog.append(search_key(departure, arrival, airlines, flight_class, (low, low + 1500), sort_by))
+    return catalog
+
+
+def run_mix(index, seats, cache, catalog, threads, ops_per_thread, book_share, zipf=1.1, seed=0):
+    weights = 1 / np.arange(1, len(catalog) + 1) ** zipf
+    weights /= weights.sum()
+    latencies = []
+
+    def worker(worker_id):
+        rng = np.random.default_rng(seed + worker_id)
+        queries = rng.choice(len(catalog), ops_per_thread, p=weights)
+        samples = []
+        for q in queries:
+            key = catalog[q]
+            start = time.perf_counter()
+
+            if cache is None:
+                matches = index.search(*key)
+            else:
+                matches = cache.get(key, 'v1', lambda: index.search(*key))
+            rows = matches[seats.in_stock(matches)]
+            samples.append(time.perf_counter() - start)
+            if len(rows) and rng.random() < book_share:
+                hold = seats.reserve(int(rows[0]))
+                if hold is not None:
+                    seats.confirm(hold)
+        latencies.extend(samples)
+
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return elapsed, latencies
+
+
+def run(rows, cache_sizes, catalog_size, threads, ops, book_share):
+    flights = generate_flight_data(rows, seed=42)
+    index = FlightIndex(flights)
+    catalog = make_catalog(catalog_size)
+    results = []
+    for size in cache_sizes:
+        seats = SeatInventory(flights['available_seats'])
+        cache = SearchCache(maxsize=size) if size else None
+        elapsed, latencies = run_mix(index, seats, cache, catalog, threads, ops, book_share)
+        stats = cache.stats() if cache else {}
+        results.append({'cache_size': size or 'uncached', 'searches_per_s': len(latencies) / elapsed,
+                        'mean_us': sum(latencies) / len(latencies) * 1e6,
+                        'p95_us': latencies[int(len(latencies) * 0.95)] * 1e6,
+                        'hit_rate': stats.get('hit_rate', 0.0), 'evictions': stats.get('evictions', 0),
+                        'invalidations': stats.get('invalidations', 0)})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--cache-sizes', type=int, nargs='+', default=[0, 64, 512, 4096],
+                        help="0 runs without a cache")
+    parser.add_argument('--catalog', type=int, default=2000, help="distinct queries in the mix")
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--ops', type=int, default=2000, help="searches per thread")
+    parser.add_argument('--book-share', type=float, default=0.05,
+                        help="fraction of searches followed by a booking")
+    args = parser.parse_args()
+
+    print(f"{'cache':>9} {'searches/s':>11} {'mean (us)':>10} {'p95 (us)':>10} {'hit rate':>9} "
+          f"{'evictions':>10} {'invalidations':>14}")
+    for r in run(args.rows, args.cache_sizes, args.catalog, args.threads, args.ops, args.book_share):
+        print(f"{r['cache_size']:>9} {r['searches_per_s']:>11,.0f} {r['mean_us']:>10.0f} {r['p95_us']:>10.0f} "
+              f"{r['hit_rate']:>9.0%} {r['evictions']:>10} {r['invalidations']:>14}")
+
+
+if __name__ == '__main__':
+    main()
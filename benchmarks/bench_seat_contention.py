@@ -0,0 +1,76 @@
+# benchmarks/bench_seat_contention.py
+"""Reservation throughput and p99 latency of SeatInventory under contention.
+
+Each thread repeatedly reserves a seat on a random flight and confirms (or,
+one time in four, releases) the hold. Runs with one global lock and with
+striped locks so the effect of striping is visible, and checks afterwards
+that no flight was oversold.
+
+    python benchmarks/bench_seat_contention.py [--threads 1 2 4 8 16 32] [--flights 1000]
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from seat_inventory import LOCK_STRIPES, SeatInventory
+
+
+def run(threads, stripes, flights, ops_per_thread, seats_per_flight=150):
+    inventory = SeatInventory([seats_per_flight] * flights, stripes=stripes)
+    latencies = [[] for _ in range(threads)]
+    sold = [0] * threads
+    barrier = threading.Barrier(threads)
+
+    def worker(t):
+        rng = random.Random(t)
+        barrier.wait()
+        for _ in range(ops_per_thread):
+            flight = rng.randrange(flights)
+            start = time.perf_counter()
+            hold = inventory.reserve(flight)
+            latencies[t].append(time.perf_counter() - start)
+            if hold is None:
+                continue
+            if rng.random() < 0.25:
+                inventory.release(hold)
+            elif inventory.confirm(hold):
+                sold[t] += 1
+
+    pool = [threading.Thread(target=worker, args=(t,)) for t in range(threads)]
+    start = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    remaining = sum(inventory.available(f) for f in range(flights))
+    assert remaining >= 0 and remaining + sum(sold) == flights * seats_per_flight
+    samples = sorted(x for per_thread in latencies for x in per_thread)
+    return {'threads': threads, 'stripes': stripes,
+            'ops_per_sec': len(samples) / elapsed,
+            'p99_us': samples[int(len(samples) * 0.99) - 1] * 1e6}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument('--stripes', type=int, nargs='+', default=[1, LOCK_STRIPES])
+    parser.add_argument('--flights', type=int, default=1000)
+    parser.add_argument('--ops', type=int, default=20_000, help="reservations per thread")
+    args = parser.parse_args()
+
+    print(f"{'threads':>7} {'stripes':>7} {'reserves/s':>11} {'p99 (us)':>9}")
+    for threads in args.threads:
+        for stripes in args.stripes:
+            r = run(threads, stripes, args.flights, args.ops)
+            print(f"{r['threads']:>7} {r['stripes']:>7} {r['ops_per_sec']:>11.0f} {r['p99_us']:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+# benchmarks/bench_startup.py
+"""Cold-start import time and first paint of each page, plus warm reruns.
+
+Every page is measured in a fresh interpreter, as a new container or
+worker process would see it: "first paint" is the time from process
+start until the first run of app.py on that page has finished, and
+"rerun" the median of the reruns after it. The import table times each
+module app.py pulls in at startup, in app.py's order, in one fresh
+interpreter, so a row only counts what earlier rows had not already
+imported. "charting loaded" reports which of the optional heavy modules
+had been imported by the time the page had rendered.
+
+    python benchmarks/bench_startup.py [--pages home search analytics profile] [--flights 1000]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PAGES = {'home': "🏠 Home", 'search': "🔍 Find Flights", 'my_bookings': "📋 My Bookings",
+         'analytics': "📊 Analytics", 'profile': "👤 Profile"}
+# Modules only some pages need; the Home page should load none of them
+LAZY_MODULES = ('plotly.express', 'pyarrow.parquet', 'pyinstrument', 'analytics_charts', 'route_maps')
+# Imported by app.py at the top, in the order it imports them
+STARTUP_IMPORTS = ('streamlit', 'pandas', 'numpy', 'analytics_aggregates', 'booking_store', 'flight_index',
+                   'flight_schema', 'instrumentation', 'inventory', 'jobs', 'notifications', 'pagination',
+                   'route_planner', 'search_cache', 'seat_inventory', 'static_assets')
+
+
+def child(page, reruns):
+    # Executed in the fresh interpreter; ``started`` is stamped by the parent
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.join(ROOT, 'app.py'), default_timeout=600)
+    at.session_state['page'] = PAGES[page]
+    at.run()
+    first_paint = time.time()
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+    samples = []
+    for _ in range(max(1, reruns)):
+        start = time.perf_counter()
+        at.run()
+        samples.append(time.perf_counter() - start)
+    print(json.dumps({'first_paint': first_paint, 'rerun_s': statistics.median(samples),
+                      'loaded': [m for m in LAZY_MODULES if m in sys.modules]}))
+
+
+def cold_start(page, flights, reruns=5):
+    """First-paint and rerun timings of ``page`` in a new interpreter."""
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, SKYWINGS_INVENTORY_SIZE=str(flights),
+                   SKYWINGS_BOOKING_STORE='sqlite:///' + os.path.join(tmp, 'bookings.db'),
+                   SKYWINGS_OUTBOX_DIR=os.path.join(tmp, 'outbox'),
+                   SKYWINGS_METRICS_PORT='0', SKYWINGS_METRICS_FILE='', SKYWINGS_PROFILING='1')
+        started = time.time()
+        proc = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', page,
+                               '--reruns', str(reruns)], env=env, cwd=tmp, capture_output=True, text=True)
+    if proc.returncode:
+        raise RuntimeError(f"{page} failed:\n{proc.stderr[-2000:]}")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result['first_paint_s'] = result.pop('first_paint') - started
+    return result
+
+
+IMPORT_SCRIPT = """
+import importlib, json, sys, time
+times = {}
+for module in sys.argv[1:]:
+    start = time.perf_counter()
+    importlib.import_module(module)
+    times[module] = time.perf_counter() - start
+print(json.dumps(times))
+"""
+
+
+def import_times(modules=STARTUP_IMPORTS):
+    """Seconds each module adds to startup when imported in this order."""
+    proc = subprocess.run([sys.executable, '-c', IMPORT_SCRIPT, *modules], cwd=ROOT, capture_output=True,
+                          text=True, check=True)
+    return json.loads(proc.stdout)
+
+
+def interpreter_baseline():
+    start = time.time()
+    subprocess.run([sys.executable, '-c', 'pass'], check=True)
+    return time.time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', nargs='+', choices=list(PAGES), default=['home', 'search', 'analytics', 'profile'])
+    parser.add_argument('--flights', type=int, default=1000)
+    parser.add_argument('--reruns', type=int, default=5)
+    parser.add_argument('--child', choices=list(PAGES), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.reruns)
+        return
+
+    print(f"{'module':<22} {'import (ms)':>12}")
+    times = import_times()
+    for module, seconds in times.items():
+        print(f"{module:<22} {seconds * 1e3:>12.1f}")
+    print(f"{'total':<22} {sum(times.values()) * 1e3:>12.1f}")
+    print(f"bare interpreter start: {interpreter_baseline() * 1e3:.0f} ms\n")
+
+    print(f"{'page':<12} {'first paint (ms)':>17} {'rerun (ms)':>11}  charting loaded")
+    for page in args.pages:
+        r = cold_start(page, args.flights, args.reruns)
+        print(f"{page:<12} {r['first_paint_s'] * 1e3:>17.0f} {r['rerun_s'] * 1e3:>11.1f}  "
+              f"{', '.join(r['loaded']) or '-'}")
+
+
+if __name__ == '__main__':
+    main()
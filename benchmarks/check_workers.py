@@ -0,0 +1,258 @@
+# benchmarks/check_workers.py
+"""Run several app worker processes on one shared state backend and check they agree.
+
+Each worker is its own Python process with its own Streamlit caches, as a
+replica behind a load balancer would be, and every step of a user's
+journey goes to a different worker than the step before, as with a
+non-sticky balancer. Checks:
+
+- journeys: search and hold a seat on one worker, fill in the booking
+  form on the next, see the booking under My Bookings on a third; the
+  browser session carries over through ?session= alone
+- contention: all workers book the same flight at once; exactly its
+  seats are sold, never more
+- agreement: every worker reports the same booking count and the same
+  schedule for a flight
+
+Exits with status 1 if any check fails.
+
+    python benchmarks/check_workers.py [--workers 3] [--journeys 6] [--backend sqlite]
+"""
+import argparse
+import functools
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PASSENGER = {'First Name': 'Ada', 'Last Name': 'Lovelace', 'Phone Number': '123'}
+
+
+# Worker side: one command per stdin line, one JSON reply per stdout line
+
+def app_session(session_id=None):
+    """A new browser connection to this worker, resuming ``session_id`` if given."""
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(os.path.join(ROOT, 'app.py'), default_timeout=120)
+    if session_id:
+        at.query_params['session'] = session_id
+    at.run()
+    return at
+
+
+def find(widgets, label):
+    return next(w for w in widgets if w.label == label)
+
+
+def check_run(at):
+    at.run()
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+
+
+def op_hold():
+    # Search and press "Book Now" on the first result
+    at = app_session()
+    at.session_state['page'] = "🔍 Find Flights"
+    check_run(at)
+    find(at.button, "Book Now").click()
+    check_run(at)
+    return {'session': at.session_state['session_id'], 'page': at.session_state['page']}
+
+
+def op_confirm(session_id, email):
+    at = app_session(session_id)
+    if at.session_state['page'] != "booking_form":
+        return {'page': at.session_state['page']}
+    fields = {t.label: t for t in at.text_input}
+    for label, value in dict(PASSENGER, **{'Email Address': email}).items():
+        fields[label].input(value)
+    find(at.button, "Confirm Booking").click()
+    check_run(at)
+    return {'page': at.session_state['page']}
+
+
+def op_my_bookings(session_id):
+    at = app_session(session_id)
+    at.session_state['page'] = "📋 My Bookings"
+    check_run(at)
+    return {'bookings': sum('Booking ID' in m.value for m in at.markdown)}
+
+
+@functools.lru_cache(maxsize=None)
+def shared_objects():
+    # The same objects app.py builds through st.cache_resource, for the
+    # checks that drive the backend directly
+    from inventory import data_version
+    from service import load_shared_inventory
+    from state_backend import open_state_backend
+
+    backend = open_state_backend()
+    version = data_version()
+    return backend, version, load_shared_inventory(backend, version)
+
+
+@functools.lru_cache(maxsize=None)
+def shared_seats():
+    backend, version, inventory = shared_objects()
+    return backend.seat_inventory(version, inventory.flights['available_seats']), inventory
+
+
+def op_largest_flight():
+    _, inventory = shared_seats()
+    return int(inventory.flights['available_seats'].to_numpy().argmax())
+
+
+def op_contend(flight_id, start_at):
+    seats, _ = shared_seats()
+    while time.time() < start_at:
+        time.sleep(0.001)
+    sold = attempts = 0
+    started = time.perf_counter()
+    while True:
+        attempts += 1
+        hold = seats.reserve(flight_id)
+        if hold is None:
+            break
+        if seats.confirm(hold):
+            sold += 1
+    return {'sold': sold, 'attempts': attempts, 'seconds': time.perf_counter() - started}
+
+
+def op_state(flight_id):
+    # What this worker sees: the Analytics booking count, and one flight's
+    # schedule and seats left
+    at = app_session()
+    at.session_state['page'] = "📊 Analytics"
+    check_run(at)
+    seats, inventory = shared_seats()
+    return {'bookings': find(at.metric, "Bookings").value,
+            'departure_ts': int(inventory.flights['departure_ts'].iat[flight_id]),
+            'available': seats.available(flight_id)}
+
+
+OPS = {'hold': op_hold, 'confirm': op_confirm, 'my_bookings': op_my_bookings,
+       'largest_flight': op_largest_flight, 'contend': op_contend, 'state': op_state}
+
+
+def serve():
+    for line in sys.stdin:
+        command = json.loads(line)
+        try:
+            reply = {'ok': OPS[command.pop('op')](**command)}
+        except Exception as exc:
+            reply = {'error': f"{type(exc).__name__}: {exc}"}
+        print(json.dumps(reply), flush=True)
+
+
+# Coordinator side
+
+class Worker:
+    def __init__(self, env):
+        self.proc = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve'], env=env,
+                                     cwd=env['SKYWINGS_WORKDIR'], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                     stderr=subprocess.DEVNULL, text=True)
+
+    def send(self, op, **args):
+        self.proc.stdin.write(json.dumps(dict(args, op=op)) + '\n')
+        self.proc.stdin.flush()
+
+    def receive(self):
+        reply = json.loads(self.proc.stdout.readline())
+        if 'error' in reply:
+            raise RuntimeError(reply['error'])
+        return reply['ok']
+
+    def call(self, op, **args):
+        self.send(op, **args)
+        return self.receive()
+
+    def close(self):
+        self.proc.stdin.close()
+        self.proc.wait()
+
+
+def run(workers, journeys, backend, flights):
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, SKYWINGS_WORKDIR=tmp, SKYWINGS_INVENTORY_SIZE=str(flights),
+                   SKYWINGS_STATE_BACKEND=('sqlite:///' + os.path.join(tmp, 'state.db') if backend == 'sqlite'
+                                           else 'memory://'),
+                   SKYWINGS_BOOKING_STORE='sqlite:///' + os.path.join(tmp, 'bookings.db'),
+                   SKYWINGS_OUTBOX_DIR=os.path.join(tmp, 'outbox'),
+                   SKYWINGS_METRICS_PORT='0', SKYWINGS_METRICS_FILE='')
+        pool = [Worker(env) for _ in range(workers)]
+        try:
+            # Journeys, each step on the next worker round-robin
+            started = time.perf_counter()
+            for i in range(journeys):
+                email = f'traveller{i}@example.com'
+                step = iter(pool[(i + k) % workers] for k in range(3))
+                held = next(step).call('hold')
+                confirmed = next(step).call('confirm', session_id=held['session'], email=email)
+                listed = next(step).call('my_bookings', session_id=held['session'])
+                if confirmed['page'] != 'booking_confirmed' or listed['bookings'] != 1:
+                    failures.append(f"journey {i}: hold -> {held['page']}, confirm -> {confirmed['page']}, "
+                                    f"my bookings -> {listed['bookings']}")
+            journey_s = (time.perf_counter() - started) / journeys
+
+            # Every worker books the same flight at the same moment
+            flight_id = pool[0].call('largest_flight')
+            available = pool[0].call('state', flight_id=flight_id)['available']
+            start_at = time.time() + 1.0
+            for worker in pool:
+                worker.send('contend', flight_id=flight_id, start_at=start_at)
+            results = [worker.receive() for worker in pool]
+            contention = {'seats': available, 'sold': sum(r['sold'] for r in results),
+                          'reservations_per_s': sum(r['attempts'] for r in results)
+                          / max(r['seconds'] for r in results)}
+
+            # Everyone sees the same bookings, schedule and seats left
+            states = [worker.call('state', flight_id=flight_id) for worker in pool]
+        finally:
+            for worker in pool:
+                worker.close()
+
+    if contention['sold'] != contention['seats']:
+        failures.append(f"contention: {contention['sold']} seats sold on a flight with {contention['seats']} left")
+    if any(s['available'] for s in states):
+        failures.append(f"contention: seats still shown after selling out: {[s['available'] for s in states]}")
+    if len({json.dumps(s, sort_keys=True) for s in states}) != 1:
+        failures.append(f"workers disagree: {states}")
+    return journey_s, contention, states, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=3)
+    parser.add_argument('--journeys', type=int, default=6)
+    parser.add_argument('--flights', type=int, default=500)
+    parser.add_argument('--backend', choices=['sqlite', 'memory'], default='sqlite',
+                        help="'memory' gives each worker its own state, to see the checks fail")
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve()
+        return
+
+    journey_s, contention, states, failures = run(args.workers, args.journeys, args.backend, args.flights)
+    print(f"{args.workers} workers, {args.backend} backend")
+    print(f"journeys: {args.journeys}, {journey_s:.2f} s each (3 workers per journey)")
+    print(f"contention: {contention['sold']} of {contention['seats']} seats sold, "
+          f"{contention['reservations_per_s']:,.0f} reservations/s across workers")
+    print(f"bookings seen per worker: {[s['bookings'] for s in states]}")
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if failures:
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,346 @@
+# benchmarks/run.py
+"""Hot-path benchmark suite with JSON baselines and regression gating.
+
+Each case runs in its own subprocess with its own inventory size and a
+throwaway booking store, so module-level configuration and Streamlit
+caches start fresh. "core" cases call the extracted modules directly;
+"page" cases rerun app.py through Streamlit's AppTest harness.
+
+    python benchmarks/run.py --output baseline.json              # record a baseline
+    python benchmarks/run.py --baseline baseline.json            # run and gate against it
+    python benchmarks/run.py --compare baseline.json new.json    # gate two saved runs
+
+The gate fails (exit status 1) when a case's median is more than
+--threshold slower than the baseline and by more than --min-delta-ms.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PASSENGER = {'first_name': 'Ada', 'last_name': 'Lovelace', 'email': 'ada@example.com', 'phone': '123'}
+
+
+# Cases: each takes its parameter and a repeat count and returns timings in seconds
+
+def case_generate(n, repeat):
+    from inventory import generate_flight_data
+    return timings(lambda: generate_flight_data(n, seed=42), repeat)
+
+
+def case_search_index(n, repeat):
+    from bench_search import make_queries
+    from flight_index import FlightIndex
+    from inventory import generate_flight_data
+
+    index = FlightIndex(generate_flight_data(n, seed=42))
+    queries = make_queries(50)
+    return timings(lambda: [index.search(**q) for q in queries], repeat)
+
+
+def case_analytics_summary(n, repeat):
+    from analytics_aggregates import FlightAggregates
+    from analytics_charts import duration_price_figure, price_histogram_figure, top_destinations_figure
+    from inventory import generate_flight_data
+
+    aggregates = FlightAggregates.from_flights(generate_flight_data(n, seed=42))
+
+    def page():
+        summary = aggregates.summary()
+        for build in (price_histogram_figure, top_destinations_figure, duration_price_figure):
+            build(summary).to_json()
+    return timings(page, repeat)
+
+
+def case_pricing_reprice(n, repeat):
+    # Every flight repriced, as at the first pricing epoch
+    from inventory import generate_flight_data
+    from pricing import PricingEngine
+    from seat_inventory import SeatInventory
+
+    flights = generate_flight_data(n, seed=42)
+    seats = SeatInventory(flights['available_seats'])
+    return timings(lambda: PricingEngine(flights, seats).prices(), repeat)
+
+
+def case_airports_complete(n, repeat):
+    # Every keystroke of 50 city names, some with typos
+    from airports import AIRPORTS_PATH, AirportIndex, read_airports
+    from bench_airports import keystrokes, synthetic_airports
+
+    airports = synthetic_airports(read_airports(AIRPORTS_PATH), n)
+    index = AirportIndex(airports)
+    queries = keystrokes(airports, 50)
+    return timings(lambda: [index.complete(q) for q in queries], repeat)
+
+
+def case_event_log_recovery(n, repeat):
+    # Reopening a log of n events with no snapshot: a full replay. The
+    # log goes in the case's throwaway working directory
+    from bench_event_log import reopen, write_log
+
+    write_log('events', n, snapshot_every=n + 1)
+    return [reopen('events')[0] for _ in range(repeat)]
+
+
+def case_analytics_bookings(n, repeat):
+    # Every dashboard window read from the rollups of n bookings made over a year
+    from bench_booking_analytics import NOW, Bookings
+    from booking_analytics import WINDOWS, BookingAnalytics
+    from state_backend import LocalStateBackend
+
+    analytics, bookings = BookingAnalytics(LocalStateBackend(), clock=lambda: NOW), Bookings()
+    for start in range(0, n, 10_000):
+        batch, cancelled = bookings.make(min(10_000, n - start))
+        analytics.add_bookings(batch)
+        for booking in cancelled:
+            analytics.cancel_booking(booking)
+    return timings(lambda: [(analytics.series(*window), analytics.summary(*window)) for window in WINDOWS.values()],
+                   repeat)
+
+
+def case_startup_home(n, repeat):
+    # Process start to the Home page's first paint, in a new interpreter each time
+    from bench_startup import cold_start
+    return [cold_start('home', n, reruns=1)['first_paint_s'] for _ in range(repeat)]
+
+
+def case_search_page(n, repeat):
+    at = app_test(n)
+    navigate(at, "🔍 Find Flights")
+    prices = find(at.slider, "Price Range ($)")
+    ceiling = prices.max
+    samples = []
+    # A new price range each rerun, so every rerun misses the search cache
+    for i in range(repeat + 1):
+        find(at.slider, "Price Range ($)").set_value((100 + i, ceiling))
+        find(at.button, "🔍 Apply Filters").click()
+        samples.append(timed_run(at))
+    return samples[1:]
+
+
+def case_analytics_page(n, repeat):
+    at = app_test(n)
+    navigate(at, "📊 Analytics")
+    return [timed_run(at) for _ in range(repeat + 1)][1:]
+
+
+def case_booking_submit(n, repeat):
+    at = app_test(n)
+    samples = []
+    for _ in range(repeat + 1):
+        navigate(at, "🔍 Find Flights")
+        find(at.button, "Book Now").click().run()
+        fields = {t.label: t for t in at.text_input}
+        for label, key in (("First Name", 'first_name'), ("Last Name", 'last_name'),
+                           ("Email Address", 'email'), ("Phone Number", 'phone')):
+            fields[label].input(PASSENGER[key])
+        find(at.button, "Confirm Booking").click()
+        samples.append(timed_run(at))
+        assert at.session_state['page'] == "booking_confirmed", "booking was not confirmed"
+    return samples[1:]
+
+
+def case_my_bookings_page(bookings, repeat, n=1000):
+    from booking_store import open_booking_repository
+    from flight_schema import flight_records
+    from inventory import data_version, load_inventory
+
+    # Bookings go in through the repository before the app starts
+    inventory = load_inventory(size=n)
+    flights = flight_records(inventory.flights, range(min(bookings, n)))
+    repository = open_booking_repository(os.environ['SKYWINGS_BOOKING_STORE'])
+    for i in range(bookings):
+        repository.add({'flight': flights[i % len(flights)], 'inventory_version': data_version(),
+                        'passenger': dict(PASSENGER, seat_preference='Window'),
+                        'payment_method': 'Credit Card', 'booking_date': datetime.now(),
+                        'status': 'Confirmed'})
+    repository.close()
+
+    at = app_test(n)
+    at.session_state['user_info'] = dict(PASSENGER)
+    navigate(at, "📋 My Bookings")
+    return [timed_run(at) for _ in range(repeat + 1)][1:]
+
+
+# (name, parameter label, default parameters, function)
+CASES = [
+    ('generate', 'flights', [10_000, 100_000, 1_000_000], case_generate),
+    ('search.index', 'flights', [10_000, 100_000, 1_000_000], case_search_index),
+    ('analytics.summary', 'flights', [10_000, 100_000, 1_000_000], case_analytics_summary),
+    ('pricing.reprice', 'flights', [10_000, 100_000, 1_000_000], case_pricing_reprice),
+    ('airports.complete', 'airports', [1_000, 10_000], case_airports_complete),
+    ('event_log.recovery', 'events', [100_000], case_event_log_recovery),
+    ('analytics.bookings', 'bookings', [10_000, 100_000], case_analytics_bookings),
+    ('startup.home', 'flights', [1_000], case_startup_home),
+    ('search.page', 'flights', [1_000, 10_000, 100_000], case_search_page),
+    ('analytics.page', 'flights', [1_000, 10_000, 100_000], case_analytics_page),
+    ('booking.submit', 'flights', [1_000], case_booking_submit),
+    ('my_bookings.page', 'bookings', [10, 100, 1000], case_my_bookings_page),
+]
+
+
+# Helpers
+
+def timings(fn, repeat):
+    fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def app_test(inventory_size):
+    os.environ['SKYWINGS_INVENTORY_SIZE'] = str(inventory_size)
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(os.path.join(ROOT, 'app.py'), default_timeout=600)
+    at.run()
+    return at
+
+
+def find(widgets, label):
+    return next(w for w in widgets if w.label == label)
+
+
+def navigate(at, page):
+    at.session_state['page'] = page
+    at.run()
+
+
+def timed_run(at):
+    start = time.perf_counter()
+    at.run()
+    elapsed = time.perf_counter() - start
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+    return elapsed
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    return {'median_ms': statistics.median(ordered) * 1e3,
+            'p95_ms': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1e3,
+            'min_ms': ordered[0] * 1e3, 'runs': len(ordered)}
+
+
+def run_worker(name, param, repeat):
+    # Executed in the child process
+    fn = next(case[3] for case in CASES if case[0] == name)
+    print(json.dumps(fn(param, repeat)))
+
+
+def run_case(name, param, repeat):
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ,
+                   SKYWINGS_BOOKING_STORE='sqlite:///' + os.path.join(tmp, 'bookings.db'),
+                   SKYWINGS_OUTBOX_DIR=os.path.join(tmp, 'outbox'),
+                   SKYWINGS_METRICS_PORT='0', SKYWINGS_METRICS_FILE='', SKYWINGS_PROFILING='1')
+        proc = subprocess.run([sys.executable, os.path.abspath(__file__), '--worker', name, str(param),
+                               '--repeat', str(repeat)],
+                              env=env, cwd=tmp, capture_output=True, text=True)
+    if proc.returncode:
+        raise RuntimeError(f"{name}[{param}] failed:\n{proc.stderr[-2000:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def run_suite(only, repeat, params):
+    results = {}
+    for name, label, defaults, _ in CASES:
+        if only and not any(name.startswith(prefix) for prefix in only):
+            continue
+        for param in params.get(label) or defaults:
+            key = f"{name}[{param}]"
+            results[key] = summarize(run_case(name, param, repeat))
+            print(f"{key:<32} median {results[key]['median_ms']:>10.2f} ms   "
+                  f"p95 {results[key]['p95_ms']:>10.2f} ms", flush=True)
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(baseline, current, threshold, min_delta_ms):
+    """Print a comparison table; returns the keys that regressed."""
+    regressions = []
+    print(f"\n{'case':<32} {'baseline (ms)':>14} {'current (ms)':>13} {'change':>8}")
+    def order(key):
+        name, _, param = key.rstrip(']').partition('[')
+        return name, int(param) if param.isdigit() else 0
+
+    for key in sorted(set(baseline) | set(current), key=order):
+        if key not in current or key not in baseline:
+            status = 'missing' if key not in current else 'new'
+            print(f"{key:<32} {status:>37}")
+            continue
+        old, new = baseline[key]['median_ms'], current[key]['median_ms']
+        change = (new - old) / old if old else 0.0
+        regressed = change > threshold and new - old > min_delta_ms
+        if regressed:
+            regressions.append(key)
+        print(f"{key:<32} {old:>14.2f} {new:>13.2f} {change:>+8.0%}{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--only', nargs='+', help="run only cases whose name starts with these prefixes")
+    parser.add_argument('--sizes', type=int, nargs='+', help="inventory sizes (overrides each case's defaults)")
+    parser.add_argument('--bookings', type=int, nargs='+', help="booking counts (overrides the defaults of cases measured in bookings)")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help="write results to this JSON file")
+    parser.add_argument('--baseline', help="compare this run against a saved JSON baseline")
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CURRENT'),
+                        help="compare two saved runs without running anything")
+    parser.add_argument('--threshold', type=float, default=0.25, help="allowed slowdown, as a fraction")
+    parser.add_argument('--min-delta-ms', type=float, default=1.0,
+                        help="ignore slowdowns smaller than this, whatever the ratio")
+    parser.add_argument('--worker', nargs=2, metavar=('CASE', 'PARAM'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker[0], int(args.worker[1]), args.repeat)
+        return
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            baseline = json.load(f)['results']
+        with open(args.compare[1]) as f:
+            current = json.load(f)['results']
+    else:
+        current = run_suite(args.only, args.repeat, {'flights': args.sizes, 'bookings': args.bookings})
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump({'revision': git_revision(), 'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                           'python': platform.python_version(), 'machine': platform.platform(),
+                           'repeat': args.repeat, 'results': current}, f, indent=2)
+        if not args.baseline:
+            return
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+
+    regressions = compare(baseline, current, args.threshold, args.min_delta_ms)
+    if regressions:
+        print(f"\n{len(regressions)} case(s) regressed by more than {args.threshold:.0%}: "
+              f"{', '.join(regressions)}")
+        sys.exit(1)
+    print("\nNo regressions.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+# booking_analytics.py
+"""Time series over the bookings actually made, pre-aggregated as they come in.
+
+Bookings, cancellations, revenue by route and class, and the seat and
+meal preference mix are counted into minute, hour and day buckets of a
+StateBackend rollup, each resolution kept for a rolling window. The
+Analytics page and GET /analytics/bookings read whole buckets, never
+the bookings themselves.
+"""
+import os
+from collections import Counter
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+# Bucket width in seconds and the number of buckets kept, per resolution
+RESOLUTIONS = {
+    'minute': (60, int(os.environ.get('SKYWINGS_ANALYTICS_MINUTES', 24 * 60))),
+    'hour': (3600, int(os.environ.get('SKYWINGS_ANALYTICS_HOURS', 90 * 24))),
+    'day': (86400, int(os.environ.get('SKYWINGS_ANALYTICS_DAYS', 2 * 365))),
+}
+# Buckets read when a query gives no window
+DEFAULT_BUCKETS = {'minute': 60, 'hour': 24, 'day': 30}
+# Dashboard windows: label -> (resolution, buckets)
+WINDOWS = {
+    'Last hour': ('minute', 60),
+    'Last 24 hours': ('hour', 24),
+    'Last 7 days': ('hour', 7 * 24),
+    'Last 30 days': ('day', 30),
+    'Last year': ('day', 365),
+}
+SERIES_FIELDS = ('bookings', 'cancelled', 'revenue_cents')
+LOAD_BATCH = 10_000
+# Preferences a booking made before they were asked for counts under
+PREFERENCE_DEFAULTS = {'seat_preference': 'No Preference', 'meal_preference': 'Standard'}
+
+# Buckets count wall-clock time, as booking dates are recorded, so day
+# buckets start at local midnight
+EPOCH = datetime(1970, 1, 1)
+
+
+def _seconds(moment):
+    if moment.tzinfo is not None:
+        moment = moment.astimezone().replace(tzinfo=None)
+    return (moment - EPOCH).total_seconds()
+
+
+def _route(flight):
+    return f"{flight['departure_city']} → {flight['arrival_city']}"
+
+
+def _preference(passenger, field):
+    value = passenger.get(field)
+    return value if isinstance(value, str) and value else PREFERENCE_DEFAULTS[field]
+
+
+def booking_amounts(booking):
+    """Counter increments for a booking being made."""
+    flight, passenger = booking['flight'], booking['passenger']
+    cents = round(flight['price'] * 100)
+    return Counter({
+        'bookings': 1,
+        'revenue_cents': cents,
+        f"route_bookings:{_route(flight)}": 1,
+        f"route_revenue:{_route(flight)}": cents,
+        f"class_bookings:{flight['class']}": 1,
+        f"class_revenue:{flight['class']}": cents,
+        f"seat:{_preference(passenger, 'seat_preference')}": 1,
+        f"meal:{_preference(passenger, 'meal_preference')}": 1,
+    })
+
+
+def cancellation_amounts(booking):
+    """Counter increments for a booking being cancelled: its revenue comes off again."""
+    flight = booking['flight']
+    cents = round(flight['price'] * 100)
+    return Counter({
+        'cancelled': 1,
+        'revenue_cents': -cents,
+        f"route_revenue:{_route(flight)}": -cents,
+        f"class_revenue:{flight['class']}": -cents,
+    })
+
+
+def _ranked(totals, prefix, cents=False):
+    # {name: value} of the fields under ``prefix``, largest first
+    values = {field[len(prefix):]: value / 100 if cents else value for field, value in totals.items()
+              if field.startswith(prefix) and value}
+    return dict(sorted(values.items(), key=lambda item: -item[1]))
+
+
+class BookingAnalytics:
+    """Rolling minute/hour/day rollups of the bookings made through the service.
+
+    A cancellation counts against the bucket its booking was made in, so
+    a window's cancellation rate is that of the bookings made in it, and
+    its revenue is what those bookings still bring in. Workers sharing a
+    backend share the rollups. A process-local backend starts empty, so
+    its rollups are rebuilt from the bookings in ``repository`` that fall
+    within the longest window kept.
+    """
+
+    def __init__(self, backend, repository=None, clock=datetime.now):
+        self.clock = clock
+        self.rollups = backend.rollups('bookings', RESOLUTIONS)
+        if backend.local and repository is not None:
+            self._load(repository)
+
+    def _load(self, repository):
+        since = self.clock() - timedelta(seconds=max(width * keep for width, keep in RESOLUTIONS.values()))
+        items = []
+        for booking in repository.iter_bookings(since=since, batch_size=LOAD_BATCH):
+            amounts = booking_amounts(booking)
+            if booking['status'] == 'Cancelled':
+                amounts.update(cancellation_amounts(booking))
+            items.append((_seconds(booking['booking_date']), amounts))
+            if len(items) == LOAD_BATCH:
+                self._record(items)
+                items = []
+        self._record(items)
+
+    def _record(self, items):
+        if items:
+            self.rollups.incr(items, _seconds(self.clock()))
+
+    def add_booking(self, booking):
+        self.add_bookings([booking])
+
+    def add_bookings(self, bookings):
+        self._record([(_seconds(booking['booking_date']), booking_amounts(booking)) for booking in bookings])
+
+    def cancel_booking(self, booking):
+        self._record([(_seconds(booking['booking_date']), cancellation_amounts(booking))])
+
+    def window(self, resolution, buckets=None, end=None):
+        """First and last bucket of the ``buckets`` at ``resolution`` up to ``end`` (default now)."""
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"resolution must be one of {', '.join(RESOLUTIONS)}")
+        width, keep = RESOLUTIONS[resolution]
+        buckets = DEFAULT_BUCKETS[resolution] if buckets is None else buckets
+        if not 1 <= buckets <= keep:
+            raise ValueError(f"buckets must be between 1 and {keep} at {resolution} resolution")
+        last = int(_seconds(end or self.clock()) // width)
+        return last - buckets + 1, last
+
+    def series(self, resolution, buckets=None, end=None):
+        """One row per bucket, oldest first, empty buckets included.
+
+        Columns are time (the bucket's start), bookings, cancelled,
+        cancellation_rate and revenue.
+        """
+        first, last = self.window(resolution, buckets, end)
+        counts = {field: np.zeros(last - first + 1, dtype=np.int64) for field in SERIES_FIELDS}
+        for bucket, values in self.rollups.series(resolution, first, last, SERIES_FIELDS).items():
+            for field, value in values.items():
+                counts[field][bucket - first] = value
+        return pd.DataFrame({
+            'time': EPOCH + pd.to_timedelta(np.arange(first, last + 1) * RESOLUTIONS[resolution][0], unit='s'),
+            'bookings': counts['bookings'],
+            'cancelled': counts['cancelled'],
+            'cancellation_rate': counts['cancelled'] / counts['bookings'].clip(min=1),
+            'revenue': counts['revenue_cents'] / 100,
+        })
+
+    def summary(self, resolution, buckets=None, end=None):
+        """Totals over a window, with revenue and bookings by route and class and the preference mix."""
+        totals = self.rollups.totals(resolution, *self.window(resolution, buckets, end))
+        bookings, cancelled = totals.get('bookings', 0), totals.get('cancelled', 0)
+        return {
+            'bookings': bookings,
+            'cancelled': cancelled,
+            'cancellation_rate': cancelled / bookings if bookings else 0.0,
+            'revenue': totals.get('revenue_cents', 0) / 100,
+            'revenue_by_route': _ranked(totals, 'route_revenue:', cents=True),
+            'bookings_by_route': _ranked(totals, 'route_bookings:'),
+            'revenue_by_class': _ranked(totals, 'class_revenue:', cents=True),
+            'bookings_by_class': _ranked(totals, 'class_bookings:'),
+            'seat_preferences': _ranked(totals, 'seat:'),
+            'meal_preferences': _ranked(totals, 'meal:'),
+        }
@@ -0,0 +1,373 @@
+# booking_store.py
+"""Durable booking repositories shared by every session and worker."""
+import json
+import os
+import queue
+import secrets
+import sqlite3
+import threading
+from collections import Counter
+from concurrent.futures import Future
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+# "sqlite:///path/to/bookings.db" (default), "eventlog:///path/to/directory"
+# (see event_log.py; one process at a time) or "memory://"
+BOOKING_STORE_URL = os.environ.get('SKYWINGS_BOOKING_STORE', 'sqlite:///skywings.db')
+BOOKING_STATUSES = ('Confirmed', 'Cancelled')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bookings (
+    booking_id    TEXT PRIMARY KEY,
+    email         TEXT NOT NULL,
+    flight_number TEXT NOT NULL,
+    status        TEXT NOT NULL,
+    booking_date  TEXT NOT NULL,
+    payload       TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_bookings_email ON bookings (email, booking_date);
+CREATE INDEX IF NOT EXISTS idx_bookings_flight ON bookings (flight_number);
+CREATE INDEX IF NOT EXISTS idx_bookings_date ON bookings (booking_date, booking_id);
+"""
+
+
+def new_booking_id():
+    return f'BK{secrets.token_hex(5).upper()}'
+
+
+# Bookings hold datetimes, dates and durations; tag them so they round-trip
+def _encode(value):
+    if isinstance(value, datetime):
+        return {'__datetime__': value.isoformat()}
+    if isinstance(value, date):
+        return {'__date__': value.isoformat()}
+    if isinstance(value, timedelta):
+        return {'__timedelta__': value.total_seconds()}
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _decode(obj):
+    if '__datetime__' in obj:
+        return datetime.fromisoformat(obj['__datetime__'])
+    if '__date__' in obj:
+        return date.fromisoformat(obj['__date__'])
+    if '__timedelta__' in obj:
+        return timedelta(seconds=obj['__timedelta__'])
+    return obj
+
+
+def dumps_booking(booking):
+    return json.dumps(booking, default=_encode)
+
+
+def loads_booking(payload):
+    return json.loads(payload, object_hook=_decode)
+
+
+class BookingRepository:
+    """Storage interface for bookings; see open_booking_repository()."""
+
+    def add(self, booking):
+        """Store ``booking`` under a fresh booking_id and return it."""
+        raise NotImplementedError
+
+    def add_many(self, bookings):
+        """Store several bookings in one transaction; returns them with their ids."""
+        raise NotImplementedError
+
+    def iter_bookings(self, since=None, until=None, status=None, batch_size=1000):
+        """Yield bookings in booking_date order, ``batch_size`` at a time from the store.
+
+        ``since`` is inclusive and ``until`` exclusive. Only one batch is
+        held in memory at once.
+        """
+        raise NotImplementedError
+
+    def get(self, booking_id):
+        raise NotImplementedError
+
+    def list_by_email(self, email):
+        raise NotImplementedError
+
+    def list_by_flight(self, flight_number):
+        raise NotImplementedError
+
+    def set_status(self, booking_id, status):
+        """Update a booking's status; returns False if it does not exist or already has it.
+
+        The check and the update are one atomic step, so of concurrent
+        callers setting the same status exactly one gets True.
+        """
+        raise NotImplementedError
+
+    def seats_booked(self, version):
+        """Confirmed bookings per flight_id for inventory ``version``."""
+        raise NotImplementedError
+
+    def count(self):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class InMemoryBookingRepository(BookingRepository):
+    """Process-local repository, for tests and single-worker demos."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._bookings = {}
+        self._by_email = {}
+        self._by_flight = {}
+
+    def add(self, booking):
+        return self.add_many([booking])[0]
+
+    def add_many(self, bookings):
+        bookings = [dict(booking, booking_id=new_booking_id()) for booking in bookings]
+        with self._lock:
+            for booking in bookings:
+                self._bookings[booking['booking_id']] = booking
+                self._by_email.setdefault(booking['passenger']['email'], []).append(booking['booking_id'])
+                self._by_flight.setdefault(booking['flight']['flight_number'], []).append(booking['booking_id'])
+        return bookings
+
+    def iter_bookings(self, since=None, until=None, status=None, batch_size=1000):
+        with self._lock:
+            bookings = sorted(self._bookings.values(), key=lambda b: (b['booking_date'], b['booking_id']))
+        for booking in bookings:
+            if ((since is None or booking['booking_date'] >= since)
+                    and (until is None or booking['booking_date'] < until)
+                    and (status is None or booking['status'] == status)):
+                yield dict(booking)
+
+    def get(self, booking_id):
+        with self._lock:
+            booking = self._bookings.get(booking_id)
+            return dict(booking) if booking else None
+
+    def list_by_email(self, email):
+        with self._lock:
+            return [dict(self._bookings[b]) for b in self._by_email.get(email, [])]
+
+    def list_by_flight(self, flight_number):
+        with self._lock:
+            return [dict(self._bookings[b]) for b in self._by_flight.get(flight_number, [])]
+
+    def set_status(self, booking_id, status):
+        with self._lock:
+            booking = self._bookings.get(booking_id)
+            if booking is None or booking['status'] == status:
+                return False
+            self._bookings[booking_id] = dict(booking, status=status)
+            return True
+
+    def seats_booked(self, version):
+        with self._lock:
+            return dict(Counter(b['flight'].get('flight_id') for b in self._bookings.values()
+                                if b['status'] == 'Confirmed' and b.get('inventory_version') == version))
+
+    def count(self):
+        with self._lock:
+            return len(self._bookings)
+
+
+class ConnectionPool:
+    def __init__(self, path, size):
+        self._connections = queue.Queue()
+        for _ in range(size):
+            self._connections.put(connect_sqlite(path))
+
+    @contextmanager
+    def connection(self):
+        conn = self._connections.get()
+        try:
+            yield conn
+        finally:
+            self._connections.put(conn)
+
+    def close(self):
+        while not self._connections.empty():
+            self._connections.get_nowait().close()
+
+
+def connect_sqlite(path):
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute('PRAGMA busy_timeout=30000')
+    return conn
+
+
+class SQLiteBookingRepository(BookingRepository):
+    """SQLite (WAL) repository with pooled readers and group-committed writes.
+
+    Reads run on a pool of connections and never block each other or the
+    writer. Writes from every thread are queued to a single writer thread,
+    which commits whatever has accumulated (up to ``batch_size`` statements)
+    in one transaction, so concurrent bookings share one fsync. Callers
+    block until their own write is committed.
+    """
+
+    _STOP = object()
+
+    def __init__(self, path, pool_size=4, batch_size=256):
+        self.path = path
+        self.batch_size = batch_size
+        writer = connect_sqlite(path)
+        writer.executescript(SCHEMA)
+        self._pool = ConnectionPool(path, pool_size)
+        self._writes = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, args=(writer,),
+                                        name='booking-writer', daemon=True)
+        self._writer.start()
+
+    def _write_loop(self, conn):
+        while True:
+            batch = [self._writes.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._writes.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(item is self._STOP for item in batch)
+            batch = [item for item in batch if item is not self._STOP]
+            if batch:
+                self._commit(conn, batch)
+            if stop:
+                conn.close()
+                return
+
+    def _commit(self, conn, batch):
+        results = []
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            for sql, params, future in batch:
+                # A list of parameter tuples is one multi-row statement
+                execute = conn.executemany if isinstance(params, list) else conn.execute
+                conn.execute('SAVEPOINT statement')
+                try:
+                    results.append((future, execute(sql, params).rowcount, None))
+                except sqlite3.IntegrityError as exc:
+                    # Only the failing statement is rolled back, with every row
+                    # it had written, so the caller can retry it as a whole
+                    conn.execute('ROLLBACK TO statement')
+                    results.append((future, None, exc))
+                conn.execute('RELEASE statement')
+            conn.execute('COMMIT')
+        except sqlite3.Error as exc:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            for _, _, future in batch:
+                future.set_exception(exc)
+            return
+        for future, rowcount, exc in results:
+            if exc is None:
+                future.set_result(rowcount)
+            else:
+                future.set_exception(exc)
+
+    def _write(self, sql, params):
+        future = Future()
+        self._writes.put((sql, params, future))
+        return future.result()
+
+    def _query(self, sql, params):
+        with self._pool.connection() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def add(self, booking):
+        return self.add_many([booking])[0]
+
+    def add_many(self, bookings):
+        while True:
+            stored = [dict(booking, booking_id=new_booking_id()) for booking in bookings]
+            try:
+                self._write(
+                    'INSERT INTO bookings (booking_id, email, flight_number, status, booking_date, payload) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    [(booking['booking_id'], booking['passenger']['email'],
+                      booking['flight']['flight_number'], booking['status'],
+                      booking['booking_date'].isoformat(), dumps_booking(booking)) for booking in stored])
+                return stored
+            except sqlite3.IntegrityError:
+                continue  # booking_id collision; draw new ids for the lot
+
+    def _load(self, rows):
+        bookings = []
+        for status, payload in rows:
+            booking = loads_booking(payload)
+            booking['status'] = status
+            bookings.append(booking)
+        return bookings
+
+    def get(self, booking_id):
+        rows = self._query('SELECT status, payload FROM bookings WHERE booking_id = ?', (booking_id,))
+        return self._load(rows)[0] if rows else None
+
+    def list_by_email(self, email):
+        return self._load(self._query(
+            'SELECT status, payload FROM bookings WHERE email = ? ORDER BY booking_date', (email,)))
+
+    def list_by_flight(self, flight_number):
+        return self._load(self._query(
+            'SELECT status, payload FROM bookings WHERE flight_number = ? ORDER BY booking_date',
+            (flight_number,)))
+
+    def iter_bookings(self, since=None, until=None, status=None, batch_size=1000):
+        # Keyset pagination on the date index; no connection is held between batches
+        where, params = [], []
+        if since is not None:
+            where.append('booking_date >= ?')
+            params.append(since.isoformat())
+        if until is not None:
+            where.append('booking_date < ?')
+            params.append(until.isoformat())
+        if status is not None:
+            where.append('status = ?')
+            params.append(status)
+        after = None
+        while True:
+            page = where + ['(booking_date, booking_id) > (?, ?)'] if after else where
+            sql = 'SELECT booking_date, booking_id, status, payload FROM bookings'
+            if page:
+                sql += ' WHERE ' + ' AND '.join(page)
+            rows = self._query(sql + ' ORDER BY booking_date, booking_id LIMIT ?',
+                               (*params, *(after or ()), batch_size))
+            yield from self._load([row[2:] for row in rows])
+            if len(rows) < batch_size:
+                return
+            after = rows[-1][:2]
+
+    def set_status(self, booking_id, status):
+        return self._write('UPDATE bookings SET status = ? WHERE booking_id = ? AND status != ?',
+                           (status, booking_id, status)) > 0
+
+    def seats_booked(self, version):
+        return dict(self._query(
+            "SELECT json_extract(payload, '$.flight.flight_id') AS flight_id, COUNT(*) FROM bookings "
+            "WHERE status = 'Confirmed' AND json_extract(payload, '$.inventory_version') = ? "
+            "AND flight_id IS NOT NULL GROUP BY flight_id", (version,)))
+
+    def count(self):
+        return self._query('SELECT COUNT(*) FROM bookings', ())[0][0]
+
+    def close(self):
+        self._writes.put(self._STOP)
+        self._writer.join()
+        self._pool.close()
+
+
+def open_booking_repository(url=BOOKING_STORE_URL):
+    if url.startswith('memory://'):
+        return InMemoryBookingRepository()
+    if url.startswith('sqlite:///'):
+        return SQLiteBookingRepository(url[len('sqlite:///'):])
+    if url.startswith('eventlog:///'):
+        from event_log import EventLogBookingRepository
+        return EventLogBookingRepository(url[len('eventlog:///'):])
+    raise ValueError(f"Unsupported booking store: {url}")
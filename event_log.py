@@ -0,0 +1,428 @@
+# event_log.py
+"""Append-only booking event log with group-committed fsyncs, snapshots and replay.
+
+Every change to a booking is an event appended to the current segment
+file of a log directory:
+
+    segment-<first seq>.log     one event per line, oldest segment first
+    snapshot-<last seq>.pkl     every booking as of that event
+    lock                        locked by the one process that has the log open
+
+An event is a list of fields whose last item is a body: text without
+tabs or newlines (an encoded booking, or empty), kept as is. A line is
+the other fields as a JSON array, the body and the CRC-32 of both,
+separated by tabs, so a write torn by a crash is recognised and dropped
+when the log is next opened, and replay decodes the short arrays
+without parsing the bodies. Opening loads the newest snapshot and
+replays only the events after it.
+"""
+import glob
+import json
+import os
+import pickle
+import queue
+import threading
+import zlib
+from collections import Counter
+from concurrent.futures import Future
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, one process per directory is on the caller
+    fcntl = None
+
+from booking_store import BookingRepository, dumps_booking, loads_booking, new_booking_id
+
+# A new segment is started past this size, and at every snapshot
+EVENT_LOG_SEGMENT_BYTES = int(os.environ.get('SKYWINGS_EVENT_LOG_SEGMENT_MB', 64)) * 1024 * 1024
+# Events between snapshots; each snapshot lets older segments be deleted
+EVENT_LOG_SNAPSHOT_EVENTS = int(os.environ.get('SKYWINGS_EVENT_LOG_SNAPSHOT_EVENTS', 100_000))
+
+CREATED, MODIFIED, CANCELLED = 'created', 'modified', 'cancelled'
+
+
+class EventLogError(Exception):
+    """The log directory holds a damaged event before its last one, or another process has it open."""
+
+
+def _segment_path(directory, seq):
+    return os.path.join(directory, f'segment-{seq:020d}.log')
+
+
+def _snapshot_path(directory, seq):
+    return os.path.join(directory, f'snapshot-{seq:020d}.pkl')
+
+
+def _first_seq(path):
+    return int(os.path.basename(path).split('-')[1].split('.')[0])
+
+
+def _encode_event(event):
+    data = f'{json.dumps(event[:-1], separators=(",", ":"))}\t{event[-1]}'.encode('utf-8')
+    return b'%s\t%08x\n' % (data, zlib.crc32(data))
+
+
+def _split_events(lines):
+    # Fields and bodies of each line up to the first damaged one, and that line's index
+    fields, bodies = [], []
+    for line in lines:
+        data, tab, crc = line.rpartition(b'\t')
+        if not tab or crc != b'%08x' % zlib.crc32(data):
+            return fields, bodies, len(fields)
+        head, _, body = data.partition(b'\t')
+        fields.append(head)
+        bodies.append(body)
+    return fields, bodies, None
+
+
+class EventLog:
+    """Segment files of events, appended by one writer thread.
+
+    ``append`` queues events and blocks until they are on disk. The
+    writer takes everything queued (up to ``batch_size`` calls), writes it
+    with one buffered write and one fsync, and then hands the events, now
+    numbered, to ``apply`` in log order before the callers return. After
+    every ``snapshot_every`` events it starts a new segment, calls
+    ``snapshot`` for the state as of the last event, and writes that to
+    disk on a thread of its own; older segments are then deleted.
+
+    Only one process may have a directory open: the constructor takes an
+    exclusive lock on its lock file, held until ``close``, and raises
+    EventLogError if another process holds it. A batch whose write fails
+    is cut back off the segment, so the log never holds a partial line
+    ahead of later events.
+    """
+
+    _STOP = object()
+
+    def __init__(self, directory, apply, snapshot=None, segment_bytes=EVENT_LOG_SEGMENT_BYTES,
+                 snapshot_every=EVENT_LOG_SNAPSHOT_EVENTS, batch_size=512, sync=True):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.snapshot_every = snapshot_every
+        self.batch_size = batch_size
+        self.sync = sync
+        self._apply = apply
+        self._snapshot = snapshot
+        os.makedirs(directory, exist_ok=True)
+        self._lock_fd = self._acquire_lock()
+        self.seq = self.snapshot_seq = 0
+        self._file = None
+        self._failed = None
+        self._writes = queue.Queue()
+        self._snapshot_thread = None
+        self._writer = None
+
+    def _acquire_lock(self):
+        fd = os.open(os.path.join(self.directory, 'lock'), os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is not None:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                raise EventLogError(f"{self.directory} is open in another process") from None
+        return fd
+
+    # Recovery
+
+    def load(self):
+        """The newest snapshot's state and sequence number, or (None, 0)."""
+        snapshots = sorted(glob.glob(os.path.join(self.directory, 'snapshot-*.pkl')))
+        if not snapshots:
+            return None, 0
+        with open(snapshots[-1], 'rb') as f:
+            state = pickle.load(f)
+        self.seq = self.snapshot_seq = _first_seq(snapshots[-1])
+        return state, self.seq
+
+    def replay(self):
+        """Yield the events after the loaded snapshot, in order, a list per segment.
+
+        A segment is read whole and its events' fields decoded in one
+        json.loads.
+        A damaged or unfinished line at the very end of the last segment
+        is a write the process did not finish; it is cut off. Anywhere
+        else it raises EventLogError.
+        """
+        segments = sorted(glob.glob(os.path.join(self.directory, 'segment-*.log')))
+        # Segments starting after the snapshot, plus the one it ends in
+        starts = [_first_seq(path) for path in segments]
+        first = max([i for i, start in enumerate(starts) if start <= self.seq + 1], default=0)
+        for i, path in enumerate(segments[first:], first):
+            with open(path, 'rb') as f:
+                lines = f.read().split(b'\n')
+            # Empty when the segment ends with a complete line
+            unfinished = lines.pop()
+            fields, bodies, damaged = _split_events(lines)
+            if damaged is not None or unfinished:
+                offset = sum(len(line) + 1 for line in lines[:len(fields)])
+                if i != len(segments) - 1 or (damaged is not None and damaged != len(lines) - 1):
+                    raise EventLogError(f"Damaged event in {path} at byte {offset}")
+                os.truncate(path, offset)
+            events = json.loads(b'[' + b','.join(fields) + b']')
+            for event, body in zip(events, bodies):
+                event.append(body.decode('utf-8'))
+            if events and events[0][0] <= self.seq:
+                events = [event for event in events if event[0] > self.seq]
+            if events:
+                self.seq = events[-1][0]
+                yield events
+
+    def start(self):
+        """Open the last segment for appending and start the writer."""
+        segments = sorted(glob.glob(os.path.join(self.directory, 'segment-*.log')))
+        if segments and os.path.getsize(segments[-1]) < self.segment_bytes:
+            self._file = open(segments[-1], 'ab')
+        else:
+            self._roll()
+        self._writer = threading.Thread(target=self._write_loop, name='event-log-writer', daemon=True)
+        self._writer.start()
+
+    # Writing
+
+    def append(self, events):
+        """Append events ([kind, ..., body] lists); returns them numbered once durable."""
+        future = Future()
+        self._writes.put((events, future))
+        return future.result()
+
+    def _roll(self):
+        if self._file is not None:
+            self._file.close()
+        self._file = open(_segment_path(self.directory, self.seq + 1), 'ab')
+        self._fsync_directory()
+
+    def _fsync_directory(self):
+        if self.sync and hasattr(os, 'O_DIRECTORY'):
+            fd = os.open(self.directory, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+    def _write_loop(self):
+        while True:
+            batch = [self._writes.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._writes.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(item is self._STOP for item in batch)
+            batch = [item for item in batch if item is not self._STOP]
+            if batch:
+                self._commit(batch)
+            if stop:
+                self._file.close()
+                return
+
+    def _commit(self, batch):
+        if self._failed is not None:
+            for _, future in batch:
+                future.set_exception(self._failed)
+            return
+        numbered, lines = [], []
+        seq = self.seq
+        for events, _ in batch:
+            events = [[seq + i + 1, *event] for i, event in enumerate(events)]
+            seq += len(events)
+            numbered.append(events)
+            lines.extend(_encode_event(event) for event in events)
+        offset = self._file.tell()
+        try:
+            self._file.write(b''.join(lines))
+            self._file.flush()
+            if self.sync:
+                os.fsync(self._file.fileno())
+        except OSError as exc:
+            # Nothing is acknowledged; whatever reached the segment is cut off
+            for _, future in batch:
+                future.set_exception(exc)
+            self._truncate(offset)
+            return
+        self.seq = seq
+        for events, (_, future) in zip(numbered, batch):
+            try:
+                self._apply(events)
+            except Exception as exc:
+                future.set_exception(exc)
+            else:
+                future.set_result(events)
+        if self._file.tell() >= self.segment_bytes:
+            self._roll()
+        if self._snapshot is not None and self.seq - self.snapshot_seq >= self.snapshot_every:
+            self._start_snapshot()
+
+    def _truncate(self, offset):
+        # Reopened, as the closed file's buffer may still hold the failed batch
+        path = self._file.name
+        try:
+            self._file.close()
+        except OSError:
+            pass
+        try:
+            os.truncate(path, offset)
+            self._file = open(path, 'ab')
+        except OSError as exc:
+            # The segment may end in a partial line; later events would sit
+            # behind it, so every further append fails instead
+            self._failed = exc
+
+    def _start_snapshot(self):
+        # One at a time; a snapshot still being written pushes the next one back
+        if self._snapshot_thread is not None and self._snapshot_thread.is_alive():
+            return
+        self._roll()
+        self.snapshot_seq = self.seq
+        self._snapshot_thread = threading.Thread(target=self._write_snapshot, args=(self.seq, self._snapshot()),
+                                                 name='event-log-snapshot', daemon=True)
+        self._snapshot_thread.start()
+
+    def _write_snapshot(self, seq, state):
+        path = _snapshot_path(self.directory, seq)
+        with open(path + '.tmp', 'wb') as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            if self.sync:
+                os.fsync(f.fileno())
+        os.replace(path + '.tmp', path)
+        self._fsync_directory()
+        # Everything up to seq is in the snapshot now
+        for old in glob.glob(os.path.join(self.directory, 'snapshot-*.pkl')):
+            if _first_seq(old) < seq:
+                os.remove(old)
+        for segment in glob.glob(os.path.join(self.directory, 'segment-*.log')):
+            if _first_seq(segment) <= seq:
+                os.remove(segment)
+
+    def close(self):
+        if self._writer is not None:
+            self._writes.put(self._STOP)
+            self._writer.join()
+        if self._snapshot_thread is not None:
+            self._snapshot_thread.join()
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+
+class EventLogBookingRepository(BookingRepository):
+    """Bookings kept in memory and made durable through an EventLog.
+
+    Like the SQLite repository, each booking is held as a few indexed
+    columns plus its encoded payload (the event body), and the status
+    column wins over the payload's. Replay reads the columns straight off
+    each event and never decodes a payload; bookings are decoded only
+    when read. Writes return
+    once their events are fsynced (batched with concurrent writers) and
+    applied, so a reader sees every acknowledged write.
+    """
+
+    def __init__(self, directory, **log_options):
+        self._lock = threading.Lock()
+        # Held from a status check until its event is applied, as the
+        # writer thread needs _lock to apply it
+        self._status_lock = threading.Lock()
+        self._bookings = {}
+        self._by_email = {}
+        self._by_flight = {}
+        self.log = EventLog(directory, self._apply, self._state, **log_options)
+        state, _ = self.log.load()
+        if state is not None:
+            self._bookings = state
+            for booking_id, row in state.items():
+                self._index(booking_id, row)
+        for events in self.log.replay():
+            self._apply(events)
+        self.log.start()
+
+    # A booking row: status, email, flight_number, booking_date (ISO 8601),
+    # inventory_version, flight_id, payload
+    def _index(self, booking_id, row):
+        self._by_email.setdefault(row[1], []).append(booking_id)
+        self._by_flight.setdefault(row[2], []).append(booking_id)
+
+    def _apply(self, events):
+        # [seq, kind, booking_id, status, ..., body], in log order
+        with self._lock:
+            for event in events:
+                kind, booking_id = event[1], event[2]
+                if kind == CREATED:
+                    row = self._bookings[booking_id] = tuple(event[3:])
+                    self._index(booking_id, row)
+                elif booking_id in self._bookings:
+                    self._bookings[booking_id] = (event[3],) + self._bookings[booking_id][1:]
+
+    def _state(self):
+        # Rows are immutable tuples, so a shallow copy is a consistent snapshot
+        with self._lock:
+            return dict(self._bookings)
+
+    def _load(self, row):
+        booking = loads_booking(row[6])
+        booking['status'] = row[0]
+        return booking
+
+    def add(self, booking):
+        return self.add_many([booking])[0]
+
+    def add_many(self, bookings):
+        stored = []
+        with self._lock:
+            for booking in bookings:
+                booking_id = new_booking_id()
+                while booking_id in self._bookings:
+                    booking_id = new_booking_id()
+                stored.append(dict(booking, booking_id=booking_id))
+        self.log.append([[CREATED, b['booking_id'], b['status'], b['passenger']['email'],
+                          b['flight']['flight_number'], b['booking_date'].isoformat(),
+                          b.get('inventory_version'), b['flight'].get('flight_id'), dumps_booking(b)]
+                         for b in stored])
+        return stored
+
+    def get(self, booking_id):
+        with self._lock:
+            row = self._bookings.get(booking_id)
+        return self._load(row) if row else None
+
+    def _list(self, ids):
+        with self._lock:
+            rows = [self._bookings[b] for b in ids]
+        return [self._load(row) for row in sorted(rows, key=lambda row: row[3])]
+
+    def list_by_email(self, email):
+        return self._list(self._by_email.get(email, ()))
+
+    def list_by_flight(self, flight_number):
+        return self._list(self._by_flight.get(flight_number, ()))
+
+    def iter_bookings(self, since=None, until=None, status=None, batch_size=1000):
+        since, until = since and since.isoformat(), until and until.isoformat()
+        with self._lock:
+            rows = sorted(((row[3], booking_id, row) for booking_id, row in self._bookings.items()
+                           if (since is None or row[3] >= since) and (until is None or row[3] < until)
+                           and (status is None or row[0] == status)), key=lambda item: item[:2])
+        for _, _, row in rows:
+            yield self._load(row)
+
+    def set_status(self, booking_id, status):
+        with self._status_lock:
+            with self._lock:
+                row = self._bookings.get(booking_id)
+            if row is None or row[0] == status:
+                return False
+            self.log.append([[CANCELLED if status == 'Cancelled' else MODIFIED, booking_id, status, '']])
+            return True
+
+    def seats_booked(self, version):
+        with self._lock:
+            return dict(Counter(row[5] for row in self._bookings.values()
+                                if row[0] == 'Confirmed' and row[4] == version and row[5] is not None))
+
+    def count(self):
+        with self._lock:
+            return len(self._bookings)
+
+    def close(self):
+        self.log.close()
+
@@ -0,0 +1,136 @@
+# fare_calendar.py
+"""Lowest fare per route, departure day and class, for flexible-date searches."""
+import os
+import threading
+from collections import namedtuple
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+# Widest +/- day window the Home page and the API offer
+FARE_MAX_FLEX_DAYS = int(os.environ.get('SKYWINGS_FARE_MAX_FLEX_DAYS', 30))
+FLEX_DAY_OPTIONS = tuple(d for d in (1, 3, 7, 14, 30) if d <= FARE_MAX_FLEX_DAYS)
+
+NO_FARE = np.iinfo(np.int64).max
+EPOCH_DATE = date(1970, 1, 1)
+
+# ``fares`` is days x classes in dollars (NaN where nothing is on sale),
+# ``flight_ids`` the cheapest flight of each cell (-1 where none)
+FareWindow = namedtuple('FareWindow', ['dates', 'classes', 'fares', 'flight_ids'])
+
+
+def _day_number(day):
+    return (day - EPOCH_DATE).days
+
+
+class FareCalendar:
+    """Min-fare matrix over (route, departure day, class), updated in place.
+
+    Cells are laid out route-major, so one route's fares over a run of
+    days are a single contiguous slice: a 60-day window is one array
+    read, not 60 searches. Each cell holds ``price_cents * size + row`` of
+    its cheapest flight with seats left, so one minimum gives both the
+    fare and the flight. When fares change (a new pricing epoch) or seats
+    sell out or come back (seen through the seat inventory's epoch), only
+    the cells of the flights concerned are recomputed, from the flights
+    grouped by cell at build time.
+    """
+
+    def __init__(self, flights):
+        self.size = len(flights)
+        cities = pd.Categorical(pd.concat([flights['departure_city'], flights['arrival_city']]))
+        self.cities = {c: i for i, c in enumerate(cities.categories)}
+        classes = pd.Categorical(flights['class'])
+        self.classes = list(classes.categories)
+
+        day = flights['departure_ts'].to_numpy() // 86400
+        self.first_day = int(day.min()) if self.size else 0
+        self.days = int(day.max()) - self.first_day + 1 if self.size else 0
+        departure = cities.codes[:self.size].astype(np.int64)
+        arrival = cities.codes[self.size:].astype(np.int64)
+        route = departure * len(self.cities) + arrival
+        self._shape = (len(self.cities) ** 2, self.days, len(self.classes))
+        self._cells = (route * self.days + (day - self.first_day)) * len(self.classes) + classes.codes
+
+        # Flights grouped by cell, for recomputing a cell from its members
+        self._members = np.argsort(self._cells, kind='stable')
+        self._offsets = np.searchsorted(self._cells[self._members], np.arange(np.prod(self._shape) + 1))
+
+        self._price = flights['price_cents'].to_numpy().astype(np.int64)
+        self._in_stock = flights['available_seats'].to_numpy() > 0
+        self._best = np.full(np.prod(self._shape), NO_FARE, dtype=np.int64)
+        self._matrix = self._best.reshape(self._shape)
+        self._seat_epoch = self._price_epoch = None
+        self._lock = threading.Lock()
+        self._fill(np.arange(self.size))
+
+    def _fill(self, rows):
+        rows = rows[self._in_stock[rows]]
+        np.minimum.at(self._best, self._cells[rows], self._price[rows] * self.size + rows)
+
+    def _recompute(self, rows):
+        # Caller holds the lock
+        cells = np.unique(self._cells[rows])
+        self._best[cells] = NO_FARE
+        starts, ends = self._offsets[cells], self._offsets[cells + 1]
+        lengths = ends - starts
+        positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        self._fill(self._members[positions])
+
+    def sync_prices(self, prices):
+        """Move to a newer pricing epoch's fares (a pricing.PriceList)."""
+        if self._price_epoch is not None and prices.epoch <= self._price_epoch:
+            return
+        with self._lock:
+            # Checked again: another thread may have moved past this epoch
+            # while we waited, and its fares must not be rolled back
+            if self._price_epoch is not None and prices.epoch <= self._price_epoch:
+                return
+            changed = np.flatnonzero(prices.cents != self._price)
+            self._price[changed] = prices.cents[changed]
+            self._price_epoch = prices.epoch
+            if len(changed):
+                self._recompute(changed)
+
+    def sync_seats(self, seats):
+        """Pick up flights that sold out or came back since the last call."""
+        epoch = seats.epoch
+        if epoch == self._seat_epoch:
+            return
+        in_stock = seats.in_stock(np.arange(self.size))
+        with self._lock:
+            # Seat epochs only grow; an older snapshot than the one applied is dropped
+            if self._seat_epoch is not None and epoch <= self._seat_epoch:
+                return
+            changed = np.flatnonzero(in_stock != self._in_stock)
+            self._in_stock = in_stock
+            self._seat_epoch = epoch
+            if len(changed):
+                self._recompute(changed)
+
+    def window(self, departure, arrival, start, days, seats=None, prices=None):
+        """Lowest fare per class on each of ``days`` days from ``start``.
+
+        With ``seats`` (a SeatInventory) and ``prices`` (a PriceList) the
+        calendar catches up on seat and fare changes first. Days outside
+        the schedule and unknown cities come back as empty cells.
+        """
+        if prices is not None:
+            self.sync_prices(prices)
+        if seats is not None:
+            self.sync_seats(seats)
+        best = np.full((days, len(self.classes)), NO_FARE, dtype=np.int64)
+        origin, destination = self.cities.get(departure), self.cities.get(arrival)
+        if origin is not None and destination is not None:
+            offset = _day_number(start) - self.first_day
+            lo, hi = max(offset, 0), min(offset + days, self.days)
+            if lo < hi:
+                with self._lock:
+                    best[lo - offset:hi - offset] = self._matrix[origin * len(self.cities) + destination, lo:hi]
+
+        missing = best == NO_FARE
+        fares = np.where(missing, np.nan, (best // max(self.size, 1)) / 100)
+        flight_ids = np.where(missing, -1, best % max(self.size, 1))
+        dates = [start + timedelta(days=i) for i in range(days)]
+        return FareWindow(dates, list(self.classes), fares, flight_ids)
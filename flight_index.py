@@ -0,0 +1,118 @@
+# flight_index.py
+"""Posting-list index over the flight inventory for filter + sort queries."""
+import itertools
+
+import numpy as np
+import pandas as pd
+
+# Filterable dimensions, in the order they are packed into posting-list keys
+DIMENSIONS = ('departure_city', 'arrival_city', 'class', 'airline')
+
+SORT_KEYS = ('price', '-price', 'duration', 'departure_time')
+
+
+class FlightIndex:
+    """Answers search_flights() queries without scanning the inventory.
+
+    Every flight is entered into one posting list per subset of DIMENSIONS
+    (16 in total, from "any/any/any/any" down to the exact
+    departure/arrival/class/airline tuple). Posting lists hold price ranks,
+    i.e. positions in the global price order, so each list is already sorted
+    by price: a price range is two binary searches and a price sort is free.
+    """
+
+    def __init__(self, flights):
+        self.size = len(flights)
+        self.categories = {}
+        codes = []
+        for column in DIMENSIONS:
+            values = pd.Categorical(flights[column])
+            self.categories[column] = {c: i for i, c in enumerate(values.categories)}
+            codes.append(values.codes.astype(np.int64))
+
+        price = flights['price_cents'].to_numpy()
+        self.price_order = np.argsort(price, kind='stable').astype(np.int32)
+        self.sorted_prices = price[self.price_order]
+        self.duration = flights['duration_minutes'].to_numpy()
+        self.departure_time = flights['departure_ts'].to_numpy()
+
+        # Codes of each dimension in price order; "any" is encoded as -1
+        self._radix = [len(self.categories[c]) + 1 for c in DIMENSIONS]
+        ranked_codes = [c[self.price_order] for c in codes]
+        self._postings = {}
+        for used in itertools.product((False, True), repeat=len(DIMENSIONS)):
+            parts = [c if u else np.full(self.size, -1) for c, u in zip(ranked_codes, used)]
+            self._postings[used] = self._build_postings(self._pack(parts))
+
+    def _pack(self, parts):
+        key = np.zeros(len(parts[0]), dtype=np.int64)
+        for part, radix in zip(parts, self._radix):
+            key = key * radix + (part + 1)
+        return key
+
+    def _build_postings(self, keys):
+        # A stable sort by key keeps each group in ascending price rank
+        grouping = np.argsort(keys, kind='stable')
+        ranks = grouping.astype(np.int32)
+        sorted_keys = keys[grouping]
+        bounds = np.flatnonzero(np.diff(sorted_keys)) + 1
+        starts = np.concatenate(([0], bounds))
+        ends = np.concatenate((bounds, [len(keys)]))
+        offsets = {int(sorted_keys[s]): (s, e) for s, e in zip(starts, ends) if e > s}
+        return ranks, offsets
+
+    def _posting(self, used, codes):
+        ranks, offsets = self._postings[used]
+        key = int(self._pack([np.array([c]) for c in codes])[0])
+        start, end = offsets.get(key, (0, 0))
+        return ranks[start:end]
+
+    def _code(self, column, value):
+        return self.categories[column].get(value)
+
+    def search(self, departure=None, arrival=None, airlines=None, flight_class=None,
+               price_range=None, sort_by='price'):
+        """Return row positions of matching flights, ordered by ``sort_by``."""
+        if sort_by not in SORT_KEYS:
+            raise ValueError(f"Unknown sort key: {sort_by}")
+
+        fixed = {'departure_city': departure, 'arrival_city': arrival, 'class': flight_class}
+        used, codes = [], []
+        for column in DIMENSIONS[:3]:
+            value = fixed[column]
+            if value is None:
+                used.append(False)
+                codes.append(-1)
+                continue
+            code = self._code(column, value)
+            if code is None:
+                return np.empty(0, dtype=np.int32)
+            used.append(True)
+            codes.append(code)
+
+        if airlines:
+            airline_codes = [self._code('airline', a) for a in airlines]
+            airline_codes = [c for c in airline_codes if c is not None]
+            lists = [self._posting(tuple(used) + (True,), codes + [c]) for c in airline_codes]
+        else:
+            lists = [self._posting(tuple(used) + (False,), codes + [-1])]
+
+        if price_range is not None:
+            # Prices are stored in cents
+            low = np.searchsorted(self.sorted_prices, round(price_range[0] * 100), side='left')
+            high = np.searchsorted(self.sorted_prices, round(price_range[1] * 100), side='right')
+            lists = [r[np.searchsorted(r, low):np.searchsorted(r, high)] for r in lists]
+
+        if not lists:
+            return np.empty(0, dtype=np.int32)
+        # Airline posting lists are disjoint, so merging them is a sort of the union
+        ranks = lists[0] if len(lists) == 1 else np.sort(np.concatenate(lists), kind='mergesort')
+        if sort_by == '-price':
+            ranks = ranks[::-1]
+        rows = self.price_order[ranks]
+
+        if sort_by == 'duration':
+            rows = rows[np.argsort(self.duration[rows], kind='stable')]
+        elif sort_by == 'departure_time':
+            rows = rows[np.argsort(self.departure_time[rows], kind='stable')]
+        return rows
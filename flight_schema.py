@@ -0,0 +1,113 @@
+# flight_schema.py
+"""Compact columnar layout of the shared flight table."""
+import numpy as np
+import pandas as pd
+
+# Strings are dictionary-encoded; flight numbers repeat across a schedule's days
+CATEGORY_COLUMNS = ('flight_number', 'airline', 'departure_city', 'arrival_city', 'aircraft_type', 'class')
+
+# Column order and dtypes of the table every session shares
+COMPACT_DTYPES = {
+    'flight_id': np.int32,
+    'flight_number': 'category',
+    'airline': 'category',
+    'departure_city': 'category',
+    'arrival_city': 'category',
+    'departure_ts': np.int64,       # epoch seconds
+    'arrival_ts': np.int64,
+    'duration_minutes': np.int16,
+    'price_cents': np.int32,
+    'available_seats': np.int16,
+    'aircraft_type': 'category',
+    'class': 'category',
+}
+
+# Column order of decoded flight records, as displayed and stored with bookings
+RECORD_COLUMNS = ('flight_number', 'airline', 'departure_city', 'arrival_city', 'departure_time',
+                  'arrival_time', 'duration', 'price', 'available_seats', 'aircraft_type', 'class',
+                  'flight_id')
+
+
+def epoch_seconds(times):
+    return pd.to_datetime(pd.Series(times)).to_numpy().astype('datetime64[s]').astype(np.int64)
+
+
+def compact_flights(flights):
+    """Convert a flight table to the compact layout.
+
+    Accepts the wide layout (datetime, timedelta and float price columns)
+    or a table that is already compact, e.g. one read back from Parquet.
+    ``flight_id`` is (re)assigned as the row position.
+    """
+    flights = flights.reset_index(drop=True)
+    if 'price_cents' not in flights.columns:
+        flights = pd.DataFrame({
+            **{column: flights[column] for column in CATEGORY_COLUMNS},
+            'departure_ts': epoch_seconds(flights['departure_time']),
+            'arrival_ts': epoch_seconds(flights['arrival_time']),
+            'duration_minutes': pd.to_timedelta(flights['duration']).dt.total_seconds().to_numpy() // 60,
+            'price_cents': np.round(flights['price'].to_numpy(dtype=np.float64) * 100),
+            'available_seats': flights['available_seats'],
+        })
+    flights = flights.assign(flight_id=np.arange(len(flights)))
+    return flights[list(COMPACT_DTYPES)].astype(COMPACT_DTYPES)
+
+
+def materialize(flights, rows):
+    """Decode ``rows`` of a compact table into datetimes, durations and dollars."""
+    part = flights.iloc[rows]
+    decoded = pd.DataFrame({
+        'departure_time': pd.to_datetime(part['departure_ts'].to_numpy(), unit='s'),
+        'arrival_time': pd.to_datetime(part['arrival_ts'].to_numpy(), unit='s'),
+        'duration': pd.to_timedelta(part['duration_minutes'].to_numpy(dtype=np.int64), unit='m'),
+        'price': part['price_cents'].to_numpy() / 100,
+        'available_seats': part['available_seats'].to_numpy(dtype=np.int64),
+        'flight_id': part['flight_id'].to_numpy(dtype=np.int64),
+    }, index=part.index)
+    for column in CATEGORY_COLUMNS:
+        decoded[column] = part[column].to_numpy(dtype=object)
+    return decoded[list(RECORD_COLUMNS)]
+
+
+class FlightRecords:
+    """Decodes rows of one compact table into plain dicts, one per flight.
+
+    Gives the same values as materialize(flights, rows).to_dict('records')
+    but reads straight from column arrays unpacked once per table:
+    building a frame costs milliseconds however few rows it holds, which
+    dominates an API request for one flight or one page.
+    """
+
+    def __init__(self, flights):
+        self.strings = {}
+        for column in CATEGORY_COLUMNS:
+            values = flights[column].array
+            self.strings[column] = (values.categories.to_numpy(dtype=object), values.codes)
+        self.numbers = {column: flights[column].to_numpy()
+                        for column in ('departure_ts', 'arrival_ts', 'duration_minutes', 'price_cents',
+                                       'available_seats', 'flight_id')}
+
+    def __call__(self, rows):
+        rows = np.asarray(rows, dtype=np.int64)
+        strings = {column: categories[codes[rows]].tolist()
+                   for column, (categories, codes) in self.strings.items()}
+        numbers = {column: values[rows].tolist() for column, values in self.numbers.items()}
+        return [{
+            'flight_number': strings['flight_number'][i],
+            'airline': strings['airline'][i],
+            'departure_city': strings['departure_city'][i],
+            'arrival_city': strings['arrival_city'][i],
+            'departure_time': pd.Timestamp(numbers['departure_ts'][i], unit='s'),
+            'arrival_time': pd.Timestamp(numbers['arrival_ts'][i], unit='s'),
+            'duration': pd.Timedelta(minutes=numbers['duration_minutes'][i]),
+            'price': numbers['price_cents'][i] / 100,
+            'available_seats': numbers['available_seats'][i],
+            'aircraft_type': strings['aircraft_type'][i],
+            'class': strings['class'][i],
+            'flight_id': numbers['flight_id'][i],
+        } for i in range(len(rows))]
+
+
+def flight_records(flights, rows):
+    """Decoded ``rows`` as plain dicts, one per flight."""
+    return FlightRecords(flights)(rows)
@@ -0,0 +1,288 @@
+# instrumentation.py
+"""Timing spans, Prometheus metrics and on-demand profiling of app reruns.
+
+Every rerun is timed per page into ``skywings_rerun_seconds`` and every
+span inside it into ``skywings_span_seconds``. Both are histograms, so
+per-page percentiles come from the scraper, e.g.
+
+    histogram_quantile(0.95, sum by (page, le) (rate(skywings_rerun_seconds_bucket[5m])))
+"""
+import bisect
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_PORT = int(os.environ.get('SKYWINGS_METRICS_PORT', 0))
+METRICS_HOST = os.environ.get('SKYWINGS_METRICS_HOST', '127.0.0.1')
+METRICS_FILE = os.environ.get('SKYWINGS_METRICS_FILE')
+METRICS_FILE_INTERVAL = float(os.environ.get('SKYWINGS_METRICS_FILE_INTERVAL', 15))
+# Lets ?profile=cprofile|pyinstrument profile a rerun. Off unless asked
+# for, as anyone with the URL could otherwise make a worker profile its
+# reruns; for local development run with SKYWINGS_PROFILING=1
+PROFILING_ENABLED = os.environ.get('SKYWINGS_PROFILING', '0') == '1'
+PROFILERS = ('cprofile', 'pyinstrument')
+
+# Latency buckets in seconds, 1 ms to 10 s
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRIC_HELP = {
+    'skywings_rerun_seconds': 'Script rerun latency by page.',
+    'skywings_span_seconds': 'Latency of instrumented spans within a rerun, by page and span.',
+}
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels):
+    return ','.join(f'{k}="{_escape(v)}"' for k, v in labels)
+
+
+class _Histogram:
+    def __init__(self, buckets):
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+
+class MetricsRegistry:
+    """Thread-safe histograms, rendered in the Prometheus text format.
+
+    Collectors registered with ``add_collector`` are called at render time
+    and yield ``(name, type, help, labels, value)`` for state that other
+    components already count, such as cache hits.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._collectors = []
+
+    def observe(self, name, value, **labels):
+        self.observe_key((name, tuple(sorted(labels.items()))), value)
+
+    def observe_key(self, key, value):
+        # ``key`` is (name, sorted label pairs), as built by observe()
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram(self.buckets)
+            histogram.counts[bisect.bisect_left(self.buckets, value)] += 1
+            histogram.sum += value
+            histogram.count += 1
+
+    def add_collector(self, collector):
+        with self._lock:
+            self._collectors.append(collector)
+
+    def quantile(self, name, q, **labels):
+        """Estimate a quantile from the buckets the way histogram_quantile() does."""
+        with self._lock:
+            histogram = self._histograms.get((name, tuple(sorted(labels.items()))))
+            if histogram is None or not histogram.count:
+                return None
+            counts = list(histogram.counts)
+        rank = q * sum(counts)
+        seen = 0
+        for i, count in enumerate(counts):
+            if seen + count >= rank and count:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                low = self.buckets[i - 1] if i else 0.0
+                return low + (self.buckets[i] - low) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+    def render(self):
+        with self._lock:
+            histograms = {k: (list(h.counts), h.sum, h.count) for k, h in self._histograms.items()}
+            collectors = list(self._collectors)
+
+        lines = []
+        for name in sorted({name for name, _ in histograms}):
+            lines.append(f"# HELP {name} {METRIC_HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} histogram")
+            for (metric, labels), (counts, total, count) in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, bucket in zip(self.buckets + (float('inf'),), counts):
+                    cumulative += bucket
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f'{name}_bucket{{{_labels(labels + (("le", le),))}}} {cumulative}')
+                lines.append(f'{name}_sum{{{_labels(labels)}}} {total}')
+                lines.append(f'{name}_count{{{_labels(labels)}}} {count}')
+
+        described = set()
+        for collector in collectors:
+            for name, kind, help_text, labels, value in collector():
+                if name not in described:
+                    lines.append(f"# HELP {name} {help_text}")
+                    lines.append(f"# TYPE {name} {kind}")
+                    described.add(name)
+                label_text = _labels(sorted(labels.items()))
+                lines.append(f'{name}{{{label_text}}} {value}' if label_text else f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+# Process-wide registry; Streamlit re-executes app.py but imports this once
+REGISTRY = MetricsRegistry()
+_current = threading.local()
+# One profiled rerun at a time; profilers hook the interpreter globally
+_profiling = threading.Lock()
+
+
+def current_page():
+    """Page whose rerun is in progress on this thread, or None outside page_span()."""
+    return getattr(_current, 'page', None)
+
+
+@contextmanager
+def page_span(page, registry=REGISTRY):
+    """Time one rerun of ``page``; spans opened inside are attributed to it."""
+    _current.page = page
+    start = time.perf_counter()
+    outcome = 'ok'
+    try:
+        yield
+    except BaseException as exc:
+        # st.rerun() and st.stop() unwind through here as exceptions too
+        outcome = type(exc).__name__
+        raise
+    finally:
+        registry.observe('skywings_rerun_seconds', time.perf_counter() - start, page=page, outcome=outcome)
+        _current.page = None
+
+
+class span:
+    """Time a block of the current page's rerun, e.g. 'load' or 'figures'."""
+
+    __slots__ = ('name', 'registry', 'start')
+
+    def __init__(self, name, registry=REGISTRY):
+        self.name = name
+        self.registry = registry
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        page = getattr(_current, 'page', None) or 'none'
+        self.registry.observe_key(('skywings_span_seconds', (('page', page), ('span', self.name))), elapsed)
+
+
+class Profile:
+    """Result of a profiled block: ``report`` is set once the block exits."""
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.report = None
+        self.error = None
+
+
+@contextmanager
+def profiled(kind, limit=40):
+    """Profile the block with cProfile or pyinstrument; ``kind=None`` is a no-op."""
+    profile = Profile(kind)
+    if kind == 'pyinstrument':
+        # Imported on first use; most reruns are never profiled
+        try:
+            import pyinstrument
+        except ImportError:
+            profile.error = "pyinstrument is not installed (pip install pyinstrument)."
+            kind = None
+    if kind in PROFILERS and not _profiling.acquire(blocking=False):
+        profile.error = "Another rerun is being profiled; try again in a moment."
+        kind = None
+    if kind not in PROFILERS:
+        yield profile
+        return
+
+    try:
+        if kind == 'cprofile':
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                yield profile
+            finally:
+                profiler.disable()
+                out = io.StringIO()
+                pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(limit)
+                profile.report = out.getvalue()
+        else:
+            profiler = pyinstrument.Profiler()
+            profiler.start()
+            try:
+                yield profile
+            finally:
+                profiler.stop()
+                profile.report = profiler.output_text(unicode=True)
+    finally:
+        _profiling.release()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = self.registry.render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MetricsExporter:
+    """Serves /metrics over HTTP and/or rewrites a metrics file periodically.
+
+    The file is replaced atomically, which is what node_exporter's
+    textfile collector expects.
+    """
+
+    def __init__(self, registry=REGISTRY, port=METRICS_PORT, host=METRICS_HOST, path=METRICS_FILE,
+                 interval=METRICS_FILE_INTERVAL):
+        self.registry = registry
+        self.path = path
+        self.interval = interval
+        self.server = None
+        self._stop = threading.Event()
+        if port:
+            handler = type('MetricsHandler', (_MetricsHandler,), {'registry': registry})
+            self.server = ThreadingHTTPServer((host, port), handler)
+            threading.Thread(target=self.server.serve_forever, name='metrics-http', daemon=True).start()
+        if path:
+            threading.Thread(target=self._write_loop, name='metrics-file', daemon=True).start()
+
+    def write(self):
+        tmp = f"{self.path}.tmp"
+        with open(tmp, 'w') as f:
+            f.write(self.registry.render())
+        os.replace(tmp, self.path)
+
+    def _write_loop(self):
+        while not self._stop.wait(self.interval):
+            self.write()
+
+    def close(self):
+        self._stop.set()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+        if self.path:
+            self.write()
@@ -0,0 +1,247 @@
+# inventory.py
+"""Process-wide flight inventory shared by every Streamlit session."""
+import argparse
+import functools
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from airports import load_airports
+from flight_schema import COMPACT_DTYPES, FlightRecords, compact_flights, epoch_seconds
+
+# The airports flights are generated between, one per city, by IATA code;
+# names and coordinates come from the airport reference data
+SERVED_AIRPORTS = os.environ.get('SKYWINGS_SERVED_AIRPORTS',
+                                 'JFK,LAX,ORD,MIA,LHR,CDG,HND,DXB,SYD,SIN,DEL,FRA').split(',')
+AIRLINES = ['SkyWings Airlines', 'Global Airways', 'Oceanic Airlines', 'Continental Express']
+AIRCRAFT_TYPES = ['Boeing 737', 'Airbus A320', 'Boeing 787', 'Airbus A350']
+CLASSES = ['Economy', 'Premium Economy', 'Business', 'First']
+
+
+def _served_airports(codes):
+    airports = {airport.iata: airport for airport in load_airports()}
+    codes = [code.strip().upper() for code in codes]
+    unknown = [code for code in codes if code not in airports]
+    if unknown:
+        raise ValueError(f"Unknown airports in SKYWINGS_SERVED_AIRPORTS: {', '.join(unknown)}")
+    served = [airports[code] for code in codes]
+    if len({airport.city for airport in served}) < len(served):
+        raise ValueError("SKYWINGS_SERVED_AIRPORTS has two airports in one city")
+    return served
+
+
+# City name -> the airport it is served through, and (latitude, longitude)
+# of that airport
+CITY_AIRPORTS = {airport.city: airport for airport in _served_airports(SERVED_AIRPORTS)}
+CITIES = list(CITY_AIRPORTS)
+CITY_COORDINATES = {city: (airport.latitude, airport.longitude) for city, airport in CITY_AIRPORTS.items()}
+
+# Inventory configuration (overridable per deployment)
+INVENTORY_PATH = os.environ.get('SKYWINGS_FLIGHTS_PATH')
+INVENTORY_SIZE = int(os.environ.get('SKYWINGS_INVENTORY_SIZE', 50))
+INVENTORY_SEED = int(os.environ.get('SKYWINGS_INVENTORY_SEED', 42))
+INVENTORY_TTL = int(os.environ.get('SKYWINGS_INVENTORY_TTL', 3600))
+# A generated schedule is replaced by one starting later this often, so
+# there are always GENERATED_DAYS of future flights less at most a period
+SCHEDULE_PERIOD = int(os.environ.get('SKYWINGS_SCHEDULE_HOURS', 24)) * 3600
+
+
+# Sample flight data model: hub-weighted routes, distance-based block times
+# and fares, peaked departure hours, and seats by aircraft and cabin
+HUB_WEIGHTS = {'JFK': 10, 'LAX': 8, 'ORD': 7, 'MIA': 5, 'LHR': 10, 'CDG': 8,
+               'HND': 8, 'DXB': 9, 'SYD': 4, 'SIN': 7, 'DEL': 6, 'FRA': 7}
+DEFAULT_HUB_WEIGHT = 5
+CITY_WEIGHTS = [HUB_WEIGHTS.get(airport.iata, DEFAULT_HUB_WEIGHT) for airport in CITY_AIRPORTS.values()]
+AIRLINE_CODES = ['SW', 'GA', 'OA', 'CE']
+AIRLINE_WEIGHTS = [4, 3, 2, 1]
+HOUR_WEIGHTS = [1, 1, 1, 1, 1, 2, 6, 9, 9, 7, 5, 4, 4, 4, 5, 6, 7, 9, 9, 7, 5, 3, 2, 1]
+CLASS_WEIGHTS = [60, 15, 17, 8]
+CLASS_FARE_MULTIPLIERS = [1.0, 1.5, 2.6, 4.0]
+CLASS_SEAT_SHARE = [0.75, 0.12, 0.09, 0.04]
+AIRCRAFT_SEATS = [160, 180, 250, 300]
+LONG_HAUL_KM = 5000
+CRUISE_KMH = 820
+GENERATED_DAYS = 30
+GENERATOR_CHUNK_ROWS = 1_000_000
+
+
+def _weights(values):
+    values = np.asarray(values, dtype=np.float64)
+    return values / values.sum()
+
+
+def _route_table():
+    # Every ordered city pair with its distance and relative demand
+    lat, lon = np.radians(np.array([CITY_COORDINATES[c] for c in CITIES])).T
+    origin, destination = np.nonzero(~np.eye(len(CITIES), dtype=bool))
+    h = (np.sin((lat[destination] - lat[origin]) / 2) ** 2 +
+         np.cos(lat[origin]) * np.cos(lat[destination]) * np.sin((lon[destination] - lon[origin]) / 2) ** 2)
+    km = 2 * 6371 * np.arcsin(np.sqrt(h))
+    weight = np.asarray(CITY_WEIGHTS, dtype=np.float64)
+    return origin, destination, km, _weights(weight[origin] * weight[destination])
+
+
+def generate_flight_data(n=50, seed=None, start=None, days=GENERATED_DAYS):
+    """Generate ``n`` flights in the compact layout, fully vectorized.
+
+    The same seed and start always give the same flights. A flight number
+    stands for one airline's service on a route at a given hour, so it
+    repeats across days the way real schedules do.
+    """
+    rng = np.random.default_rng(seed)
+    if start is None:
+        start = pd.Timestamp.now().floor('h')
+    origin, destination, km, route_weights = _route_table()
+
+    route = rng.choice(len(origin), n, p=route_weights)
+    airline = rng.choice(len(AIRLINES), n, p=_weights(AIRLINE_WEIGHTS))
+    flight_class = rng.choice(len(CLASSES), n, p=_weights(CLASS_WEIGHTS))
+    day = rng.integers(1, days + 1, n)
+    hour = rng.choice(24, n, p=_weights(HOUR_WEIGHTS))
+    distance = km[route]
+
+    departure_ts = (epoch_seconds([start])[0] + day * 86400 + hour * 3600 +
+                    rng.integers(0, 12, n) * 300)
+    minutes = 30 + distance / CRUISE_KMH * 60 * rng.uniform(0.95, 1.1, n)
+    duration = (np.round(minutes / 5) * 5).astype(np.int16)
+
+    # Fares grow with distance and cabin, with a premium close to departure
+    fare = ((40 + 0.06 * distance) * np.take(CLASS_FARE_MULTIPLIERS, flight_class) *
+            (1 + 0.5 * np.exp(-day / 7)) * rng.lognormal(0, 0.2, n))
+
+    long_haul = distance > LONG_HAUL_KM
+    aircraft = rng.integers(0, 2, n) + 2 * long_haul
+    cabin_seats = np.take(AIRCRAFT_SEATS, aircraft) * np.take(CLASS_SEAT_SHARE, flight_class)
+    seats = np.maximum(rng.binomial(cabin_seats.astype(np.int64), rng.uniform(0.05, 0.6, n)), 1)
+
+    # Flight numbers: one per (airline, route, hour) service; the multiplier
+    # is coprime with 9000, so numbers never collide within an airline
+    service = (airline * len(origin) + route) * 24 + hour
+    services, service_codes = np.unique(service, return_inverse=True)
+    numbers = 1000 + (services * 7919) % 9000
+    labels = [f"{AIRLINE_CODES[s // (len(origin) * 24)]}{number}" for s, number in zip(services, numbers)]
+
+    def categorical(codes, categories):
+        return pd.Categorical.from_codes(codes, categories=categories)
+
+    flights = pd.DataFrame({
+        'flight_id': np.arange(n),
+        'flight_number': categorical(service_codes, labels),
+        'airline': categorical(airline, AIRLINES),
+        'departure_city': categorical(origin[route], CITIES),
+        'arrival_city': categorical(destination[route], CITIES),
+        'departure_ts': departure_ts,
+        'arrival_ts': departure_ts + duration.astype(np.int64) * 60,
+        'duration_minutes': duration,
+        'price_cents': np.round(fare * 100),
+        'available_seats': seats,
+        'aircraft_type': categorical(aircraft, AIRCRAFT_TYPES),
+        'class': categorical(flight_class, CLASSES),
+    })
+    return flights.astype(COMPACT_DTYPES)
+
+
+def write_flights(path, n, seed=None, start=None, chunk_rows=GENERATOR_CHUNK_ROWS):
+    """Stream ``n`` generated flights to a Parquet file, one row group per chunk.
+
+    Only one chunk is held in memory at a time. Each chunk draws from its
+    own child of ``seed``, so a file is reproducible for a given seed,
+    start and chunk size. The file loads through load_inventory() as-is.
+    """
+    # Only needed to write files, so kept out of the app's import path
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if start is None:
+        start = pd.Timestamp.now().floor('h')
+    chunks = max(1, -(-n // chunk_rows))
+    writer = None
+    try:
+        for i, chunk_seed in enumerate(np.random.SeedSequence(seed).spawn(chunks)):
+            flights = generate_flight_data(min(chunk_rows, n - i * chunk_rows), seed=chunk_seed, start=start)
+            flights['flight_id'] += i * chunk_rows
+            table = pa.Table.from_pandas(flights, preserve_index=False)
+            if writer is None:
+                # Chunks have different dictionaries; fix the index width up front
+                schema = pa.schema(
+                    [pa.field(f.name, pa.dictionary(pa.int32(), pa.string())) if pa.types.is_dictionary(f.type)
+                     else f for f in table.schema],
+                    metadata=table.schema.metadata)
+                writer = pq.ParquetWriter(path, schema)
+            writer.write_table(table.cast(schema))
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def read_flights(path):
+    # Either layout is accepted; load_inventory() converts to the compact one
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    if path.endswith('.csv'):
+        return pd.read_csv(path)
+    raise ValueError(f"Unsupported flight inventory format: {path}")
+
+
+def data_version(path=INVENTORY_PATH, now=None):
+    # Bumping SKYWINGS_DATA_VERSION or touching the source file yields a new
+    # version, which is the cache key the app loads the inventory under. A
+    # generated schedule gets a new version every SCHEDULE_PERIOD of wall
+    # clock time, the same on every worker.
+    version = os.environ.get('SKYWINGS_DATA_VERSION', '1')
+    if path and os.path.exists(path):
+        version = f"{version}:{os.path.getmtime(path):.0f}"
+    elif not path:
+        version = f"{version}:g{int((time.time() if now is None else now) // SCHEDULE_PERIOD)}"
+    return version
+
+
+class FlightInventory:
+    """Immutable, versioned snapshot of every bookable flight."""
+
+    def __init__(self, flights, version, source):
+        self.flights = flights
+        self.version = version
+        self.source = source
+        self.loaded_at = time.time()
+
+    def __len__(self):
+        return len(self.flights)
+
+    @functools.cached_property
+    def records(self):
+        # Row decoder for the booking service, built once per snapshot
+        return FlightRecords(self.flights)
+
+
+def load_inventory(path=INVENTORY_PATH, version=None, size=INVENTORY_SIZE, seed=INVENTORY_SEED, start=None):
+    # ``start`` anchors generated schedules; workers that should serve the
+    # same flights must pass the same one
+    if version is None:
+        version = data_version(path)
+    if path:
+        flights, source = read_flights(path), path
+    else:
+        flights, source = generate_flight_data(size, seed=seed, start=start), 'generated'
+    # flight_id is the row position, which seat counts and indexes are keyed by
+    return FlightInventory(compact_flights(flights), version, source)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate a flight inventory Parquet file for SKYWINGS_FLIGHTS_PATH.")
+    parser.add_argument('rows', type=int)
+    parser.add_argument('path')
+    parser.add_argument('--seed', type=int, default=INVENTORY_SEED)
+    parser.add_argument('--chunk-rows', type=int, default=GENERATOR_CHUNK_ROWS)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    write_flights(args.path, args.rows, seed=args.seed, chunk_rows=args.chunk_rows)
+    print(f"Wrote {args.rows:,} flights to {args.path} in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == '__main__':
+    main()
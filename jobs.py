@@ -0,0 +1,44 @@
+# jobs.py
+"""Background job queue for booking side effects (emails, exports, ...)."""
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+JOB_WORKERS = int(os.environ.get('SKYWINGS_JOB_WORKERS', 4))
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueue:
+    """Runs jobs on a worker pool so script threads never wait on them."""
+
+    def __init__(self, workers=JOB_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='skywings-job')
+        self._lock = threading.Lock()
+        self.submitted = self.completed = self.failed = 0
+
+    def _run(self, fn, args, kwargs):
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            logger.exception("Background job %s failed", getattr(fn, '__name__', fn))
+            with self._lock:
+                self.failed += 1
+            raise
+        with self._lock:
+            self.completed += 1
+        return result
+
+    def submit(self, fn, *args, **kwargs):
+        with self._lock:
+            self.submitted += 1
+        return self._executor.submit(self._run, fn, args, kwargs)
+
+    @property
+    def pending(self):
+        with self._lock:
+            return self.submitted - self.completed - self.failed
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
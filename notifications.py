@@ -0,0 +1,44 @@
+# notifications.py
+"""Booking notifications, sent from the background job queue."""
+import os
+import smtplib
+from email.message import EmailMessage
+
+SMTP_HOST = os.environ.get('SKYWINGS_SMTP_HOST')
+SMTP_PORT = int(os.environ.get('SKYWINGS_SMTP_PORT', 25))
+SENDER = os.environ.get('SKYWINGS_MAIL_FROM', 'bookings@skywings.com')
+# Without an SMTP server, messages are written here instead
+OUTBOX_DIR = os.environ.get('SKYWINGS_OUTBOX_DIR', 'outbox')
+
+
+def confirmation_email(booking):
+    flight = booking['flight']
+    passenger = booking['passenger']
+    message = EmailMessage()
+    message['From'] = SENDER
+    message['To'] = passenger['email']
+    message['Subject'] = f"Booking Confirmation: {booking['booking_id']}"
+    message.set_content(
+        f"Hi {passenger['first_name']},\n\n"
+        f"Your SkyWings booking {booking['booking_id']} is confirmed.\n\n"
+        f"{flight['departure_city']} → {flight['arrival_city']}\n"
+        f"{flight['airline']} • {flight['flight_number']}\n"
+        f"Departure: {flight['departure_time'].strftime('%b %d, %Y %H:%M')}\n"
+        f"Class: {flight['class']} • Seat: {passenger['seat_preference']}\n"
+        f"Total: ${flight['price']}\n\n"
+        "Have a great flight!\n"
+    )
+    return message
+
+
+def send_booking_confirmation(booking):
+    message = confirmation_email(booking)
+    if SMTP_HOST:
+        with smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=30) as smtp:
+            smtp.send_message(message)
+        return None
+    os.makedirs(OUTBOX_DIR, exist_ok=True)
+    path = os.path.join(OUTBOX_DIR, f"{booking['booking_id']}.eml")
+    with open(path, 'wb') as f:
+        f.write(message.as_bytes())
+    return path
@@ -0,0 +1,42 @@
+# pagination.py
+"""Server-side pagination and render accounting for result lists."""
+import os
+import time
+
+PAGE_SIZE = int(os.environ.get('SKYWINGS_PAGE_SIZE', 10))
+PAGE_SIZE_OPTIONS = sorted({5, 10, 20, 50, PAGE_SIZE})
+
+
+def page_count(total, page_size):
+    return max(1, -(-total // page_size))
+
+
+def page_slice(rows, page, page_size):
+    """Return the rows on ``page`` (1-based, clamped) and the clamped page."""
+    page = min(max(1, page), page_count(len(rows), page_size))
+    start = (page - 1) * page_size
+    return rows[start:start + page_size], page
+
+
+class RenderMeter:
+    """Wall time and payload bytes spent rendering one page of results."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.payload_bytes = 0
+        self.figures = 0
+
+    def html(self, markup):
+        self.payload_bytes += len(markup.encode('utf-8'))
+        return markup
+
+    def figure(self, payload_bytes):
+        self.payload_bytes += payload_bytes
+        self.figures += 1
+
+    def stats(self):
+        return {
+            'render_ms': (time.perf_counter() - self.started) * 1000,
+            'payload_bytes': self.payload_bytes,
+            'figures': self.figures,
+        }
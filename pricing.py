@@ -0,0 +1,202 @@
+# pricing.py
+"""Dynamic fares from fare buckets, load factor, days to departure and demand."""
+import base64
+import os
+import threading
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from inventory import AIRCRAFT_SEATS, AIRCRAFT_TYPES, CLASS_SEAT_SHARE, CLASSES
+from state_backend import LocalStateBackend
+
+# Prices hold for a whole epoch; every worker starts epochs at the same
+# wall-clock times and serves the fares one of them stored for it, and a
+# quote stays bookable for PRICING_KEEP_EPOCHS epochs, at least as long
+# as a seat hold with the defaults
+PRICING_EPOCH_SECONDS = int(os.environ.get('SKYWINGS_PRICING_EPOCH', 300))
+PRICING_KEEP_EPOCHS = int(os.environ.get('SKYWINGS_PRICING_KEEP_EPOCHS', 3))
+
+# Fare buckets: the share of the cabin sold decides which bucket is open
+LOAD_FACTOR_STEPS = (0.5, 0.7, 0.85, 0.95)
+BUCKET_MULTIPLIERS = (0.9, 1.0, 1.1, 1.25, 1.5)
+# Last-minute premium by whole days left before departure
+DAYS_OUT_STEPS = (1, 3, 7)
+DAYS_OUT_MULTIPLIERS = (1.3, 1.2, 1.1, 1.0)
+# Demand: each booking per epoch on a route and departure day adds a step, up to a cap
+DEMAND_STEP = 0.05
+DEMAND_CAP = 6
+
+MIN_MULTIPLIER = min(BUCKET_MULTIPLIERS) * min(DAYS_OUT_MULTIPLIERS)
+MAX_MULTIPLIER = max(BUCKET_MULTIPLIERS) * max(DAYS_OUT_MULTIPLIERS) * (1 + DEMAND_STEP * DEMAND_CAP)
+
+# One epoch's fares: ``cents`` is read-only, one entry per flight
+PriceList = namedtuple('PriceList', ['epoch', 'cents'])
+
+
+def wall_clock():
+    # Seconds on the same naive local clock as departure_ts
+    return pd.Timestamp.now().timestamp()
+
+
+def base_fare_range(price_range):
+    """The base fares that can price into ``price_range`` under any multiplier."""
+    low, high = price_range
+    return low / MAX_MULTIPLIER - 0.01, high / MIN_MULTIPLIER + 0.01
+
+
+def _market_key(departure, arrival, day):
+    return f'{departure}>{arrival}@{day}'
+
+
+def _pack(array):
+    return base64.b64encode(np.ascontiguousarray(array).tobytes()).decode('ascii')
+
+
+def _unpack(text, dtype):
+    # Read-only, as it views the decoded bytes
+    return np.frombuffer(base64.b64decode(text), dtype=dtype)
+
+
+class PricingEngine:
+    """Reprices the inventory once per pricing epoch, in batched NumPy operations.
+
+    A flight's fare is its base (generated) fare times three multipliers:
+    the fare bucket its load factor opens, the days left to departure,
+    and recent booking demand in its market (route and departure day).
+    The first epoch prices every flight; each later one starts from the
+    previous epoch's fares and reprices only the flights whose inputs
+    moved: seats sold or returned (on any worker, through the shared seat
+    inventory), a days-out step crossed, or a change in market demand.
+    Demand is counted in ``demand_counters``, which a StateBackend can
+    share between workers.
+
+    Each epoch is built once, by the first worker to ask for it, and
+    stored with the inputs it was priced from in ``store`` (a
+    StateBackend) under ``name``; every other worker reads those fares
+    instead of pricing from its own view. A build starts from the
+    latest stored epoch, so demand is measured between the same two
+    snapshots whichever worker builds.
+    """
+
+    def __init__(self, flights, seats, demand_counters=None, store=None, name='pricing',
+                 epoch_seconds=PRICING_EPOCH_SECONDS, keep=PRICING_KEEP_EPOCHS, clock=wall_clock):
+        self.size = len(flights)
+        self.seats = seats
+        self.store = store if store is not None else LocalStateBackend()
+        self.name = name
+        self.demand_counters = demand_counters if demand_counters is not None else self.store.counters('demand')
+        self.epoch_seconds = epoch_seconds
+        self.keep = keep
+        self._clock = clock
+        self._base = flights['price_cents'].to_numpy().astype(np.float64)
+        self._departure_ts = flights['departure_ts'].to_numpy()
+
+        # Cabin size from aircraft and class; never below the seats on sale
+        aircraft = flights['aircraft_type'].map(dict(zip(AIRCRAFT_TYPES, AIRCRAFT_SEATS))).astype(np.float64)
+        share = flights['class'].map(dict(zip(CLASSES, CLASS_SEAT_SHARE))).astype(np.float64)
+        initial = flights['available_seats'].to_numpy()
+        self._capacity = np.maximum(np.nan_to_num((aircraft * share).round().to_numpy()), initial).clip(1)
+
+        cities = pd.Categorical(pd.concat([flights['departure_city'], flights['arrival_city']]))
+        names, codes = cities.categories.tolist(), cities.codes.astype(np.int64)
+        route = codes[:self.size] * len(names) + codes[self.size:]
+        day = self._departure_ts // 86400
+        first_day, days = (int(day.min()), int(day.max()) + 1) if self.size else (0, 1)
+        markets, self._markets = np.unique(route * (days - first_day) + (day - first_day), return_inverse=True)
+        routes, market_days = np.divmod(markets, days - first_day)
+        self._market_keys = [_market_key(names[r // len(names)], names[r % len(names)], d + first_day)
+                             for r, d in zip(routes.tolist(), market_days.tolist())]
+
+        self._lock = threading.Lock()
+        self._lists = {}
+        # Flights repriced by this worker's latest build, for monitoring
+        self.repriced = 0
+
+    def epoch(self, now=None):
+        return int((self._clock() if now is None else now) // self.epoch_seconds)
+
+    def record_bookings(self, flight_ids, seats=1):
+        """Count bookings towards their markets' demand in the next epoch."""
+        demand = {}
+        for flight_id in flight_ids:
+            key = self._market_keys[self._markets[flight_id]]
+            demand[key] = demand.get(key, 0) + seats
+        if demand:
+            self.demand_counters.incr(demand)
+
+    def _bucket_multiplier(self, rows, remaining):
+        load_factor = 1 - remaining / self._capacity[rows]
+        return np.take(BUCKET_MULTIPLIERS, np.searchsorted(LOAD_FACTOR_STEPS, load_factor, side='right'))
+
+    def _days_out_step(self, start):
+        return np.searchsorted(DAYS_OUT_STEPS, (self._departure_ts - start) / 86400, side='right')
+
+    def _demand_multiplier(self, rate):
+        return 1 + DEMAND_STEP * np.minimum(rate, DEMAND_CAP)
+
+    def _key(self, epoch):
+        return f'{self.name}:{epoch}'
+
+    def _stored(self, epoch):
+        return self.store.get(self._key(epoch))
+
+    def _build(self, epoch):
+        # Caller holds the lock. Prices from the shared seat counts and
+        # demand totals, starting from the latest stored epoch, and stores
+        # the result unless another worker stored this epoch first.
+        remaining = self.seats.remaining(np.arange(self.size)).astype(np.int32)
+        days_out = self._days_out_step(epoch * self.epoch_seconds)
+        counts = self.demand_counters.read()
+        bookings = np.array([counts.get(key, 0) for key in self._market_keys], dtype=np.int64)
+
+        previous = None
+        for earlier in range(epoch - 1, epoch - self.keep - 1, -1):
+            previous = self._stored(earlier)
+            if previous is not None:
+                break
+        if previous is None:
+            rate = np.zeros(len(bookings), dtype=np.int64)
+            rows = np.arange(self.size)
+            cents = np.empty(self.size, dtype=np.int32)
+        else:
+            # Bookings per epoch since the previous build, from the running totals
+            rate = (bookings - _unpack(previous['bookings'], np.int64)) // (epoch - previous['epoch'])
+            previous_demand = self._demand_multiplier(_unpack(previous['rate'], np.int64))
+            touched = remaining != _unpack(previous['remaining'], np.int32)
+            touched |= days_out != self._days_out_step(previous['epoch'] * self.epoch_seconds)
+            touched |= (self._demand_multiplier(rate) != previous_demand)[self._markets]
+            rows = np.flatnonzero(touched)
+            cents = _unpack(previous['cents'], np.int32).copy()
+
+        demand = self._demand_multiplier(rate)
+        multiplier = (self._bucket_multiplier(rows, remaining[rows]) * np.take(DAYS_OUT_MULTIPLIERS, days_out[rows]) *
+                      demand[self._markets[rows]])
+        cents[rows] = np.round(self._base[rows] * multiplier)
+        self.repriced = len(rows)
+        # Kept long enough to serve quotes and to be the next build's starting point
+        return self.store.setdefault(self._key(epoch), {
+            'epoch': epoch, 'cents': _pack(cents), 'remaining': _pack(remaining),
+            'bookings': _pack(bookings), 'rate': _pack(rate),
+        }, ttl=(self.keep + 1) * self.epoch_seconds)
+
+    def prices(self, epoch=None):
+        """This epoch's fares, or a kept earlier epoch's; None once it has gone."""
+        current = self.epoch()
+        epoch = current if epoch is None else epoch
+        if epoch > current or epoch <= current - self.keep:
+            return None
+        with self._lock:
+            prices = self._lists.get(epoch)
+            if prices is not None:
+                return prices
+            stored = self._stored(epoch)
+            if stored is None:
+                if epoch != current:
+                    return None
+                stored = self._build(epoch)
+            prices = self._lists[epoch] = PriceList(epoch, _unpack(stored['cents'], np.int32))
+            for old in [e for e in self._lists if e <= current - self.keep]:
+                del self._lists[old]
+            return prices
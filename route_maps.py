@@ -0,0 +1,153 @@
+# route_maps.py
+"""Great-circle route paths and cached route-map figures."""
+import threading
+from collections import OrderedDict, namedtuple
+from functools import lru_cache
+
+import numpy as np
+import plotly.graph_objects as go
+
+from inventory import CITY_COORDINATES
+
+PATH_POINTS = 16
+ROUTE_CACHE_SIZE = 256
+
+GEO_LAYOUT = dict(
+    showland=True,
+    landcolor="rgb(243, 243, 243)",
+    countrycolor="rgb(204, 204, 204)",
+)
+
+# ``payload_bytes`` is the size of the spec Streamlit sends for the figure
+RouteFigure = namedtuple('RouteFigure', ['figure', 'payload_bytes'])
+
+
+def great_circle(start, end, points=PATH_POINTS):
+    """Return (lats, lons) of ``points`` evenly spaced along the great circle."""
+    lat1, lon1, lat2, lon2 = np.radians([start[0], start[1], end[0], end[1]])
+    a = np.array([np.cos(lat1) * np.cos(lon1), np.cos(lat1) * np.sin(lon1), np.sin(lat1)])
+    b = np.array([np.cos(lat2) * np.cos(lon2), np.cos(lat2) * np.sin(lon2), np.sin(lat2)])
+    omega = np.arccos(np.clip(a @ b, -1.0, 1.0))
+    t = np.linspace(0.0, 1.0, points)[:, None]
+    if omega < 1e-9:
+        xyz = np.repeat(a[None, :], points, axis=0)
+    else:
+        xyz = (np.sin((1 - t) * omega) * a + np.sin(t * omega) * b) / np.sin(omega)
+    lats = np.degrees(np.arcsin(np.clip(xyz[:, 2], -1.0, 1.0)))
+    lons = np.degrees(np.arctan2(xyz[:, 1], xyz[:, 0]))
+    return np.round(lats, 3).tolist(), np.round(lons, 3).tolist()
+
+
+@lru_cache(maxsize=None)
+def route_path(departure_city, arrival_city):
+    # Each route's geometry is computed once per process
+    if departure_city not in CITY_COORDINATES or arrival_city not in CITY_COORDINATES:
+        return None
+    return great_circle(CITY_COORDINATES[departure_city], CITY_COORDINATES[arrival_city])
+
+
+def route_figure(departure_city, arrival_city, height=150):
+    path = route_path(departure_city, arrival_city)
+    if path is None:
+        return None
+    lats, lons = path
+    fig = go.Figure(go.Scattergeo(
+        lon=lons,
+        lat=lats,
+        mode='lines',
+        line=dict(width=2, color='blue'),
+        hoverinfo='skip',
+    ))
+    fig.add_trace(go.Scattergeo(
+        lon=[lons[0], lons[-1]],
+        lat=[lats[0], lats[-1]],
+        mode='markers',
+        marker=dict(size=8, color=['green', 'red']),
+        text=[departure_city, arrival_city],
+    ))
+    fig.update_layout(
+        geo=GEO_LAYOUT,
+        height=height,
+        margin=dict(l=0, r=0, t=0, b=0),
+        showlegend=False
+    )
+    return fig
+
+
+def combined_route_figure(routes, height=400):
+    """One map showing every (departure_city, arrival_city) pair in ``routes``."""
+    lats, lons, cities = [], [], {}
+    for departure_city, arrival_city in dict.fromkeys(routes):
+        path = route_path(departure_city, arrival_city)
+        if path is None:
+            continue
+        # None breaks the line between consecutive routes
+        lats.extend(path[0] + [None])
+        lons.extend(path[1] + [None])
+        cities[departure_city] = CITY_COORDINATES[departure_city]
+        cities[arrival_city] = CITY_COORDINATES[arrival_city]
+
+    fig = go.Figure(go.Scattergeo(
+        lon=lons,
+        lat=lats,
+        mode='lines',
+        line=dict(width=2, color='blue'),
+        hoverinfo='skip',
+    ))
+    fig.add_trace(go.Scattergeo(
+        lon=[c[1] for c in cities.values()],
+        lat=[c[0] for c in cities.values()],
+        mode='markers+text',
+        marker=dict(size=8, color='red'),
+        text=list(cities),
+        textposition='top center',
+    ))
+    fig.update_layout(
+        geo=GEO_LAYOUT,
+        height=height,
+        margin=dict(l=0, r=0, t=0, b=0),
+        showlegend=False
+    )
+    return fig
+
+
+class RouteFigureCache:
+    """Thread-safe LRU of built route figures and their payload sizes.
+
+    Saves building a route's figure on every render; st.plotly_chart
+    still serializes the figure each time it is drawn.
+    """
+
+    def __init__(self, maxsize=ROUTE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, departure_city, arrival_city):
+        key = (departure_city, arrival_city)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        # Build outside the lock; a concurrent miss on the same key just
+        # builds an identical figure
+        fig = route_figure(departure_city, arrival_city)
+        if fig is None:
+            return None
+        entry = RouteFigure(fig, len(fig.to_json()))
+
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return entry
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,266 @@
+# route_planner.py
+"""Multi-leg itinerary search over the flight inventory."""
+from collections import deque, namedtuple
+
+import numpy as np
+import pandas as pd
+
+OBJECTIVES = ('cheapest', 'fastest', 'fewest_stops')
+
+MIN_CONNECTION_MINUTES = 60
+MAX_LAYOVER_HOURS = 24
+MAX_STOPS = 2
+
+Itinerary = namedtuple('Itinerary', ['flight_ids', 'price', 'departure_time', 'arrival_time', 'stops'])
+
+
+def _sparse_table(values):
+    """Index tables for O(1) range-argmin queries over ``values``."""
+    levels = [np.arange(len(values))]
+    span = 1
+    while span * 2 <= len(values):
+        prev = levels[-1]
+        left, right = prev[:-span], prev[span:]
+        levels.append(np.where(values[right] < values[left], right, left))
+        span *= 2
+    return levels
+
+
+def _range_argmin(values, levels, lo, hi):
+    """Position of the smallest value in each inclusive range [lo, hi]."""
+    k = np.floor(np.log2(hi - lo + 1)).astype(np.int64)
+    best = np.empty(len(lo), dtype=np.int64)
+    for level in np.unique(k):
+        rows = np.flatnonzero(k == level)
+        table = levels[level]
+        left, right = table[lo[rows]], table[hi[rows] - (1 << level) + 1]
+        best[rows] = np.where(values[right] < values[left], right, left)
+    return best
+
+
+def _range_smallest(values, levels, lo, hi, k):
+    """Positions of the ``k`` smallest values (fewer if the range is shorter) in each range [lo, hi].
+
+    Returns parallel arrays of range index and position. Each round takes
+    every range's smallest candidate and replaces it with the two ranges
+    either side of it, so k rounds of range-argmin queries suffice.
+    """
+    query, best = np.arange(len(lo)), _range_argmin(values, levels, lo, hi)
+    queries, positions = [], []
+    for _ in range(k):
+        if not len(query):
+            break
+        order = np.lexsort((values[best], query))
+        picked = order[np.r_[True, query[order][1:] != query[order][:-1]]]
+        queries.append(query[picked])
+        positions.append(best[picked])
+        rest = np.ones(len(query), dtype=bool)
+        rest[picked] = False
+        split = best[picked]
+        new_query = np.concatenate([query[picked], query[picked]])
+        new_lo = np.concatenate([lo[picked], split + 1])
+        new_hi = np.concatenate([split - 1, hi[picked]])
+        ok = new_lo <= new_hi
+        new_query, new_lo, new_hi = new_query[ok], new_lo[ok], new_hi[ok]
+        query = np.concatenate([query[rest], new_query])
+        lo, hi = np.concatenate([lo[rest], new_lo]), np.concatenate([hi[rest], new_hi])
+        best = np.concatenate([best[rest], _range_argmin(values, levels, new_lo, new_hi)])
+    if not queries:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(queries), np.concatenate(positions)
+
+
+class RoutePlanner:
+    """Finds connecting itineraries in the time-expanded flight graph.
+
+    Flights are nodes; a flight into city C connects to every flight out of
+    C that leaves between the minimum connection time and the maximum
+    layover after it lands. The search runs one layer per leg. Each layer is
+    computed for all flights out of a city at once: the best ways to board
+    each departing flight are range-minimum queries over the arrivals sorted
+    by time (cost for 'cheapest', minus the trip's first departure for
+    'fastest'). Up to ``limit`` ways are kept per flight, which is enough
+    for the ``limit`` best itineraries to be exact: a trip's onward
+    options depend only on the flight it is on, so a way of boarding a
+    flight outside its ``limit`` best cannot finish among the best
+    itineraries. Flights into cities that cannot reach the destination
+    within the remaining legs, going by the precomputed city adjacency,
+    are never considered.
+
+    Legs are priced from a pricing engine's PriceList when plan() is given
+    one, else at base fares. The fares of the latest epoch are kept in
+    adjacency order, so they are reordered once per epoch, not per query.
+    """
+
+    def __init__(self, flights):
+        cities = pd.Categorical(pd.concat([flights['departure_city'], flights['arrival_city']]))
+        self.cities = list(cities.categories)
+        self._city_codes = {c: i for i, c in enumerate(self.cities)}
+        n = len(flights)
+        departure = cities.codes[:n].astype(np.int64)
+        arrival = cities.codes[n:].astype(np.int64)
+
+        # Adjacency index: flights grouped by departure city, sorted by time
+        departure_ts = flights['departure_ts'].to_numpy()
+        order = np.lexsort((departure_ts, departure))
+        self.flight_ids = flights['flight_id'].to_numpy()[order]
+        self.departure = departure[order]
+        self.arrival = arrival[order]
+        self.departure_ts = departure_ts[order]
+        self.arrival_ts = flights['arrival_ts'].to_numpy()[order]
+        self.price = flights['price_cents'].to_numpy(dtype=np.int64)[order]
+        self._epoch_price = (None, self.price)
+        self.offsets = np.searchsorted(self.departure, np.arange(len(self.cities) + 1))
+
+        # City graph for hop-distance lower bounds
+        routes = np.unique(np.stack([departure, arrival], axis=1), axis=0)
+        self.inbound = [[] for _ in self.cities]
+        for origin, destination in routes:
+            self.inbound[destination].append(origin)
+        self._hops = {}
+
+    def _hops_to(self, destination):
+        """Fewest legs from every city to ``destination`` (large if unreachable)."""
+        if destination in self._hops:
+            return self._hops[destination]
+        hops = np.full(len(self.cities), 1 << 30, dtype=np.int64)
+        hops[destination] = 0
+        queue = deque([destination])
+        while queue:
+            city = queue.popleft()
+            for origin in self.inbound[city]:
+                if hops[origin] > hops[city] + 1:
+                    hops[origin] = hops[city] + 1
+                    queue.append(origin)
+        self._hops[destination] = hops
+        return hops
+
+    def _prices(self, prices):
+        # Fares of PriceList ``prices`` in adjacency order; base fares if None
+        if prices is None:
+            return self.price
+        epoch, price = self._epoch_price
+        if epoch != prices.epoch:
+            price = prices.cents.astype(np.int64)[self.flight_ids]
+            # One tuple, so a concurrent query never pairs an epoch with other fares
+            self._epoch_price = (prices.epoch, price)
+        return price
+
+    def _departures(self, city, start, end):
+        # Positions of flights leaving ``city`` within [start, end]
+        lo, hi = self.offsets[city], self.offsets[city + 1]
+        times = self.departure_ts[lo:hi]
+        return np.arange(lo + np.searchsorted(times, start, 'left'),
+                         lo + np.searchsorted(times, end, 'right'))
+
+    def plan(self, origin, destination, depart_after, horizon_hours=72, objective='cheapest',
+             max_stops=MAX_STOPS, min_connection_minutes=MIN_CONNECTION_MINUTES,
+             max_layover_hours=MAX_LAYOVER_HOURS, limit=5, prices=None):
+        """Best itineraries from ``origin`` to ``destination``.
+
+        Every leg departs within ``horizon_hours`` of ``depart_after`` and is
+        priced from PriceList ``prices`` (base fares if None). Returns up to
+        ``limit`` Itinerary tuples ordered by ``objective``.
+        """
+        if objective not in OBJECTIVES:
+            raise ValueError(f"Unknown objective: {objective}")
+        if origin not in self._city_codes or destination not in self._city_codes or origin == destination:
+            return []
+        origin, destination = self._city_codes[origin], self._city_codes[destination]
+        hops = self._hops_to(destination)
+        max_legs = max_stops + 1
+        if hops[origin] > max_legs:
+            return []
+
+        start = int(pd.Timestamp(depart_after).timestamp())
+        end = start + int(horizon_hours * 3600)
+        connection, layover = min_connection_minutes * 60, int(max_layover_hours * 3600)
+        price = self._prices(prices)
+
+        # A layer is parallel arrays over labels, the ways of reaching a flight
+        # with the same number of legs: flight position, price so far, first
+        # departure, parent label
+        flights = self._departures(origin, start, end)
+        flights = flights[hops[self.arrival[flights]] <= max_legs - 1]
+        layer = (flights, price[flights], self.departure_ts[flights], np.full(len(flights), -1))
+        layers, completed, completed_scores = [layer], [], []
+        bound = np.inf
+
+        for legs in range(1, max_legs + 1):
+            flights, cost, first, _ = layer
+            done = self.arrival[flights] == destination
+            completed.extend((legs, i) for i in np.flatnonzero(done))
+            score = self._score(objective, layer)
+            completed_scores.extend(score[done])
+            if legs == max_legs or (objective == 'fewest_stops' and len(completed) >= limit):
+                break
+            if len(completed_scores) >= limit:
+                # Price and elapsed time only grow with every leg, so a label
+                # already worse than the limit-th complete itinerary is dropped
+                bound = sorted(completed_scores)[limit - 1]
+
+            # Open labels grouped by the city they land in, by landing time
+            open_labels = np.flatnonzero(~done & (score < bound))
+            open_labels = open_labels[hops[self.arrival[flights[open_labels]]] <= max_legs - legs]
+            landed_at = self.arrival[flights[open_labels]]
+            open_labels = open_labels[np.lexsort((self.arrival_ts[flights[open_labels]], landed_at))]
+            landed_at = self.arrival[flights[open_labels]]
+            splits = np.flatnonzero(np.diff(landed_at)) + 1
+
+            next_parts = []
+            for labels in np.split(open_labels, splits) if len(open_labels) else []:
+                city = self.arrival[flights[labels[0]]]
+                landed = self.arrival_ts[flights[labels]]
+
+                onward = self._departures(city, landed[0] + connection, min(end, landed[-1] + layover))
+                onward = onward[(self.arrival[onward] != origin) &
+                                (hops[self.arrival[onward]] <= max_legs - legs - 1)]
+                if not len(onward):
+                    continue
+                lo = np.searchsorted(landed, self.departure_ts[onward] - layover, 'left')
+                hi = np.searchsorted(landed, self.departure_ts[onward] - connection, 'right') - 1
+                ok = lo <= hi
+                onward, lo, hi = onward[ok], lo[ok], hi[ok]
+                if not len(onward):
+                    continue
+
+                score = -first[labels] if objective == 'fastest' else cost[labels]
+                boarding, best = _range_smallest(score, _sparse_table(score), lo, hi, limit)
+                onward, best = onward[boarding], labels[best]
+                next_parts.append((onward, cost[best] + price[onward], first[best], best))
+
+            if not next_parts:
+                break
+            layer = tuple(np.concatenate(part) for part in zip(*next_parts))
+            keep = self._score(objective, layer) < bound
+            layer = tuple(part[keep] for part in layer)
+            layers.append(layer)
+
+        itineraries = [self._itinerary(layers, legs, i, price) for legs, i in completed]
+        if objective == 'cheapest':
+            itineraries.sort(key=lambda it: (it.price, it.arrival_time - it.departure_time))
+        elif objective == 'fastest':
+            itineraries.sort(key=lambda it: (it.arrival_time - it.departure_time, it.price))
+        else:
+            itineraries.sort(key=lambda it: (it.stops, it.price))
+        return itineraries[:limit]
+
+    def _score(self, objective, layer):
+        # Lower bound on the final sort key of any itinerary extending a label
+        flights, cost, first, _ = layer
+        return self.arrival_ts[flights] - first if objective == 'fastest' else cost
+
+    def _itinerary(self, layers, legs, label, price):
+        path = []
+        for depth in range(legs, 0, -1):
+            flights, _, _, parents = layers[depth - 1]
+            path.append(flights[label])
+            label = parents[label]
+        path.reverse()
+        return Itinerary(
+            flight_ids=[int(self.flight_ids[p]) for p in path],
+            price=int(price[path].sum()) / 100,
+            departure_time=pd.Timestamp(int(self.departure_ts[path[0]]), unit='s'),
+            arrival_time=pd.Timestamp(int(self.arrival_ts[path[-1]]), unit='s'),
+            stops=len(path) - 1,
+        )
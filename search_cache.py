@@ -0,0 +1,104 @@
+# search_cache.py
+"""Shared, size-bounded cache of search results for repeated queries."""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+SEARCH_CACHE_SIZE = int(os.environ.get('SKYWINGS_SEARCH_CACHE_SIZE', 1024))
+SEARCH_CACHE_TTL = float(os.environ.get('SKYWINGS_SEARCH_CACHE_TTL', 300))
+# Broad queries match most of the inventory, so entries are bounded by bytes too
+SEARCH_CACHE_BYTES = int(os.environ.get('SKYWINGS_SEARCH_CACHE_MB', 256)) * 2 ** 20
+
+
+def search_key(departure=None, arrival=None, airlines=None, flight_class=None, price_range=None,
+               sort_by='price'):
+    """Normalize search filters so equivalent queries share one entry.
+
+    The tuple is in FlightIndex.search() argument order. Airline order does
+    not matter and an empty selection means every airline.
+    """
+    airlines = tuple(sorted(set(airlines))) if airlines else None
+    if price_range is not None:
+        price_range = (float(price_range[0]), float(price_range[1]))
+    return departure, arrival, airlines, flight_class, price_range, sort_by
+
+
+class SearchCache:
+    """Thread-safe LRU of search results with per-entry TTL and a byte budget.
+
+    Each entry is tagged with the generation it was computed under, e.g.
+    the inventory version; a lookup under a different generation treats it
+    as stale. Results are shared between sessions, so cached arrays are
+    made read-only.
+    """
+
+    def __init__(self, maxsize=SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TTL, maxbytes=SEARCH_CACHE_BYTES,
+                 clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.maxbytes = maxbytes
+        self.nbytes = 0
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
+
+    def get(self, key, generation, compute):
+        """Cached result for ``key``, or ``compute()``'s, stored for next time."""
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry_generation, expires, result = entry
+                if entry_generation == generation and expires > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return result
+                self._discard(key)
+                if entry_generation != generation:
+                    self.invalidations += 1
+                else:
+                    self.expirations += 1
+            self.misses += 1
+
+        # Compute outside the lock; a concurrent miss on the same key just
+        # computes the same result
+        result = compute()
+        if hasattr(result, 'flags'):
+            result.flags.writeable = False
+
+        if getattr(result, 'nbytes', 0) > self.maxbytes:
+            return result
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = (generation, now + self.ttl, result)
+            self.nbytes += getattr(result, 'nbytes', 0)
+            while self._entries and (len(self._entries) > self.maxsize or self.nbytes > self.maxbytes):
+                self._discard(next(iter(self._entries)))
+                self.evictions += 1
+        return result
+
+    def _discard(self, key):
+        # Caller holds the lock
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.nbytes -= getattr(entry[2], 'nbytes', 0)
+
+    def clear(self):
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'entries': len(self._entries), 'maxsize': self.maxsize, 'bytes': self.nbytes,
+                    'maxbytes': self.maxbytes, 'hits': self.hits,
+                    'misses': self.misses, 'evictions': self.evictions, 'expirations': self.expirations,
+                    'invalidations': self.invalidations,
+                    'hit_rate': self.hits / lookups if lookups else 0.0}
+
+    def __len__(self):
+        return len(self._entries)
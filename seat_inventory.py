@@ -0,0 +1,168 @@
+# seat_inventory.py
+"""Atomic seat reservations with hold timeouts, striped across many locks."""
+import heapq
+import itertools
+import os
+import threading
+import time
+from contextlib import ExitStack
+
+import numpy as np
+
+HOLD_TTL = int(os.environ.get('SKYWINGS_SEAT_HOLD_TTL', 600))
+LOCK_STRIPES = int(os.environ.get('SKYWINGS_SEAT_LOCK_STRIPES', 64))
+
+
+class SeatInventory:
+    """Seats left per flight, with reserve -> confirm/release holds.
+
+    ``reserve`` takes seats out of the available count straight away and
+    returns a hold id; the hold either becomes a sale (``confirm``), gives
+    its seats back (``release``) or lapses after ``hold_ttl`` seconds.
+    Flights are spread over ``stripes`` locks by flight id, so reservations
+    on different flights rarely wait on each other.
+    """
+
+    def __init__(self, seats, stripes=LOCK_STRIPES, hold_ttl=HOLD_TTL, clock=time.monotonic):
+        self._available = np.array(seats, dtype=np.int32)
+        self._stripes = stripes
+        self._locks = [threading.Lock() for _ in range(stripes)]
+        self._holds = [{} for _ in range(stripes)]
+        self._expiries = [[] for _ in range(stripes)]
+        self._ids = itertools.count(1)
+        self.hold_ttl = hold_ttl
+        self._clock = clock
+        # Takes a fresh value on every change so caches over seat counts
+        # can tell they are stale
+        self._epochs = itertools.count(1)
+        self.epoch = 0
+
+    def __len__(self):
+        return len(self._available)
+
+    def _bump(self):
+        self.epoch = next(self._epochs)
+
+    def _stripe(self, flight_id):
+        return flight_id % self._stripes
+
+    def _expire(self, stripe, now):
+        # Caller holds the stripe lock
+        holds, expiries = self._holds[stripe], self._expiries[stripe]
+        while expiries and expiries[0][0] <= now:
+            _, hold_id = heapq.heappop(expiries)
+            hold = holds.pop(hold_id, None)
+            if hold is not None:
+                self._available[hold[0]] += hold[1]
+                self._bump()
+
+    def available(self, flight_id):
+        stripe = self._stripe(flight_id)
+        with self._locks[stripe]:
+            self._expire(stripe, self._clock())
+            return int(self._available[flight_id])
+
+    def in_stock(self, flight_ids):
+        """Boolean mask of the flights that still have seats."""
+        return self._available[flight_ids] > 0
+
+    def remaining(self, flight_ids):
+        """Seats left on each of ``flight_ids``, holds counted as taken."""
+        return self._available[flight_ids].copy()
+
+    def expire_holds(self):
+        """Return the seats of every lapsed hold, not just on flights touched since."""
+        now = self._clock()
+        for stripe, lock in enumerate(self._locks):
+            if self._expiries[stripe] and self._expiries[stripe][0][0] <= now:
+                with lock:
+                    self._expire(stripe, now)
+
+    def reserve(self, flight_id, seats=1, ttl=None):
+        """Hold ``seats`` on a flight; returns a hold id, or None if sold out."""
+        stripe = self._stripe(flight_id)
+        now = self._clock()
+        with self._locks[stripe]:
+            self._expire(stripe, now)
+            if self._available[flight_id] < seats:
+                return None
+            self._available[flight_id] -= seats
+            hold_id = f'{stripe}:{next(self._ids)}'
+            expires = now + (self.hold_ttl if ttl is None else ttl)
+            self._holds[stripe][hold_id] = (flight_id, seats, expires)
+            heapq.heappush(self._expiries[stripe], (expires, hold_id))
+            self._bump()
+            return hold_id
+
+    def sell_many(self, demand, all_or_nothing=False):
+        """Sell seats on many flights at once; returns the flight ids sold.
+
+        ``demand`` maps flight id -> seats. Each flight's seats are sold
+        together or not at all, and with ``all_or_nothing`` so is the whole
+        demand. Every stripe involved is locked for the duration, so no
+        reservation sees a partly applied batch.
+        """
+        stripes = sorted({self._stripe(flight_id) for flight_id in demand})
+        now = self._clock()
+        with ExitStack() as stack:
+            # Always in stripe order, so two batches cannot deadlock
+            for stripe in stripes:
+                stack.enter_context(self._locks[stripe])
+                self._expire(stripe, now)
+            sold = [flight_id for flight_id, seats in demand.items() if self._available[flight_id] >= seats]
+            if all_or_nothing and len(sold) < len(demand):
+                return []
+            for flight_id in sold:
+                self._available[flight_id] -= demand[flight_id]
+            if sold:
+                self._bump()
+            return sold
+
+    def _hold_stripe(self, hold_id):
+        # Hold ids are '<stripe>:<n>'; anything else names no hold
+        stripe = hold_id.partition(':')[0]
+        if not stripe.isdigit() or int(stripe) >= self._stripes:
+            return None
+        return int(stripe)
+
+    def _settle(self, hold_id, restore, flight_id=None):
+        stripe = self._hold_stripe(hold_id)
+        if stripe is None:
+            return False
+        with self._locks[stripe]:
+            self._expire(stripe, self._clock())
+            hold = self._holds[stripe].get(hold_id)
+            if hold is None or (flight_id is not None and (hold[0] != flight_id or hold[1] != 1)):
+                return False
+            del self._holds[stripe][hold_id]
+            if restore:
+                self._available[hold[0]] += hold[1]
+                self._bump()
+            return True
+
+    def confirm(self, hold_id, flight_id=None):
+        """Turn a live hold into a sale; False if it lapsed or is unknown.
+
+        With ``flight_id``, only a hold of one seat on that flight is
+        confirmed; any other hold is left as it is.
+        """
+        return self._settle(hold_id, restore=False, flight_id=flight_id)
+
+    def release(self, hold_id):
+        """Give a live hold's seats back; False if it lapsed or is unknown."""
+        return self._settle(hold_id, restore=True)
+
+    def cancel(self, flight_id, seats=1):
+        """Return seats from a cancelled, previously confirmed booking."""
+        stripe = self._stripe(flight_id)
+        with self._locks[stripe]:
+            self._available[flight_id] += seats
+            self._bump()
+
+    def hold_expires_in(self, hold_id):
+        stripe = self._hold_stripe(hold_id)
+        if stripe is None:
+            return None
+        with self._locks[stripe]:
+            hold = self._holds[stripe].get(hold_id)
+            return None if hold is None else max(0.0, hold[2] - self._clock())
@@ -0,0 +1,334 @@
+# service.py
+"""Search, booking and cancellation, independent of any UI.
+
+The Streamlit app and the HTTP API (api.py) both go through
+BookingService, so they book from the same seat pool, write to the same
+booking store and count into the same analytics. What differs is only
+how per-version resources are cached: the app hands in its
+st.cache_resource getters, the API an InventoryResources.
+"""
+import secrets
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from analytics_aggregates import FlightAggregates
+from fare_calendar import FareCalendar
+from flight_index import FlightIndex
+from inventory import SCHEDULE_PERIOD, data_version, load_inventory
+from notifications import send_booking_confirmation
+from pricing import PricingEngine, base_fare_range, wall_clock
+
+PASSENGER_FIELDS = ('first_name', 'last_name', 'email', 'phone')
+
+
+class FareExpired(Exception):
+    """The fares a flight was quoted at belong to a pricing epoch no longer offered."""
+
+# What the booking form preselects; the confirmation email and My Bookings show them
+PASSENGER_DEFAULTS = {'seat_preference': 'No Preference', 'meal_preference': 'Standard'}
+
+
+def new_booking(flight, passenger, payment_method, version, owner=None):
+    """A confirmed booking record, ready for the booking repository.
+
+    ``owner`` is the secret of whoever booked it (a browser session or an
+    API booking token); only a caller presenting it can list or cancel it.
+    """
+    return {
+        'owner': owner,
+        'flight': flight,
+        'inventory_version': version,
+        'passenger': dict(PASSENGER_DEFAULTS, **passenger),
+        'payment_method': payment_method,
+        'booking_date': datetime.now(),
+        'status': 'Confirmed',
+    }
+
+
+def priced_search(index, key, cents):
+    """FlightIndex.search() for a search_key(), with prices and price order from ``cents``.
+
+    The index orders flights by base fare; a price range is first widened
+    to every base fare that could price into it, then applied exactly.
+    """
+    departure, arrival, airlines, flight_class, price_range, sort_by = key
+    priced_sort = sort_by in ('price', '-price')
+    rows = index.search(departure, arrival, airlines, flight_class,
+                        price_range and base_fare_range(price_range), 'price' if priced_sort else sort_by)
+    if price_range is not None:
+        prices = cents[rows]
+        rows = rows[(prices >= round(price_range[0] * 100)) & (prices <= round(price_range[1] * 100))]
+    if priced_sort:
+        rows = rows[np.argsort(cents[rows], kind='stable')]
+        if sort_by == '-price':
+            rows = rows[::-1]
+    return rows
+
+
+def owned_by(booking, owner):
+    """Whether ``booking`` was made by ``owner``."""
+    return owner is not None and booking.get('owner') is not None and secrets.compare_digest(booking['owner'], owner)
+
+
+def starting_seats(flights, backend, repository, version):
+    """Seat counts a new seat pool for inventory ``version`` starts from.
+
+    A shared backend keeps its seat counts across restarts. A
+    process-local one starts over, so the seats held by confirmed
+    bookings in ``repository`` are taken off the generated counts.
+    """
+    seats = flights['available_seats'].to_numpy().copy()
+    if backend.local and repository is not None:
+        booked = repository.seats_booked(version)
+        flight_ids = np.fromiter(booked, dtype=np.int64, count=len(booked))
+        counts = np.fromiter(booked.values(), dtype=np.int64, count=len(booked))
+        known = (flight_ids >= 0) & (flight_ids < len(seats))
+        np.subtract.at(seats, flight_ids[known], counts[known].astype(seats.dtype))
+        np.maximum(seats, 0, out=seats)
+    return seats
+
+
+def load_shared_inventory(backend, version):
+    """Load inventory ``version`` with the schedule start every worker agrees on.
+
+    The first worker to build a version fixes the schedule's start hour,
+    so every worker generates the same flights. The start is kept a little
+    longer than the version is current, as a new schedule period brings a
+    new version with a start of its own.
+    """
+    start = backend.setdefault(f'inventory:{version}:start', pd.Timestamp.now().floor('h'),
+                               ttl=2 * SCHEDULE_PERIOD)
+    return load_inventory(version=version, start=pd.Timestamp(start))
+
+
+class InventoryResources:
+    """Per-version inventory, index, seats, pricing, aggregates and fares, built on first use.
+
+    Keeps the most recent ``keep`` versions; an older one is dropped once
+    a newer version has been built. With a process-local backend, seat
+    pools start from the bookings already in ``repository``.
+    """
+
+    def __init__(self, backend, keep=2, repository=None):
+        self.backend = backend
+        self.keep = keep
+        self.repository = repository
+        self._lock = threading.Lock()
+        self._versions = {}
+
+    def __contains__(self, version):
+        with self._lock:
+            return version in self._versions
+
+    def _get(self, version, name, build):
+        with self._lock:
+            resources = self._versions.get(version)
+            if resources is None:
+                resources = self._versions[version] = {'lock': threading.RLock()}
+                for old in list(self._versions)[:-self.keep]:
+                    del self._versions[old]
+        # Built under a per-version lock, so concurrent first requests build
+        # once; reentrant, as the index and seats build on the inventory
+        with resources['lock']:
+            if name not in resources:
+                resources[name] = build()
+            return resources[name]
+
+    def inventory(self, version):
+        return self._get(version, 'inventory', lambda: load_shared_inventory(self.backend, version))
+
+    def index(self, version):
+        return self._get(version, 'index', lambda: FlightIndex(self.inventory(version).flights))
+
+    def seats(self, version):
+        return self._get(version, 'seats', lambda: self.backend.seat_inventory(
+            version, starting_seats(self.inventory(version).flights, self.backend, self.repository, version)))
+
+    def pricing(self, version):
+        return self._get(version, 'pricing', lambda: PricingEngine(
+            self.inventory(version).flights, self.seats(version), self.backend.counters(f'demand:{version}'),
+            self.backend, f'pricing:{version}'))
+
+    def aggregates(self, version):
+        return self._get(version, 'aggregates', lambda: FlightAggregates.from_flights(
+            self.inventory(version).flights, booking_counters=self.backend.counters(f'bookings:{version}')))
+
+    def fares(self, version):
+        return self._get(version, 'fares', lambda: FareCalendar(self.inventory(version).flights))
+
+
+class BookingService:
+    """The booking workflow: search -> quote -> reserve -> confirm, and cancel.
+
+    ``resources`` provides inventory(version), index(version),
+    seats(version), pricing(version), aggregates(version) and
+    fares(version). Methods take the inventory version explicitly where a
+    client carries it between calls (holds are only valid against the
+    version they were made on) and default to the current one otherwise;
+    likewise the pricing epoch, so search results, quotes and the booking
+    charge the same fares while that epoch is kept. Sold-out and unknown ids come back as
+    None, as they do from SeatInventory and the booking repository.
+    Bookings and cancellations are counted into ``analytics`` (a
+    BookingAnalytics), whatever inventory version they were made on.
+    """
+
+    def __init__(self, resources, repository, search_cache, jobs=None, analytics=None):
+        self.resources = resources
+        self.repository = repository
+        self.search_cache = search_cache
+        self.jobs = jobs
+        self.analytics = analytics
+
+    def current_version(self):
+        return data_version()
+
+    def prices(self, version=None, epoch=None):
+        """Fares of pricing ``epoch`` (default the current one), or None once it has gone."""
+        return self.resources.pricing(version or self.current_version()).prices(epoch)
+
+    def _prices(self, version, epoch):
+        return (epoch is not None and self.prices(version, epoch)) or self.prices(version)
+
+    def search(self, key, version=None, epoch=None):
+        """Row ids of in-stock flights matching a search_key(), in its order.
+
+        Prices and price order are those of pricing ``epoch``, or the
+        current one if it is not given or has gone. Results come from the
+        shared search cache; sold-out and departed flights are dropped
+        after the lookup, so seat changes and the clock show up without
+        invalidating it.
+        """
+        version = version or self.current_version()
+        index = self.resources.index(version)
+        prices = self._prices(version, epoch)
+        matches = self.search_cache.get(key, (version, prices.epoch), lambda: priced_search(index, key, prices.cents))
+        matches = matches[index.departure_time[matches] > wall_clock()]
+        seats = self.resources.seats(version)
+        seats.expire_holds()
+        return matches[seats.in_stock(matches)]
+
+    def fare_calendar(self, departure, arrival, day, flex_days, version=None):
+        """Lowest fare per class on each day within ``flex_days`` of ``day`` (a FareWindow)."""
+        version = version or self.current_version()
+        seats = self.resources.seats(version)
+        seats.expire_holds()
+        return self.resources.fares(version).window(departure, arrival, day - timedelta(days=flex_days),
+                                                    2 * flex_days + 1, seats, self.prices(version))
+
+    def flights(self, rows, version=None, epoch=None):
+        """Flight records for ``rows``, with live seat counts and the fares of pricing ``epoch``."""
+        version = version or self.current_version()
+        seats = self.resources.seats(version)
+        prices = self._prices(version, epoch)
+        records = self.resources.inventory(version).records(rows)
+        for record in records:
+            record['available_seats'] = seats.available(record['flight_id'])
+            record['price'] = int(prices.cents[record['flight_id']]) / 100
+            record['pricing_epoch'] = prices.epoch
+        return records
+
+    def exists(self, flight_id, version=None):
+        return 0 <= flight_id < len(self.resources.inventory(version or self.current_version()))
+
+    def flight(self, flight_id, version=None, epoch=None):
+        version = version or self.current_version()
+        if not self.exists(flight_id, version):
+            return None
+        return self.flights([flight_id], version, epoch)[0]
+
+    def quote(self, flight_id, passengers=1, version=None, epoch=None):
+        """Price for ``passengers`` on a flight, or None if it does not exist."""
+        version = version or self.current_version()
+        flight = self.flight(flight_id, version, epoch)
+        if flight is None:
+            return None
+        return {'flight': flight, 'inventory_version': version, 'pricing_epoch': flight['pricing_epoch'],
+                'passengers': passengers,
+                'unit_price': flight['price'], 'total_price': round(flight['price'] * passengers, 2),
+                'bookable': flight['available_seats'] >= passengers}
+
+    def reserve(self, flight_id, seats=1, version=None):
+        """Hold seats while the passenger checks out; None if sold out."""
+        version = version or self.current_version()
+        inventory = self.resources.seats(version)
+        hold_id = inventory.reserve(flight_id, seats)
+        if hold_id is None:
+            return None
+        return {'hold_id': hold_id, 'inventory_version': version, 'flight_id': flight_id, 'seats': seats,
+                'expires_in': inventory.hold_expires_in(hold_id)}
+
+    def release(self, hold_id, version):
+        return self.resources.seats(version).release(hold_id)
+
+    def hold_expires_in(self, hold_id, version):
+        return self.resources.seats(version).hold_expires_in(hold_id)
+
+    def confirm(self, flight, passenger, payment_method, hold_id=None, version=None, owner=None):
+        """Book ``flight`` for ``passenger``; returns the booking, or None if sold out or departed.
+
+        ``flight`` is the record the passenger was quoted, and its price is
+        what they pay while its ``pricing_epoch`` is kept; after that it
+        raises FareExpired and the flight must be quoted again. A hold is
+        only used if it is for one seat on this flight; a lapsed, missing
+        or mismatched one is retried once against whatever seats are left.
+        The booking belongs to ``owner``. The confirmation email goes out
+        on the job queue.
+        """
+        missing = [field for field in PASSENGER_FIELDS if not passenger.get(field)]
+        if missing:
+            raise ValueError(f"Missing passenger fields: {', '.join(missing)}")
+        version = version or self.current_version()
+        epoch = flight.get('pricing_epoch')
+        if epoch is None or self.prices(version, epoch) is None:
+            raise FareExpired(f"Fares of pricing epoch {epoch} are no longer offered; quote again")
+        if pd.Timestamp(flight['departure_time']).timestamp() <= wall_clock():
+            return None
+        seats = self.resources.seats(version)
+        if hold_id is None or not seats.confirm(hold_id, flight['flight_id']):
+            hold_id = seats.reserve(flight['flight_id'])
+            if hold_id is None or not seats.confirm(hold_id, flight['flight_id']):
+                return None
+
+        booking = self.repository.add(new_booking(flight, passenger, payment_method, version, owner))
+        self.resources.aggregates(version).add_booking(booking)
+        self.resources.pricing(version).record_bookings([flight['flight_id']])
+        if self.analytics is not None:
+            self.analytics.add_booking(booking)
+        if self.jobs is not None:
+            self.jobs.submit(send_booking_confirmation, booking)
+        return booking
+
+    def cancel(self, booking_id, owner=None):
+        """Cancel a booking and give its seat back; None if there is no such booking.
+
+        Given an ``owner``, someone else's booking is treated as missing;
+        without one the caller is trusted (the admin tools).
+        """
+        booking = self.repository.get(booking_id)
+        if booking is None or (owner is not None and not owned_by(booking, owner)):
+            return None
+        # Only the caller whose update changed the status gives the seat back
+        if self.repository.set_status(booking_id, 'Cancelled'):
+            # Seats go back only to the inventory version they were sold from
+            version = booking.get('inventory_version')
+            if version == self.current_version():
+                self.resources.seats(version).cancel(booking['flight']['flight_id'])
+                self.resources.aggregates(version).cancel_booking(booking)
+            if self.analytics is not None:
+                self.analytics.cancel_booking(booking)
+        booking['status'] = 'Cancelled'
+        return booking
+
+    def bookings(self, email, owner=None):
+        """Bookings for passenger ``email``; given an ``owner``, only those it made.
+
+        The email alone proves nothing, anyone can type one in; as with
+        cancel(), only trusted callers leave out the owner.
+        """
+        if not email:
+            return []
+        bookings = self.repository.list_by_email(email)
+        return bookings if owner is None else [booking for booking in bookings if owned_by(booking, owner)]
@@ -0,0 +1,577 @@
+# state_backend.py
+"""State shared by every worker process: seat holds, counters, rollups and sessions.
+
+Streamlit keeps ``st.session_state`` and ``st.cache_resource`` inside one
+process, so anything that must agree across workers or replicas lives
+behind a StateBackend instead. open_state_backend() picks one from
+SKYWINGS_STATE_BACKEND:
+
+    memory://                     in-process; a single worker (default)
+    sqlite:///path/to/state.db    any number of workers sharing the file
+
+Everything here is keyed by plain strings and stores JSON, so another
+backend only has to provide the same operations with the same atomicity.
+"""
+import os
+import secrets
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+import numpy as np
+
+from booking_store import ConnectionPool, connect_sqlite, dumps_booking, loads_booking
+from seat_inventory import HOLD_TTL, SeatInventory
+
+STATE_BACKEND_URL = os.environ.get('SKYWINGS_STATE_BACKEND', 'memory://')
+# How long a browser session's shared state outlives its last change
+SESSION_TTL = int(os.environ.get('SKYWINGS_SESSION_TTL', 24 * 3600))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (
+    key     TEXT PRIMARY KEY,
+    value   TEXT NOT NULL,
+    expires REAL
+);
+CREATE INDEX IF NOT EXISTS idx_kv_expires ON kv (expires);
+CREATE TABLE IF NOT EXISTS counters (
+    name  TEXT NOT NULL,
+    field TEXT NOT NULL,
+    value INTEGER NOT NULL,
+    PRIMARY KEY (name, field)
+);
+CREATE TABLE IF NOT EXISTS rollups (
+    name       TEXT NOT NULL,
+    resolution TEXT NOT NULL,
+    bucket     INTEGER NOT NULL,
+    field      TEXT NOT NULL,
+    value      INTEGER NOT NULL,
+    PRIMARY KEY (name, resolution, bucket, field)
+);
+CREATE TABLE IF NOT EXISTS seat_epochs (
+    version TEXT PRIMARY KEY,
+    epoch   INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS seats_taken (
+    version   TEXT NOT NULL,
+    flight_id INTEGER NOT NULL,
+    taken     INTEGER NOT NULL,
+    epoch     INTEGER NOT NULL,
+    PRIMARY KEY (version, flight_id)
+);
+CREATE INDEX IF NOT EXISTS idx_seats_taken_epoch ON seats_taken (version, epoch);
+CREATE TABLE IF NOT EXISTS seat_holds (
+    hold_id   TEXT PRIMARY KEY,
+    version   TEXT NOT NULL,
+    flight_id INTEGER NOT NULL,
+    seats     INTEGER NOT NULL,
+    expires   REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_seat_holds_expires ON seat_holds (version, expires);
+"""
+
+
+class StateBackend:
+    """Storage interface for cross-worker state; see open_state_backend()."""
+
+    # True when everything is in this process's memory, so no call waits on I/O
+    local = False
+
+    def seat_inventory(self, version, seats):
+        """Seat counts for inventory ``version``, starting from ``seats``.
+
+        Returns an object with SeatInventory's interface. Every worker
+        passes the same starting counts; only the changes are shared.
+        """
+        raise NotImplementedError
+
+    def counters(self, name):
+        """Named group of integer counters, see Counters."""
+        raise NotImplementedError
+
+    def rollups(self, name, resolutions):
+        """Named integer counters per time bucket, see Rollups.
+
+        ``resolutions`` maps each resolution's name to its bucket width in
+        seconds and the number of buckets kept.
+        """
+        raise NotImplementedError
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl=None):
+        raise NotImplementedError
+
+    def setdefault(self, key, value, ttl=None):
+        """Store ``value`` unless ``key`` is already set; returns the stored value."""
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class Counters:
+    """In-process counters; ``incr`` takes a {field: amount} mapping."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = Counter()
+
+    def incr(self, amounts):
+        with self._lock:
+            self._values.update(amounts)
+
+    def read(self):
+        with self._lock:
+            return dict(self._values)
+
+
+def _floors(resolutions, now):
+    # Oldest bucket each resolution keeps at time ``now``
+    return {resolution: int(now // width) - keep + 1 for resolution, (width, keep) in resolutions.items()}
+
+
+class Rollups:
+    """In-process counters per time bucket, at several resolutions at once.
+
+    ``incr`` takes (seconds, {field: amount}) items and adds each to its
+    bucket at every resolution; buckets older than a resolution keeps,
+    counting back from ``now``, are dropped. Each resolution is a ring of
+    rows, one per bucket kept, with a column per field and the bucket
+    each row holds, so a row is reused once its bucket has expired and
+    reads are array slices whatever went into them.
+    """
+
+    def __init__(self, resolutions):
+        self.resolutions = dict(resolutions)
+        self._lock = threading.Lock()
+        self._fields = {}
+        self._values = {resolution: np.zeros((keep, 16), dtype=np.int64)
+                        for resolution, (_, keep) in self.resolutions.items()}
+        self._held = {resolution: np.full(keep, -1, dtype=np.int64)
+                      for resolution, (_, keep) in self.resolutions.items()}
+        self._floors = dict.fromkeys(self.resolutions, 0)
+
+    def _columns(self, fields):
+        # Caller holds the lock; new fields get a column, doubling the arrays when full
+        columns = [self._fields.setdefault(field, len(self._fields)) for field in fields]
+        width = next(iter(self._values.values())).shape[1]
+        if len(self._fields) > width:
+            width = max(2 * width, len(self._fields))
+            for resolution, values in self._values.items():
+                grown = np.zeros((len(values), width), dtype=np.int64)
+                grown[:, :values.shape[1]] = values
+                self._values[resolution] = grown
+        return columns
+
+    def incr(self, items, now):
+        floors = _floors(self.resolutions, now)
+        with self._lock:
+            seconds = np.array([s for s, fields in items for _ in fields], dtype=np.float64)
+            columns = np.array(self._columns([field for _, fields in items for field in fields]), dtype=np.int64)
+            amounts = np.array([amount for _, fields in items for amount in fields.values()], dtype=np.int64)
+            for resolution, (width, keep) in self.resolutions.items():
+                self._floors[resolution] = max(self._floors[resolution], floors[resolution])
+                values, held = self._values[resolution], self._held[resolution]
+                buckets = (seconds // width).astype(np.int64)
+                rows = buckets % keep
+                # A row holding an expired bucket starts over; items for a
+                # bucket older than the one a row holds have expired too
+                live = (buckets >= floors[resolution]) & (buckets >= held[rows])
+                buckets, rows = buckets[live], rows[live]
+                stale = rows[held[rows] < buckets]
+                values[stale] = 0
+                held[stale] = buckets[held[rows] < buckets]
+                np.add.at(values, (rows, columns[live]), amounts[live])
+
+    def _rows(self, resolution, first, last):
+        # Caller holds the lock; rows of the unexpired buckets in the window that are held
+        buckets = np.arange(max(first, self._floors[resolution]), last + 1)
+        rows = buckets % self.resolutions[resolution][1]
+        held = self._held[resolution][rows] == buckets
+        return buckets[held], rows[held]
+
+    def series(self, resolution, first, last, fields):
+        """{bucket: {field: value}} of ``fields`` for the buckets from ``first`` to ``last`` that have any."""
+        with self._lock:
+            fields = [field for field in fields if field in self._fields]
+            buckets, rows = self._rows(resolution, first, last)
+            values = self._values[resolution][np.ix_(rows, [self._fields[field] for field in fields])]
+        return {bucket: {field: value for field, value in zip(fields, row) if value}
+                for bucket, row in zip(buckets.tolist(), values.tolist()) if any(row)}
+
+    def totals(self, resolution, first, last):
+        """{field: value} summed over the buckets from ``first`` to ``last``."""
+        with self._lock:
+            _, rows = self._rows(resolution, first, last)
+            totals = self._values[resolution][rows].sum(axis=0).tolist()
+            return {field: totals[column] for field, column in self._fields.items() if totals[column]}
+
+
+class LocalStateBackend(StateBackend):
+    """Process-local backend, for a single worker and for tests."""
+
+    local = True
+
+    def __init__(self, clock=time.time):
+        self._lock = threading.Lock()
+        self._values = {}
+        self._counters = {}
+        self._rollups = {}
+        self._seats = {}
+        self._clock = clock
+
+    def seat_inventory(self, version, seats):
+        with self._lock:
+            if version not in self._seats:
+                self._seats[version] = SeatInventory(seats)
+            return self._seats[version]
+
+    def counters(self, name):
+        with self._lock:
+            return self._counters.setdefault(name, Counters())
+
+    def rollups(self, name, resolutions):
+        with self._lock:
+            return self._rollups.setdefault(name, Rollups(resolutions))
+
+    def _live(self, key):
+        # Caller holds the lock
+        entry = self._values.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= self._clock():
+            del self._values[key]
+            entry = None
+        return entry
+
+    def get(self, key):
+        with self._lock:
+            entry = self._live(key)
+            return None if entry is None else loads_booking(entry[0])
+
+    def set(self, key, value, ttl=None):
+        # Stored serialized, so callers see the same copies as with a shared backend
+        with self._lock:
+            self._values[key] = (dumps_booking(value), None if ttl is None else self._clock() + ttl)
+
+    def setdefault(self, key, value, ttl=None):
+        with self._lock:
+            entry = self._live(key)
+            if entry is None:
+                entry = self._values[key] = (dumps_booking(value), None if ttl is None else self._clock() + ttl)
+            return loads_booking(entry[0])
+
+    def delete(self, key):
+        with self._lock:
+            self._values.pop(key, None)
+
+
+class SQLiteStateBackend(StateBackend):
+    """Backend in one SQLite (WAL) file that every worker opens.
+
+    Each operation is a single short transaction; BEGIN IMMEDIATE
+    serializes writers across processes, which is what makes seat
+    reservations atomic. Suits workers on one host or on a volume with
+    working file locks.
+    """
+
+    def __init__(self, path, pool_size=4, clock=time.time):
+        self.path = path
+        self._clock = clock
+        conn = connect_sqlite(path)
+        conn.executescript(SCHEMA)
+        conn.close()
+        self._pool = ConnectionPool(path, pool_size)
+
+    @contextmanager
+    def transaction(self):
+        with self._pool.connection() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield conn
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            conn.execute('COMMIT')
+
+    def query(self, sql, params=()):
+        with self._pool.connection() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def seat_inventory(self, version, seats):
+        return SQLiteSeatInventory(self, version, seats)
+
+    def counters(self, name):
+        return SQLiteCounters(self, name)
+
+    def rollups(self, name, resolutions):
+        return SQLiteRollups(self, name, resolutions)
+
+    def get(self, key):
+        rows = self.query('SELECT value FROM kv WHERE key = ? AND (expires IS NULL OR expires > ?)',
+                          (key, self._clock()))
+        return loads_booking(rows[0][0]) if rows else None
+
+    def set(self, key, value, ttl=None):
+        now = self._clock()
+        with self.transaction() as conn:
+            conn.execute('DELETE FROM kv WHERE expires <= ?', (now,))
+            conn.execute('INSERT OR REPLACE INTO kv (key, value, expires) VALUES (?, ?, ?)',
+                         (key, dumps_booking(value), None if ttl is None else now + ttl))
+
+    def setdefault(self, key, value, ttl=None):
+        now = self._clock()
+        with self.transaction() as conn:
+            conn.execute('DELETE FROM kv WHERE key = ? AND expires <= ?', (key, now))
+            conn.execute('INSERT OR IGNORE INTO kv (key, value, expires) VALUES (?, ?, ?)',
+                         (key, dumps_booking(value), None if ttl is None else now + ttl))
+            return loads_booking(conn.execute('SELECT value FROM kv WHERE key = ?', (key,)).fetchone()[0])
+
+    def delete(self, key):
+        with self.transaction() as conn:
+            conn.execute('DELETE FROM kv WHERE key = ?', (key,))
+
+    def close(self):
+        self._pool.close()
+
+
+class SQLiteCounters:
+    def __init__(self, backend, name):
+        self._backend = backend
+        self.name = name
+
+    def incr(self, amounts):
+        with self._backend.transaction() as conn:
+            conn.executemany(
+                'INSERT INTO counters (name, field, value) VALUES (?, ?, ?) '
+                'ON CONFLICT (name, field) DO UPDATE SET value = value + excluded.value',
+                [(self.name, field, amount) for field, amount in amounts.items()])
+
+    def read(self):
+        return dict(self._backend.query('SELECT field, value FROM counters WHERE name = ?', (self.name,)))
+
+
+class SQLiteRollups:
+    """Rollups' interface over bucket counters shared through SQLite.
+
+    Items are summed per bucket before they are written, and expired
+    buckets are deleted in the same transaction, so a write is one upsert
+    per (resolution, bucket, field) touched. Reads are range scans of the
+    primary key over the window.
+    """
+
+    def __init__(self, backend, name, resolutions):
+        self._backend = backend
+        self.name = name
+        self.resolutions = dict(resolutions)
+
+    def incr(self, items, now):
+        floors = _floors(self.resolutions, now)
+        amounts = Counter()
+        for seconds, fields in items:
+            for resolution, (width, _) in self.resolutions.items():
+                bucket = int(seconds // width)
+                if bucket >= floors[resolution]:
+                    amounts.update({(resolution, bucket, field): amount for field, amount in fields.items()})
+        with self._backend.transaction() as conn:
+            conn.executemany(
+                'INSERT INTO rollups (name, resolution, bucket, field, value) VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT (name, resolution, bucket, field) DO UPDATE SET value = value + excluded.value',
+                [(self.name, *key, amount) for key, amount in amounts.items()])
+            conn.executemany('DELETE FROM rollups WHERE name = ? AND resolution = ? AND bucket < ?',
+                             [(self.name, resolution, floor) for resolution, floor in floors.items()])
+
+    def series(self, resolution, first, last, fields):
+        rows = self._backend.query(
+            f"SELECT bucket, field, value FROM rollups WHERE name = ? AND resolution = ? "
+            f"AND bucket BETWEEN ? AND ? AND field IN ({', '.join('?' * len(fields))}) AND value != 0",
+            (self.name, resolution, first, last, *fields))
+        series = {}
+        for bucket, field, value in rows:
+            series.setdefault(bucket, {})[field] = value
+        return series
+
+    def totals(self, resolution, first, last):
+        return dict(self._backend.query(
+            'SELECT field, SUM(value) FROM rollups WHERE name = ? AND resolution = ? '
+            'AND bucket BETWEEN ? AND ? GROUP BY field', (self.name, resolution, first, last)))
+
+
+class SQLiteSeatInventory:
+    """SeatInventory's interface over seat counts shared through SQLite.
+
+    Only seats taken (sold or held) are stored, per flight that has any;
+    every worker derives availability from the same starting counts. Each
+    change stamps the flight with a new per-version epoch, so a worker
+    catches up on reads by fetching just the rows changed since its last
+    look. Hold expiry uses wall-clock time, which workers share.
+    """
+
+    def __init__(self, backend, version, seats, hold_ttl=HOLD_TTL):
+        self._backend = backend
+        self.version = version
+        self.hold_ttl = hold_ttl
+        self._seats = np.array(seats, dtype=np.int32)
+        self._taken = np.zeros(len(self._seats), dtype=np.int32)
+        self._lock = threading.Lock()
+        self.epoch = 0
+        with backend.transaction() as conn:
+            conn.execute('INSERT OR IGNORE INTO seat_epochs (version, epoch) VALUES (?, 0)', (version,))
+
+    def __len__(self):
+        return len(self._seats)
+
+    def _refresh(self):
+        # One indexed lookup when nothing changed, else only the changed rows
+        with self._lock:
+            epoch = self._backend.query('SELECT epoch FROM seat_epochs WHERE version = ?', (self.version,))[0][0]
+            if epoch == self.epoch:
+                return
+            rows = self._backend.query(
+                'SELECT flight_id, taken FROM seats_taken WHERE version = ? AND epoch > ?',
+                (self.version, self.epoch))
+            if rows:
+                flight_ids, taken = np.array(rows, dtype=np.int64).T
+                self._taken[flight_ids] = taken
+            self.epoch = epoch
+
+    def _take(self, conn, flight_id, seats):
+        self._take_many(conn, {flight_id: seats})
+
+    def _take_many(self, conn, seats):
+        # Caller holds a write transaction; ``seats`` maps flight id -> seats
+        # taken, < 0 to give seats back. One epoch covers the whole change.
+        epoch = conn.execute('UPDATE seat_epochs SET epoch = epoch + 1 WHERE version = ? RETURNING epoch',
+                             (self.version,)).fetchone()[0]
+        conn.executemany(
+            'INSERT INTO seats_taken (version, flight_id, taken, epoch) VALUES (?, ?, ?, ?) '
+            'ON CONFLICT (version, flight_id) DO UPDATE SET taken = max(0, taken + ?), epoch = excluded.epoch',
+            [(self.version, flight_id, max(0, n), epoch, n) for flight_id, n in seats.items()])
+
+    def _expire(self, conn, now, flight_id=None):
+        # Caller holds a write transaction
+        sql = 'DELETE FROM seat_holds WHERE version = ? AND expires <= ?'
+        params = (self.version, now)
+        if flight_id is not None:
+            sql += ' AND flight_id = ?'
+            params += (flight_id,)
+        returned = Counter()
+        for expired_flight, seats in conn.execute(sql + ' RETURNING flight_id, seats', params).fetchall():
+            returned[expired_flight] -= seats
+        if returned:
+            self._take_many(conn, returned)
+
+    def available(self, flight_id):
+        self._refresh()
+        return int(self._seats[flight_id] - self._taken[flight_id])
+
+    def in_stock(self, flight_ids):
+        """Boolean mask of the flights that still have seats."""
+        self._refresh()
+        return self._seats[flight_ids] > self._taken[flight_ids]
+
+    def remaining(self, flight_ids):
+        """Seats left on each of ``flight_ids``, holds counted as taken."""
+        self._refresh()
+        return self._seats[flight_ids] - self._taken[flight_ids]
+
+    def expire_holds(self):
+        """Return the seats of every lapsed hold, from any worker."""
+        now = time.time()
+        if self._backend.query('SELECT 1 FROM seat_holds WHERE version = ? AND expires <= ? LIMIT 1',
+                               (self.version, now)):
+            with self._backend.transaction() as conn:
+                self._expire(conn, now)
+
+    def reserve(self, flight_id, seats=1, ttl=None):
+        """Hold ``seats`` on a flight; returns a hold id, or None if sold out."""
+        flight_id = int(flight_id)
+        now = time.time()
+        with self._backend.transaction() as conn:
+            self._expire(conn, now, flight_id)
+            row = conn.execute('SELECT taken FROM seats_taken WHERE version = ? AND flight_id = ?',
+                               (self.version, flight_id)).fetchone()
+            if self._seats[flight_id] - (row[0] if row else 0) < seats:
+                return None
+            self._take(conn, flight_id, seats)
+            hold_id = secrets.token_hex(8)
+            conn.execute('INSERT INTO seat_holds (hold_id, version, flight_id, seats, expires) '
+                         'VALUES (?, ?, ?, ?, ?)',
+                         (hold_id, self.version, flight_id, seats, now + (self.hold_ttl if ttl is None else ttl)))
+            return hold_id
+
+    def sell_many(self, demand, all_or_nothing=False):
+        """Sell seats on many flights in one transaction; returns the flight ids sold.
+
+        ``demand`` maps flight id -> seats. Each flight's seats are sold
+        together or not at all, and with ``all_or_nothing`` so is the whole
+        demand.
+        """
+        demand = {int(flight_id): int(seats) for flight_id, seats in demand.items()}
+        flight_ids = list(demand)
+        with self._backend.transaction() as conn:
+            self._expire(conn, time.time())
+            taken = {}
+            # Bound the number of SQL variables per statement
+            for start in range(0, len(flight_ids), 500):
+                chunk = flight_ids[start:start + 500]
+                taken.update(conn.execute(
+                    f"SELECT flight_id, taken FROM seats_taken WHERE version = ? "
+                    f"AND flight_id IN ({', '.join('?' * len(chunk))})", (self.version, *chunk)).fetchall())
+            sold = [flight_id for flight_id in flight_ids
+                    if self._seats[flight_id] - taken.get(flight_id, 0) >= demand[flight_id]]
+            if all_or_nothing and len(sold) < len(demand):
+                return []
+            if sold:
+                self._take_many(conn, {flight_id: demand[flight_id] for flight_id in sold})
+            return sold
+
+    def _settle(self, hold_id, restore, flight_id=None):
+        now = time.time()
+        sql, params = 'DELETE FROM seat_holds WHERE hold_id = ? AND version = ?', (hold_id, self.version)
+        if flight_id is not None:
+            sql += ' AND flight_id = ? AND seats = 1'
+            params += (int(flight_id),)
+        with self._backend.transaction() as conn:
+            hold = conn.execute(sql + ' RETURNING flight_id, seats, expires', params).fetchone()
+            if hold is None:
+                return False
+            flight_id, seats, expires = hold
+            # A lapsed hold gives its seats back whatever was asked
+            if restore or expires <= now:
+                self._take(conn, flight_id, -seats)
+            return expires > now
+
+    def confirm(self, hold_id, flight_id=None):
+        """Turn a live hold into a sale; False if it lapsed or is unknown.
+
+        With ``flight_id``, only a hold of one seat on that flight is
+        confirmed; any other hold is left as it is.
+        """
+        return self._settle(hold_id, restore=False, flight_id=flight_id)
+
+    def release(self, hold_id):
+        """Give a live hold's seats back; False if it lapsed or is unknown."""
+        return self._settle(hold_id, restore=True)
+
+    def cancel(self, flight_id, seats=1):
+        """Return seats from a cancelled, previously confirmed booking."""
+        with self._backend.transaction() as conn:
+            self._take(conn, int(flight_id), -seats)
+
+    def hold_expires_in(self, hold_id):
+        rows = self._backend.query('SELECT expires FROM seat_holds WHERE hold_id = ? AND version = ?',
+                                   (hold_id, self.version))
+        return max(0.0, rows[0][0] - time.time()) if rows else None
+
+
+def open_state_backend(url=STATE_BACKEND_URL):
+    if url.startswith('memory://'):
+        return LocalStateBackend()
+    if url.startswith('sqlite:///'):
+        return SQLiteStateBackend(url[len('sqlite:///'):])
+    raise ValueError(f"Unsupported state backend: {url}")
@@ -0,0 +1,134 @@
+# static_assets.py
+"""Pre-rendered HTML for the parts of the app that never change.
+
+Streamlit re-executes app.py on every rerun, but imports this module once
+per process, so the stylesheet and the static Home page and footer blocks
+are built once and sent as a single markdown element each.
+"""
+from html import escape
+
+STYLESHEET = """
+<style>
+    .main-header {
+        font-size: 2.5rem;
+        color: #1E3A8A;
+        text-align: center;
+        padding: 1rem;
+        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+        -webkit-background-clip: text;
+        -webkit-text-fill-color: transparent;
+        font-weight: bold;
+    }
+    .card {
+        background-color: #f8f9fa;
+        border-radius: 10px;
+        padding: 20px;
+        margin: 10px 0;
+        box-shadow: 0 4px 6px rgba(0,0,0,0.1);
+        border-left: 5px solid #3B82F6;
+    }
+    .flight-card {
+        background: white;
+        border-radius: 10px;
+        padding: 15px;
+        margin: 10px 0;
+        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+        transition: transform 0.3s;
+    }
+    .flight-card:hover {
+        transform: translateY(-2px);
+        box-shadow: 0 4px 8px rgba(0,0,0,0.2);
+    }
+    .price-tag {
+        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+        color: white;
+        padding: 5px 15px;
+        border-radius: 20px;
+        font-weight: bold;
+    }
+    .stButton>button {
+        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+        color: white;
+        border: none;
+        padding: 10px 24px;
+        border-radius: 5px;
+        font-weight: bold;
+        width: 100%;
+    }
+    .booking-confirmed {
+        animation: pulse 2s infinite;
+    }
+    @keyframes pulse {
+        0% { transform: scale(1); }
+        50% { transform: scale(1.05); }
+        100% { transform: scale(1); }
+    }
+    .tile-row {
+        display: grid;
+        grid-template-columns: repeat(var(--tiles), minmax(0, 1fr));
+        gap: 1rem;
+    }
+    .destination-card {
+        text-align: center;
+        padding: 20px;
+        border-radius: 10px;
+        background: linear-gradient(135deg, #f5f7fa 0%, #c3cfe2 100%);
+    }
+    .destination-card .from-price {
+        color: #3B82F6;
+        font-weight: bold;
+    }
+    .site-footer p {
+        margin: 0 0 0.25rem 0;
+    }
+</style>
+"""
+
+HEADER_HTML = '<h1 class="main-header">✈️ SkyWings Flight Booking</h1>'
+
+FEATURES = [
+    ("🚀 Best Prices", "Guaranteed lowest fares on all flights with price match promise."),
+    ("🛡️ Flexible Booking", "Free cancellation and easy date changes on most flights."),
+    ("⭐ Premium Service", "24/7 customer support and premium in-flight experience."),
+]
+
+DESTINATIONS = [
+    {"city": "Paris", "price": "$499", "image": "🇫🇷"},
+    {"city": "Tokyo", "price": "$899", "image": "🇯🇵"},
+    {"city": "Dubai", "price": "$699", "image": "🇦🇪"},
+    {"city": "Sydney", "price": "$1299", "image": "🇦🇺"},
+]
+
+FOOTER_COLUMNS = [
+    ("SkyWings Booking", ["© 2024 All rights reserved"]),
+    ("Contact Us", ["📞 +1 (800) FLY-SKYWING", "✉️ support@skywings.com"]),
+    ("Follow Us", ["🐦 Twitter • 📘 Facebook • 📸 Instagram"]),
+]
+
+
+def _tile_row(tiles):
+    return (f'<div class="tile-row" style="--tiles: {len(tiles)};">'
+            + ''.join(tiles) + '</div>')
+
+
+def feature_cards_html(features=FEATURES):
+    return _tile_row([f'<div class="card"><h4>{escape(title)}</h4><p>{escape(text)}</p></div>'
+                      for title, text in features])
+
+
+def destination_cards_html(destinations=DESTINATIONS):
+    return _tile_row([f'<div class="destination-card"><h1>{d["image"]}</h1><h4>{escape(d["city"])}</h4>'
+                      f'<p class="from-price">From {escape(d["price"])}</p></div>'
+                      for d in destinations])
+
+
+def footer_html(columns=FOOTER_COLUMNS):
+    return _tile_row(['<div class="site-footer">' + f'<p><strong>{escape(title)}</strong></p>'
+                      + ''.join(f'<p>{escape(line)}</p>' for line in lines) + '</div>'
+                      for title, lines in columns])
+
+
+# Rendered once at import
+FEATURE_CARDS_HTML = feature_cards_html()
+DESTINATION_CARDS_HTML = destination_cards_html()
+FOOTER_HTML = footer_html()
@@ -0,0 +1,17 @@
+# tests/conftest.py
+"""Shared setup for the test suite; run ``python -m pytest`` from the repository root.
+
+Modules read their SKYWINGS_* settings on import, so these are set
+before any of them is imported: stores and backends stay in memory, and
+confirmation emails go to a scratch outbox rather than the working tree.
+"""
+import os
+import sys
+import tempfile
+
+os.environ['SKYWINGS_BOOKING_STORE'] = 'memory://'
+os.environ['SKYWINGS_STATE_BACKEND'] = 'memory://'
+os.environ['SKYWINGS_OUTBOX_DIR'] = os.path.join(tempfile.mkdtemp(prefix='skywings-tests-'), 'outbox')
+os.environ.setdefault('SKYWINGS_INVENTORY_SIZE', '2000')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
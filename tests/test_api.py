@@ -0,0 +1,162 @@
+# tests/test_api.py
+"""The HTTP API end to end, called in-process through its ASGI interface."""
+import asyncio
+import json
+
+import pytest
+
+import api
+
+PASSENGER = {'first_name': 'Ada', 'last_name': 'Lovelace', 'email': 'ada@example.com', 'phone': '123'}
+
+
+class Client:
+    """Sends one request at a time straight to an ASGI app; no server or HTTP client needed."""
+
+    def __init__(self, app):
+        self.app = app
+
+    def request(self, method, url, body=None, token=None):
+        path, _, query = url.partition('?')
+        headers = [(b'content-type', b'application/json')]
+        if token is not None:
+            headers.append((b'authorization', f'Bearer {token}'.encode()))
+        scope = {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': method,
+                 'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'root_path': '',
+                 'query_string': query.encode(), 'headers': headers,
+                 'server': ('testserver', 80), 'client': ('testclient', 50000)}
+        messages = [{'type': 'http.request', 'body': b'' if body is None else json.dumps(body).encode(),
+                     'more_body': False}]
+        sent = []
+
+        async def run():
+            done = asyncio.Event()
+
+            async def receive():
+                # Streaming responses listen for a disconnect; it comes once the response is complete
+                if messages:
+                    return messages.pop(0)
+                await done.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                sent.append(message)
+                if message['type'] == 'http.response.body' and not message.get('more_body'):
+                    done.set()
+
+            await self.app(scope, receive, send)
+
+        asyncio.run(run())
+        status = next(m['status'] for m in sent if m['type'] == 'http.response.start')
+        content = b''.join(m.get('body', b'') for m in sent if m['type'] == 'http.response.body')
+        return status, content
+
+    def json(self, method, url, body=None, token=None):
+        status, content = self.request(method, url, body, token)
+        return status, json.loads(content) if content else None
+
+
+@pytest.fixture(scope='module')
+def client():
+    service = api.open_service()
+    yield Client(api.create_app(service))
+    service.jobs.shutdown()
+    service.repository.close()
+
+
+@pytest.fixture(scope='module')
+def flight(client):
+    status, page = client.json('GET', '/flights?page_size=5')
+    assert status == 200 and page['total'] > 0
+    return page['flights'][0]
+
+
+def book(client, flight, token=None, **fields):
+    body = {'flight_id': flight['flight_id'], 'passenger': PASSENGER, 'pricing_epoch': flight['pricing_epoch']}
+    return client.json('POST', '/bookings', dict(body, **fields), token)
+
+
+def test_health(client):
+    status, health = client.json('GET', '/health')
+    assert status == 200 and health['status'] == 'ok'
+
+
+def test_search_pages_and_prices(client):
+    status, page = client.json('GET', '/flights?page_size=3&sort=price')
+    assert status == 200
+    assert len(page['flights']) == 3 and page['page'] == 1
+    prices = [f['price'] for f in page['flights']]
+    assert prices == sorted(prices)
+    assert all(f['pricing_epoch'] == page['pricing_epoch'] for f in page['flights'])
+
+
+@pytest.mark.parametrize('query', ['min_price=inf', 'min_price=nan', 'max_price=1e400', 'min_price=cheap',
+                                   'page=0', 'page_size=x', 'sort=random'])
+def test_bad_search_parameters_are_400(client, query):
+    status, error = client.json('GET', f'/flights?{query}')
+    assert status == 400 and error['error']
+
+
+def test_unknown_flights_are_404(client):
+    assert client.json('GET', '/flights/999999999')[0] == 404
+    assert client.json('GET', '/flights/999999999/quote')[0] == 404
+
+
+def test_quote_hold_and_book(client, flight):
+    status, quote = client.json('GET', f"/flights/{flight['flight_id']}/quote?passengers=2")
+    assert status == 200 and quote['total_price'] == round(quote['unit_price'] * 2, 2)
+    status, hold = client.json('POST', '/holds', {'flight_id': flight['flight_id']})
+    assert status == 201
+    seats = client.json('GET', f"/flights/{flight['flight_id']}")[1]['available_seats']
+    status, booking = book(client, flight, hold_id=hold['hold_id'])
+    assert status == 201 and booking['status'] == 'Confirmed'
+    assert booking['flight']['price'] == flight['price']
+    # The held seat became the booked one
+    assert client.json('GET', f"/flights/{flight['flight_id']}")[1]['available_seats'] == seats
+
+
+def test_booking_needs_passenger_details(client, flight):
+    status, error = book(client, flight, passenger={'first_name': 'Ada'})
+    assert status == 400 and 'Missing passenger fields' in error['error']
+
+
+def test_a_lapsed_pricing_epoch_is_409(client, flight):
+    status, error = book(client, flight, pricing_epoch=1)
+    assert status == 409 and 'quote again' in error['error']
+
+
+def test_bookings_are_listed_and_cancelled_only_with_their_owner_token(client, flight):
+    status, booking = book(client, flight)
+    token = booking['owner']
+    assert status == 201 and token
+    status, second = book(client, flight, token=token)
+    assert second['owner'] == token
+
+    assert client.json('GET', '/bookings?email=ada@example.com')[0] == 401
+    assert client.json('GET', '/bookings?email=ada@example.com', token='x' * 22) == (200, [])
+    status, listed = client.json('GET', '/bookings?email=ada@example.com', token=token)
+    assert {b['booking_id'] for b in listed} == {booking['booking_id'], second['booking_id']}
+
+    cancel = f"/bookings/{booking['booking_id']}/cancel"
+    assert client.json('POST', cancel)[0] == 401
+    assert client.json('POST', cancel, token='x' * 22)[0] == 404
+    seats = client.json('GET', f"/flights/{flight['flight_id']}")[1]['available_seats']
+    status, cancelled = client.json('POST', cancel, token=token)
+    assert status == 200 and cancelled['status'] == 'Cancelled'
+    assert client.json('GET', f"/flights/{flight['flight_id']}")[1]['available_seats'] == seats + 1
+
+
+def test_short_tokens_are_refused(client, flight):
+    assert book(client, flight, token='short')[0] == 401
+
+
+def test_export_needs_the_admin_token(client, flight, monkeypatch):
+    monkeypatch.setattr(api, 'API_ADMIN_TOKEN', None)
+    assert client.request('GET', '/bookings/export')[0] == 404
+    monkeypatch.setattr(api, 'API_ADMIN_TOKEN', 'a' * 32)
+    assert client.request('GET', '/bookings/export', token='b' * 32)[0] == 403
+    booking = book(client, flight)[1]
+    status, content = client.request('GET', '/bookings/export?format=csv', token='a' * 32)
+    assert status == 200
+    assert content.splitlines()[0].startswith(b'booking_id,') and booking['booking_id'].encode() in content
+    assert client.request('GET', '/bookings/export?format=xml', token='a' * 32)[0] == 400
@@ -0,0 +1,104 @@
+# tests/test_booking_store.py
+"""Contract of the booking repositories, against the in-memory and SQLite stores."""
+from datetime import datetime, timedelta
+
+import pytest
+
+import booking_store
+from booking_store import (InMemoryBookingRepository, SQLiteBookingRepository, dumps_booking, loads_booking,
+                           open_booking_repository)
+
+
+def make_booking(email='ada@example.com', flight_id=7, flight_number='SW007', version='1',
+                 booking_date=datetime(2026, 1, 1, 9, 30), status='Confirmed'):
+    return {
+        'flight': {'flight_id': flight_id, 'flight_number': flight_number, 'price': 199.5,
+                   'duration': timedelta(hours=2, minutes=15)},
+        'inventory_version': version,
+        'passenger': {'first_name': 'Ada', 'last_name': 'Lovelace', 'email': email, 'phone': '123'},
+        'payment_method': 'Credit Card',
+        'booking_date': booking_date,
+        'status': status,
+    }
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def repository(request, tmp_path):
+    if request.param == 'memory':
+        repository = InMemoryBookingRepository()
+    else:
+        repository = SQLiteBookingRepository(str(tmp_path / 'bookings.db'), pool_size=2)
+    yield repository
+    repository.close()
+
+
+def test_add_assigns_ids_and_round_trips(repository):
+    booking = repository.add(make_booking())
+    assert booking['booking_id'].startswith('BK')
+    stored = repository.get(booking['booking_id'])
+    assert stored == booking
+    assert stored['flight']['duration'] == timedelta(hours=2, minutes=15)
+    assert repository.get('BKMISSING') is None
+
+
+def test_lookups_by_email_and_flight(repository):
+    first = repository.add(make_booking(booking_date=datetime(2026, 1, 1)))
+    second = repository.add(make_booking(booking_date=datetime(2026, 1, 2), flight_number='SW008'))
+    repository.add(make_booking(email='grace@example.com'))
+    assert [b['booking_id'] for b in repository.list_by_email('ada@example.com')] == [first['booking_id'],
+                                                                                      second['booking_id']]
+    assert [b['booking_id'] for b in repository.list_by_flight('SW008')] == [second['booking_id']]
+    assert repository.list_by_email('nobody@example.com') == []
+    assert repository.count() == 3
+
+
+def test_set_status_changes_once(repository):
+    booking = repository.add(make_booking())
+    assert repository.set_status(booking['booking_id'], 'Cancelled')
+    assert not repository.set_status(booking['booking_id'], 'Cancelled')
+    assert not repository.set_status('BKMISSING', 'Cancelled')
+    assert repository.get(booking['booking_id'])['status'] == 'Cancelled'
+
+
+def test_seats_booked_counts_confirmed_bookings_of_a_version(repository):
+    repository.add_many([make_booking(flight_id=1), make_booking(flight_id=1), make_booking(flight_id=2),
+                         make_booking(flight_id=3, version='2')])
+    cancelled = repository.add(make_booking(flight_id=2))
+    repository.set_status(cancelled['booking_id'], 'Cancelled')
+    assert repository.seats_booked('1') == {1: 2, 2: 1}
+
+
+def test_iter_bookings_filters_and_pages_in_date_order(repository):
+    start = datetime(2026, 3, 1)
+    repository.add_many([make_booking(booking_date=start + timedelta(hours=hour)) for hour in range(7)])
+    booked = list(repository.iter_bookings(batch_size=2))
+    assert [b['booking_date'] for b in booked] == [start + timedelta(hours=hour) for hour in range(7)]
+    window = list(repository.iter_bookings(since=start + timedelta(hours=2), until=start + timedelta(hours=5),
+                                           batch_size=2))
+    assert [b['booking_date'].hour for b in window] == [2, 3, 4]
+    repository.set_status(booked[0]['booking_id'], 'Cancelled')
+    assert [b['booking_id'] for b in repository.iter_bookings(status='Cancelled')] == [booked[0]['booking_id']]
+
+
+def test_sqlite_add_many_retries_a_colliding_batch_without_duplicates(tmp_path, monkeypatch):
+    repository = SQLiteBookingRepository(str(tmp_path / 'bookings.db'))
+    existing = repository.add(make_booking())
+    # The second id of the first attempt collides after the first row was written
+    ids = iter(['BKFIRST', existing['booking_id'], 'BKRETRY1', 'BKRETRY2'])
+    monkeypatch.setattr(booking_store, 'new_booking_id', lambda: next(ids))
+    stored = repository.add_many([make_booking(email='group@example.com'), make_booking(email='group@example.com')])
+    assert [b['booking_id'] for b in stored] == ['BKRETRY1', 'BKRETRY2']
+    assert repository.get('BKFIRST') is None
+    assert len(repository.list_by_email('group@example.com')) == 2
+    repository.close()
+
+
+def test_payloads_round_trip_dates_and_durations():
+    booking = make_booking()
+    assert loads_booking(dumps_booking(booking)) == booking
+
+
+def test_open_booking_repository_rejects_unknown_urls():
+    assert isinstance(open_booking_repository('memory://'), InMemoryBookingRepository)
+    with pytest.raises(ValueError):
+        open_booking_repository('postgres://localhost/bookings')
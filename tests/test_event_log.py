@@ -0,0 +1,102 @@
+# tests/test_event_log.py
+"""Durability of the event-log booking repository: replay, snapshots, torn writes and the directory lock."""
+import glob
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+import event_log
+from event_log import EventLogBookingRepository, EventLogError
+from test_booking_store import make_booking
+
+
+def open_log(directory, **options):
+    return EventLogBookingRepository(str(directory), sync=False, **options)
+
+
+def segments(directory):
+    return sorted(glob.glob(os.path.join(str(directory), 'segment-*.log')))
+
+
+def test_bookings_and_statuses_survive_a_reopen(tmp_path):
+    repository = open_log(tmp_path)
+    kept, cancelled = repository.add_many([make_booking(flight_id=1), make_booking(flight_id=2)])
+    assert repository.set_status(cancelled['booking_id'], 'Cancelled')
+    assert not repository.set_status(cancelled['booking_id'], 'Cancelled')
+    repository.close()
+
+    repository = open_log(tmp_path)
+    assert repository.count() == 2
+    assert repository.get(kept['booking_id']) == kept
+    assert repository.get(cancelled['booking_id'])['status'] == 'Cancelled'
+    assert [b['booking_id'] for b in repository.list_by_email('ada@example.com')] == [kept['booking_id'],
+                                                                                      cancelled['booking_id']]
+    assert repository.seats_booked('1') == {1: 1}
+    repository.close()
+
+
+def test_iter_bookings_filters_by_date_and_status(tmp_path):
+    repository = open_log(tmp_path)
+    start = datetime(2026, 3, 1)
+    booked = repository.add_many([make_booking(booking_date=start + timedelta(hours=hour)) for hour in range(5)])
+    repository.set_status(booked[1]['booking_id'], 'Cancelled')
+    window = repository.iter_bookings(since=start + timedelta(hours=1), until=start + timedelta(hours=4))
+    assert [b['booking_date'].hour for b in window] == [1, 2, 3]
+    assert [b['booking_id'] for b in repository.iter_bookings(status='Cancelled')] == [booked[1]['booking_id']]
+    repository.close()
+
+
+def test_snapshots_replace_older_segments(tmp_path):
+    repository = open_log(tmp_path, snapshot_every=3)
+    stored = [repository.add(make_booking(flight_id=i)) for i in range(8)]
+    repository.close()
+    snapshots = glob.glob(os.path.join(str(tmp_path), 'snapshot-*.pkl'))
+    assert len(snapshots) == 1
+    # Only segments holding events after the snapshot are left
+    snapshot_seq = event_log._first_seq(snapshots[0])
+    assert all(event_log._first_seq(path) > snapshot_seq for path in segments(tmp_path))
+
+    repository = open_log(tmp_path, snapshot_every=3)
+    assert [repository.get(b['booking_id']) for b in stored] == stored
+    repository.close()
+
+
+def test_a_torn_last_write_is_dropped(tmp_path):
+    repository = open_log(tmp_path)
+    kept = repository.add(make_booking())
+    repository.close()
+    with open(segments(tmp_path)[-1], 'ab') as f:
+        f.write(b'[2,"created","BKTORN"')
+
+    repository = open_log(tmp_path)
+    assert repository.count() == 1
+    later = repository.add(make_booking())
+    repository.close()
+    repository = open_log(tmp_path)
+    assert {b['booking_id'] for b in repository.iter_bookings()} == {kept['booking_id'], later['booking_id']}
+    repository.close()
+
+
+def test_damage_before_the_last_event_is_refused(tmp_path):
+    repository = open_log(tmp_path)
+    repository.add_many([make_booking(), make_booking()])
+    repository.close()
+    path = segments(tmp_path)[-1]
+    with open(path, 'rb') as f:
+        lines = f.read().split(b'\n')
+    lines[0] = lines[0].replace(b'Confirmed', b'Cancelled')
+    with open(path, 'wb') as f:
+        f.write(b'\n'.join(lines))
+
+    with pytest.raises(EventLogError):
+        open_log(tmp_path)
+
+
+@pytest.mark.skipif(event_log.fcntl is None, reason="no advisory file locks on this platform")
+def test_a_directory_is_open_in_one_place_at_a_time(tmp_path):
+    repository = open_log(tmp_path)
+    with pytest.raises(EventLogError):
+        open_log(tmp_path)
+    repository.close()
+    open_log(tmp_path).close()
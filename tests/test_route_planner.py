@@ -0,0 +1,134 @@
+# tests/test_route_planner.py
+"""RoutePlanner on a hand-built schedule, and against brute-force enumeration on a generated one."""
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from inventory import CITIES, generate_flight_data
+from pricing import PriceList
+from route_planner import RoutePlanner
+
+START = pd.Timestamp('2026-01-05')
+HOUR = 3600
+
+
+def schedule(legs):
+    """Flights from (departure, arrival, departs after START in hours, hours in the air, price in dollars)."""
+    start = int(START.timestamp())
+    return pd.DataFrame({
+        'flight_id': np.arange(len(legs)),
+        'departure_city': [leg[0] for leg in legs],
+        'arrival_city': [leg[1] for leg in legs],
+        'departure_ts': [start + int(leg[2] * HOUR) for leg in legs],
+        'arrival_ts': [start + int((leg[2] + leg[3]) * HOUR) for leg in legs],
+        'price_cents': [leg[4] * 100 for leg in legs],
+    })
+
+
+FLIGHTS = schedule([
+    ('A', 'C', 0, 5, 500),    # 0: direct, fast and dear
+    ('A', 'B', 1, 1, 100),    # 1
+    ('B', 'C', 3, 1, 100),    # 2: connects with 1 (an hour on the ground)
+    ('B', 'C', 2.5, 1, 50),   # 3: leaves too soon after 1 lands
+    ('A', 'B', 0, 1, 80),     # 4
+    ('B', 'C', 30, 1, 40),    # 5: beyond the 24 hour layover after 1 or 4
+])
+
+
+def test_objectives_order_the_same_itineraries_differently():
+    planner = RoutePlanner(FLIGHTS)
+    cheapest = planner.plan('A', 'C', START, objective='cheapest')
+    assert [it.flight_ids for it in cheapest] == [[4, 3], [4, 2], [1, 2], [0]]
+    assert cheapest[0].price == 130.0 and cheapest[0].stops == 1
+    assert planner.plan('A', 'C', START, objective='fastest')[0].flight_ids == [1, 2]
+    assert planner.plan('A', 'C', START, objective='fewest_stops')[0].flight_ids == [0]
+
+
+def test_connection_and_layover_limits():
+    planner = RoutePlanner(FLIGHTS)
+    routes = [it.flight_ids for it in planner.plan('A', 'C', START, min_connection_minutes=90)]
+    assert [1, 2] not in routes and [4, 3] in routes
+    routes = [it.flight_ids for it in planner.plan('A', 'C', START, max_layover_hours=48)]
+    assert [4, 5] in routes and [1, 5] in routes
+
+
+def test_unknown_and_unreachable_cities_give_nothing():
+    planner = RoutePlanner(FLIGHTS)
+    assert planner.plan('A', 'Z', START) == []
+    assert planner.plan('C', 'A', START) == []
+    assert planner.plan('A', 'A', START) == []
+    with pytest.raises(ValueError):
+        planner.plan('A', 'C', START, objective='scenic')
+
+
+def test_itineraries_are_priced_from_the_price_list():
+    planner = RoutePlanner(FLIGHTS)
+    # The direct flight on sale, the connections dearer
+    cents = np.array([150, 200, 200, 200, 200, 200]) * 100
+    best = planner.plan('A', 'C', START, prices=PriceList(1, cents))[0]
+    assert best.flight_ids == [0] and best.price == 150.0
+    # A new epoch replaces the fares; without a price list base fares apply
+    assert planner.plan('A', 'C', START, prices=PriceList(2, cents * 10))[0].price == 1500.0
+    assert planner.plan('A', 'C', START)[0].price == 130.0
+
+
+def brute_force(flights, cents, origin, destination, start, end, objective, max_stops,
+                connection=HOUR, layover=24 * HOUR, limit=5):
+    departure, arrival = flights['departure_city'].to_numpy(), flights['arrival_city'].to_numpy()
+    departs, arrives = flights['departure_ts'].to_numpy(), flights['arrival_ts'].to_numpy()
+    by_city = {}
+    for row in range(len(flights)):
+        by_city.setdefault(departure[row], []).append(row)
+    found = []
+
+    def extend(path):
+        last = path[-1]
+        if arrival[last] == destination:
+            found.append(path)
+            return
+        if len(path) > max_stops:
+            return
+        for row in by_city.get(arrival[last], []):
+            if (arrives[last] + connection <= departs[row] <= min(arrives[last] + layover, end)
+                    and arrival[row] != origin):
+                extend(path + [row])
+
+    for row in by_city.get(origin, []):
+        if start <= departs[row] <= end:
+            extend([row])
+
+    def key(path):
+        price, elapsed = int(cents[path].sum()), int(arrives[path[-1]] - departs[path[0]])
+        return {'cheapest': (price, elapsed), 'fastest': (elapsed, price),
+                'fewest_stops': (len(path) - 1, price)}[objective]
+
+    return sorted(key(path) for path in found)[:limit]
+
+
+@pytest.mark.parametrize('repriced', [False, True])
+def test_best_itineraries_match_brute_force(repriced):
+    flights = generate_flight_data(3000, seed=7, start=START)
+    cents = flights['price_cents'].to_numpy().astype(np.int64)
+    prices = None
+    if repriced:
+        cents = (cents * np.random.default_rng(3).uniform(0.5, 2.0, len(cents))).astype(np.int64)
+        prices = PriceList(1, cents)
+    planner = RoutePlanner(flights)
+    start = int(START.timestamp())
+    rng = random.Random(1)
+    for _ in range(20):
+        origin, destination = rng.sample(CITIES, 2)
+        objective = rng.choice(['cheapest', 'fastest', 'fewest_stops'])
+        max_stops = rng.choice([1, 2])
+        itineraries = planner.plan(origin, destination, START, horizon_hours=72, objective=objective,
+                                   max_stops=max_stops, prices=prices)
+        got = []
+        for it in itineraries:
+            price = round(it.price * 100)
+            elapsed = int((it.arrival_time - it.departure_time).total_seconds())
+            got.append({'cheapest': (price, elapsed), 'fastest': (elapsed, price),
+                        'fewest_stops': (it.stops, price)}[objective])
+        assert got == brute_force(flights, cents, origin, destination, start, start + 72 * HOUR,
+                                  objective, max_stops)
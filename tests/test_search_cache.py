@@ -0,0 +1,93 @@
+# tests/test_search_cache.py
+"""SearchCache hits, generations, expiry and the entry and byte bounds."""
+import numpy as np
+
+from search_cache import SearchCache, search_key
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def counting(value):
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return value
+
+    return compute, calls
+
+
+def test_search_key_normalizes_equivalent_queries():
+    assert search_key('London', 'Paris', ['SkyWings', 'AirOne', 'SkyWings'], price_range=(100, 200)) == \
+        search_key('London', 'Paris', ['AirOne', 'SkyWings'], price_range=(100.0, 200.0))
+    assert search_key(airlines=[]) == search_key(airlines=None)
+    assert search_key(sort_by='price') != search_key(sort_by='-price')
+
+
+def test_repeated_lookups_hit_and_results_are_read_only():
+    cache = SearchCache()
+    compute, calls = counting(np.arange(5))
+    first = cache.get('key', 'v1', compute)
+    assert cache.get('key', 'v1', compute) is first
+    assert len(calls) == 1
+    assert not first.flags.writeable
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+
+def test_a_new_generation_recomputes():
+    cache = SearchCache()
+    cache.get('key', 'v1', lambda: np.arange(3))
+    assert list(cache.get('key', 'v2', lambda: np.arange(2))) == [0, 1]
+    assert cache.stats()['invalidations'] == 1
+    assert len(cache) == 1
+
+
+def test_entries_expire_after_the_ttl():
+    clock = FakeClock()
+    cache = SearchCache(ttl=10, clock=clock)
+    compute, calls = counting(np.arange(3))
+    cache.get('key', 'v1', compute)
+    clock.now = 9.9
+    cache.get('key', 'v1', compute)
+    clock.now = 10.0
+    cache.get('key', 'v1', compute)
+    assert len(calls) == 2
+    assert cache.stats()['expirations'] == 1
+
+
+def test_least_recently_used_entries_are_evicted_first():
+    cache = SearchCache(maxsize=2)
+    for key in ('a', 'b'):
+        cache.get(key, 'v1', lambda: np.arange(1))
+    cache.get('a', 'v1', lambda: np.arange(1))
+    cache.get('c', 'v1', lambda: np.arange(1))
+    compute, calls = counting(np.arange(1))
+    cache.get('a', 'v1', compute)
+    assert not calls
+    cache.get('b', 'v1', compute)
+    assert len(calls) == 1
+    assert cache.stats()['evictions'] >= 1
+
+
+def test_the_byte_budget_bounds_the_cache():
+    row = np.arange(100, dtype=np.int64)  # 800 bytes
+    cache = SearchCache(maxbytes=2000)
+    for key in range(5):
+        cache.get(key, 'v1', lambda: row.copy())
+    assert cache.nbytes <= 2000 and len(cache) == 2
+    # A result bigger than the whole budget is returned but not kept
+    big = cache.get('big', 'v1', lambda: np.arange(1000, dtype=np.int64))
+    assert len(big) == 1000 and len(cache) == 2
+
+
+def test_clear_drops_everything():
+    cache = SearchCache()
+    cache.get('key', 'v1', lambda: np.arange(4))
+    cache.clear()
+    assert len(cache) == 0 and cache.nbytes == 0